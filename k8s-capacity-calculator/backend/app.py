@@ -1,165 +1,607 @@
-import json
+import base64
+import gzip
+import hashlib
+import logging
 import math
+import os
+import time
+import uuid
+import zlib
+from collections import Counter
 from datetime import datetime
 
+try:
+    import brotli
+except ImportError:  # br responses are only offered when brotli is installed
+    brotli = None
+
+# Everything below runs once per container during the Lambda init phase,
+# so the first request after a cold start doesn't pay for config loading
+_init_started = time.perf_counter()
+
+_phase_started = time.perf_counter()
+from utils.config_loader import normalize_tribe
+from utils.calculator import (
+    BATCH_MIN_ROWS, BUFFER_MULTIPLIER, EnvAccumulator, calculate_final_cost, calculate_final_cost_batch,
+    calculate_raw_costs, finalize_accumulators, get_config_summary
+)
+from utils.codec import JSON_BACKEND, CodecError, StreamedArray, dumps
+from utils.export import CONTENT_TYPES, EXPORT_FORMATS, iter_export_chunks
+from utils.node_planner import catalog_errors, plan_nodes_by_env
+from utils.records import InvalidRecordError, NamespaceEntry
+from utils.result_cache import canonical_key, result_cache
+from utils.rollup import aggregate_rollup, build_rollup, parse_levels
+from utils.scenarios import expand_scenarios, run_scenarios
+from utils.state_store import StateConflictError, state_store
+from utils.tribe_search import MAX_SEARCH_RESULTS, TYPE_RANKS
+from utils.router import (
+    RequestError, Router, build_headers, error_response, get_header,
+    get_query_param, get_request_method, get_request_path, json_response, parse_json_body
+)
+from utils.logger import get_logger, start_request
+from utils.metrics import BYTES, MILLISECONDS, metrics
+_import_ms = round((time.perf_counter() - _phase_started) * 1000, 3)
+
+# Importing config_store loads the configs; that is reported once, per phase, by load_timings
+from utils.config_store import config_store
+
+STARTUP_TIMINGS = {
+    'import_utils_ms': _import_ms,
+    **config_store.loader.load_timings
+}
+
+# Responses that only depend on the loaded configs, rebuilt whenever the config version changes
+PRECOMPUTED = {}
+
+router = Router()
+log = get_logger('app')
+
+_warmed = False
+_cold_start_reported = False
+
+
+def build_precomputed(snapshot):
+    """Build response fragments that only change with the config version"""
+    config_loader = snapshot.loader
+    config_summary = config_loader.get_config_summary()
+
+    # /api/config is serialized once per config version (or at bundle build time) and served by ETag
+    config_body = config_loader.get_config_body()
+
+    return {
+        'version': snapshot.version,
+        # One shared header dict per config version, reused by every JSON response
+        'headers': build_headers(snapshot.version),
+        'config_summary': config_summary,
+        'config_body': config_body,
+        'config_etag': '"' + hashlib.sha256(config_body.encode('utf-8')).hexdigest()[:32] + '"',
+        # Compressed variants are filled in lazily, one per Content-Encoding
+        'config_encoded': {}
+    }
+
+
+def on_config_swap(snapshot):
+    """Invalidate everything derived from the previous config version"""
+    global PRECOMPUTED
+    PRECOMPUTED = build_precomputed(snapshot)
+
+
+def precompute_responses():
+    """Build response fragments for the config version loaded at init"""
+    started = time.perf_counter()
+    on_config_swap(config_store.current())
+    STARTUP_TIMINGS['precompute_responses_ms'] = round((time.perf_counter() - started) * 1000, 3)
+
+
+def warm():
+    """
+    Pre-initialize the container (provisioned concurrency / SnapStart hook).
+    Safe to call repeatedly; returns the startup timing report.
+    """
+    global _warmed
+    if not _warmed:
+        started = time.perf_counter()
+        # Exercise the calculation path once so its code is hot before real traffic
+        calculate_final_cost([{"env": "prod", "monthlyCost": 0, "annualCost": 0}])
+        STARTUP_TIMINGS['warm_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        _warmed = True
+    return STARTUP_TIMINGS
+
+
+precompute_responses()
+config_store.on_swap(on_config_swap)
+STARTUP_TIMINGS['init_total_ms'] = round((time.perf_counter() - _init_started) * 1000, 3)
+
+try:
+    # Lambda SnapStart runtime hooks, only present in SnapStart-enabled runtimes
+    from snapshot_restore_py import register_before_snapshot
+    register_before_snapshot(warm)
+except ImportError:
+    pass
+
+
 def lambda_handler(event, context):
     """
     Main Lambda handler - replaces Flask routes
+    Accepts both REST API (v1) and HTTP API (v2) proxy events.
     """
-    print("Received event:", json.dumps(event))
+    global _cold_start_reported
+    request_started = time.perf_counter()
+    correlation_id = start_request(event, context)
+    cold_start = not _cold_start_reported
+    if cold_start:
+        _cold_start_reported = True
+        log.info("Cold start init timings", startup_timings=STARTUP_TIMINGS)
+
+    # The body is logged as the raw (truncated) string instead of re-serializing the event
+    log.debug_sampled(
+        "Received event",
+        event=lambda: {key: value for key, value in event.items() if key != 'body'},
+        body=lambda: event.get('body')
+    )
+
+    # Scheduled/provisioned warm-up pings never reach the router
+    if event.get('warmup'):
+        response = json_response(200, {'warmed': True, 'startup_timings': warm()}, PRECOMPUTED['headers'])
+        response['headers'] = {**response['headers'], 'X-Correlation-Id': correlation_id}
+        return response
     
     # Extract HTTP method and path
-    http_method = event.get('httpMethod', 'GET')
-    path = event.get('path', '')
-    
-    # Handle CORS headers
-    cors_headers = {
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS, PUT, DELETE',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-        'Access-Control-Allow-Credentials': True
-    }
+    http_method = get_request_method(event)
+    path = get_request_path(event)
+    handler = router.resolve(http_method, path)
+
+    # Route is the only dimension; unmatched paths share one to bound cardinality
+    metrics.start({'Route': f"{http_method} {path}" if handler else 'unmatched'}, ColdStart=cold_start)
+    if cold_start:
+        metrics.put('InitTime', STARTUP_TIMINGS['init_total_ms'], MILLISECONDS)
+    metrics.put('RequestBytes', len(event.get('body') or ''), BYTES)
+
+    # Revalidates the configs once the TTL has expired
+    with metrics.timer('ConfigCheckTime'):
+        config_store.current()
+    headers = PRECOMPUTED['headers']
     
     # Handle CORS preflight
     if http_method == 'OPTIONS':
+        metrics.flush()
         return {
             'statusCode': 200,
-            'headers': cors_headers,
+            'headers': headers,
             'body': ''
         }
-    
-    try:
-        # Route requests based on path and method
-        if path == '/api/test' and http_method == 'GET':
-            return handle_test(cors_headers)
-        elif path == '/api/finalize-cost' and http_method == 'POST':
-            return handle_finalize_cost(event, cors_headers)
-        elif path == '/api/add' and http_method == 'POST':
-            return handle_add_entry(event, cors_headers)
-        elif path == '/api/summary' and http_method == 'GET':
-            return handle_get_summary(cors_headers)
-        elif path == '/api/config' and http_method == 'GET':
-            return handle_get_config(cors_headers)
-        elif path == '/api/find-approver' and http_method == 'POST':
-            return handle_find_approver(event, cors_headers)
-        elif path == '/api/debug-config' and http_method == 'GET':
-            return handle_debug_config(cors_headers)
-        elif path == '/api/debug-input' and http_method == 'POST':
-            return handle_debug_input(event, cors_headers)
+
+    if handler is None:
+        allowed = router.allowed_methods(path)
+        if allowed:
+            response = error_response(405, f"Method {http_method} not allowed for {path}", headers)
+            response['headers'] = {**headers, 'Allow': ', '.join(allowed + ['OPTIONS'])}
         else:
-            return {
-                'statusCode': 404,
-                'headers': cors_headers,
-                'body': json.dumps({'error': 'Endpoint not found', 'path': path})
-            }
-            
-    except Exception as e:
-        print(f"❌ ERROR in lambda_handler: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {
-            'statusCode': 500,
-            'headers': cors_headers,
-            'body': json.dumps({
-                'success': False,
-                'error': f'Server error: {str(e)}'
-            })
-        }
+            response = json_response(404, {'error': 'Endpoint not found', 'path': path}, headers)
+    else:
+        try:
+            with metrics.timer('HandlerTime'):
+                response = handler(event, headers)
+        except RequestError as e:
+            response = error_response(e.status_code, e.message, headers)
+        except Exception as e:
+            log.exception("Unhandled error in lambda_handler", method=http_method, path=path)
+            response = error_response(500, f'Server error: {str(e)}', headers)
+
+    log.info("Request handled", method=http_method, path=path, status=response['statusCode'])
+    metrics.set_property('StatusCode', response['statusCode'])
+    metrics.put('ResponseBytes', len(response.get('body') or ''), BYTES)
+    metrics.put('RequestTime', (time.perf_counter() - request_started) * 1000, MILLISECONDS)
+    metrics.flush()
+    response['headers'] = {**response['headers'], 'X-Correlation-Id': correlation_id}
+    return response
+
 
-def handle_test(cors_headers):
+@router.route('GET', '/api/test')
+def handle_test(event, headers):
     """Handle /api/test endpoint"""
+    return json_response(200, {
+        'success': True,
+        'message': 'Backend is working!',
+        'timestamp': datetime.now().isoformat(),
+        'environment': 'AWS Lambda'
+    }, headers)
+
+
+NO_RESULTS_ERROR = 'No data available for cost calculation. Please add some namespaces first.'
+
+# Upper bound on result sets priced by one /api/finalize-cost/batch call
+MAX_BATCH_ITEMS = int(os.environ.get('MAX_BATCH_ITEMS', '1000'))
+# Upper bound on what-if points evaluated by one /api/scenarios call
+MAX_SCENARIOS = int(os.environ.get('MAX_SCENARIOS', '10000'))
+# How long browsers may reuse /api/search-tribes answers (they are also revalidated by ETag)
+SEARCH_CACHE_SECONDS = int(os.environ.get('SEARCH_CACHE_SECONDS', '300'))
+
+
+def build_finalize_payload(finalized_costs):
+    """Wrap calculate_final_cost output with the overall monthly/annual totals"""
+    # Calculate totals - FIXED: Use raw_monthly from each environment
+    total_monthly = sum(env_data.raw_monthly for env_data in finalized_costs.values())
+    # FIXED: Calculate annual as monthly × 12 to match Flask behavior
+    total_annual = total_monthly * 12
+
+    log.debug("Final totals", total_monthly=total_monthly, total_annual=total_annual)
+
     return {
-        'statusCode': 200,
-        'headers': {**cors_headers, 'Content-Type': 'application/json'},
-        'body': json.dumps({
-            'success': True,
-            'message': 'Backend is working!',
-            'timestamp': datetime.now().isoformat(),
-            'environment': 'AWS Lambda'
-        })
+        'success': True,
+        # Display formatting happens here, once per response
+        'finalized_costs': {env: env_data.to_dict() for env, env_data in finalized_costs.items()},
+        'total_monthly_cost': f"${total_monthly:,.2f}",
+        'total_annual_cost': f"${total_annual:,.2f}",
+        'raw_total_monthly': total_monthly,
+        'raw_total_annual': total_annual
     }
 
-def handle_finalize_cost(event, cors_headers):
+
+@router.route('POST', '/api/finalize-cost')
+def handle_finalize_cost(event, headers):
     """Handle /api/finalize-cost endpoint"""
+    body = parse_json_body(event, stream_key='results')
     try:
-        # Parse request body
-        body = event.get('body', '{}')
-        if isinstance(body, str):
-            body = json.loads(body)
-        
-        print(f"🔍 DEBUG finalize-cost: Request data received: {body}")
+        log.debug_sampled("finalize-cost request body", body=lambda: event.get('body'))
         
         results_data = body.get('results', {})
+
+        # ?format=csv|ndjson exports namespace, env and total rows instead of the JSON document
+        export_format = get_query_param(event, 'format')
+        if export_format and export_format != 'json':
+            if export_format not in EXPORT_FORMATS:
+                return error_response(400, f"format must be json, {' or '.join(EXPORT_FORMATS)}", headers)
+            if not results_data:
+                return error_response(400, NO_RESULTS_ERROR, headers)
+            return export_response(event, results_data, export_format, headers)
         
+        # Sessions built with /api/add are finalized from their running aggregates
+        session_id = None if results_data else get_session_id(event, body)
+        if session_id and state_store.enabled:
+            accumulators = build_session_accumulators(session_id)
+            if not accumulators:
+                return error_response(400, NO_RESULTS_ERROR, headers)
+            finalized_costs = finalize_accumulators(accumulators, config_store.loader)
+            return json_response(200, {'session_id': session_id, **build_finalize_payload(finalized_costs)}, headers)
+
         if not results_data:
-            return {
-                'statusCode': 400,
-                'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                'body': json.dumps({
-                    'success': False, 
-                    'error': 'No data available for cost calculation. Please add some namespaces first.'
-                })
-            }
-        
-        print(f"🔍 DEBUG: Processing {len(results_data) if isinstance(results_data, list) else 'dict'} entries")
-        
-        # Import here to avoid circular imports
-        from utils.calculator import calculate_final_cost
-        finalized_costs = calculate_final_cost(results_data)
-        
-        # Calculate totals - FIXED: Use raw_monthly from each environment
-        total_monthly = sum(env_data["raw_monthly"] for env_data in finalized_costs.values())
-        # FIXED: Calculate annual as monthly × 12 to match Flask behavior
-        total_annual = total_monthly * 12
-        
-        print(f"🔍 DEBUG: Final totals - Monthly: ${total_monthly}, Annual: ${total_annual}")
+            return error_response(400, NO_RESULTS_ERROR, headers)
         
-        return {
-            'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': True,
-                'finalized_costs': finalized_costs,
-                'total_monthly_cost': f"${total_monthly:,.2f}",
-                'total_annual_cost': f"${total_annual:,.2f}",
-                'raw_total_monthly': total_monthly,
-                'raw_total_annual': total_annual
-            })
-        }
+        # Large bodies arrive as a StreamedArray: rows are decoded one at a time
+        # straight into the calculator, and such requests bypass the result cache
+        streamed = isinstance(results_data, StreamedArray)
+        log.debug("Processing finalize-cost entries", entries=lambda: 'streamed' if streamed else len(results_data))
+
+        # Identical result sets under the same config version reuse the serialized body
+        cache_key = None
+        if result_cache.enabled and not streamed:
+            cache_key = canonical_key(
+                {'results': results_data, 'plan_nodes': bool(body.get('plan_nodes'))},
+                config_store.version, 'finalize-cost'
+            )
+            cached_body = result_cache.get(cache_key)
+            if cached_body is not None:
+                return {'statusCode': 200, 'headers': {**headers, 'X-Cache': 'HIT'}, 'body': cached_body}
+
+        # Large parsed lists are aggregated as NumPy columns; streamed rows are aggregated as they decode
+        if isinstance(results_data, list) and len(results_data) >= BATCH_MIN_ROWS:
+            finalized_costs = calculate_final_cost_batch(results_data)
+        else:
+            finalized_costs = calculate_final_cost(results_data)
+
+        # Opt-in: size nodes by bin-packing pod requests instead of the fixed cores-per-node divisor.
+        # Read only now: members after a streamed results array are parsed once it is consumed
+        if body.get('plan_nodes'):
+            env_plans = plan_nodes_by_env(results_data, config_store.loader, buffer=BUFFER_MULTIPLIER)
+            for env, env_data in finalized_costs.items():
+                plan = env_plans.get(env)
+                if plan and plan['recommended'] and plan['pod_count']:
+                    env_data.node_plan = plan
+                    # A plan that leaves pods out would undercount nodes; keep the estimate instead
+                    unplaceable = plan['recommended']['unplaceable_pods']
+                    if unplaceable:
+                        plan['warning'] = (
+                            f'{unplaceable} pods fit on no instance type; '
+                            'node_count keeps the cores-per-node estimate'
+                        )
+                    else:
+                        env_data.node_count = plan['recommended']['node_count']
+
+        with metrics.timer('SerializeTime'):
+            response_body = dumps(build_finalize_payload(finalized_costs))
+        if cache_key is not None:
+            result_cache.set(cache_key, response_body)
+
+        return {'statusCode': 200, 'headers': {**headers, 'X-Cache': 'MISS'}, 'body': response_body}
+    except CodecError as e:
+        # Malformed JSON further into a streamed body
+        return error_response(e.status_code, e.message, headers)
+    except InvalidRecordError as e:
+        return error_response(400, f'Invalid result entry: {str(e)}', headers)
     except Exception as e:
-        print(f"❌ ERROR in handle_finalize_cost: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return {
-            'statusCode': 500,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
+        log.exception("Error in handle_finalize_cost")
+        return error_response(500, f'Calculation error: {str(e)}', headers)
+
+
+def export_response(event, results_data, export_format, headers):
+    """
+    CSV/NDJSON export of a result set. Rows are encoded chunk by chunk as they
+    are aggregated and, when the client accepts it, compressed the same way,
+    so only the (compressed) output is held; API Gateway proxy responses
+    can't be streamed, so the chunks are joined into one body at the end.
+    """
+    include_namespaces = (get_query_param(event, 'namespaces') or 'true').lower() not in ('0', 'false', 'no')
+    chunks = iter_export_chunks(results_data, config_store.loader, export_format, include_namespaces)
+    export_headers = {
+        **headers,
+        'Content-Type': CONTENT_TYPES[export_format],
+        'Content-Disposition': f'attachment; filename="finalized-costs.{export_format}"',
+        'Vary': 'Accept-Encoding'
+    }
+
+    encoding = choose_content_encoding(get_header(event, 'Accept-Encoding'))
+    with metrics.timer('ExportTime'):
+        if encoding:
+            return {
+                'statusCode': 200,
+                'headers': {**export_headers, 'Content-Encoding': encoding},
+                'body': encode_chunks(chunks, encoding),
+                'isBase64Encoded': True
+            }
+        return {'statusCode': 200, 'headers': export_headers, 'body': ''.join(chunks)}
+
+
+def iter_batch_items(requests_data):
+    """
+    Yield (request_id, results) from either a list of
+    {"request_id": ..., "results": [...]} objects or a {request_id: results} dict
+    """
+    if isinstance(requests_data, dict):
+        for request_id, item in requests_data.items():
+            # Allow both {"id": [...]} and {"id": {"results": [...]}}
+            if isinstance(item, dict) and 'results' in item:
+                item = item['results']
+            yield str(request_id), item
+    else:
+        for index, item in enumerate(requests_data):
+            if not isinstance(item, dict):
+                yield str(index), None
+                continue
+            yield str(item.get('request_id', index)), item.get('results')
+
+
+@router.route('POST', '/api/finalize-cost/batch')
+def handle_finalize_cost_batch(event, headers):
+    """Handle /api/finalize-cost/batch - price many independent result sets in one call"""
+    body = parse_json_body(event)
+    requests_data = body.get('requests')
+
+    if not requests_data or not isinstance(requests_data, (list, dict)):
+        return error_response(400, 'requests must be a non-empty list or object of result sets', headers)
+    if len(requests_data) > MAX_BATCH_ITEMS:
+        return error_response(413, f'Batch too large: {len(requests_data)} items (max {MAX_BATCH_ITEMS})', headers)
+
+    # One config snapshot for the whole batch, so every item is priced consistently
+    config_loader = config_store.loader
+
+    batch = list(iter_batch_items(requests_data))
+    # Results are keyed by request_id, so every item sharing an id fails
+    # instead of one silently replacing another
+    id_counts = Counter(request_id for request_id, _ in batch)
+
+    items = {}
+    succeeded = 0
+    total_monthly = 0
+    for request_id, results_data in batch:
+        if id_counts[request_id] > 1:
+            items[request_id] = {
                 'success': False,
-                'error': f'Calculation error: {str(e)}'
-            })
-        }
+                'status_code': 400,
+                'error': f'Duplicate request_id: {request_id} (used by {id_counts[request_id]} items)'
+            }
+            continue
+        if not results_data:
+            items[request_id] = {'success': False, 'status_code': 400, 'error': NO_RESULTS_ERROR}
+            continue
+
+        try:
+            payload = build_finalize_payload(calculate_final_cost(results_data, config_loader))
+        except InvalidRecordError as e:
+            items[request_id] = {'success': False, 'status_code': 400, 'error': f'Invalid result entry: {str(e)}'}
+            continue
+        except Exception as e:
+            log.warning("Batch item failed", request_id=request_id, error=str(e))
+            items[request_id] = {'success': False, 'status_code': 500, 'error': f'Calculation error: {str(e)}'}
+            continue
+
+        items[request_id] = payload
+        succeeded += 1
+        total_monthly += payload['raw_total_monthly']
 
-def handle_add_entry(event, cors_headers):
-    """Handle /api/add endpoint"""
+    total_annual = total_monthly * 12
+    log.info("Batch finalize done", items=len(items), succeeded=succeeded)
+
+    return json_response(200, {
+        'success': True,
+        'results': items,
+        'succeeded': succeeded,
+        'failed': len(items) - succeeded,
+        'total_monthly_cost': f"${total_monthly:,.2f}",
+        'total_annual_cost': f"${total_annual:,.2f}",
+        'raw_total_monthly': total_monthly,
+        'raw_total_annual': total_annual
+    }, headers)
+
+
+@router.route('POST', '/api/calculate')
+def handle_calculate(event, headers):
+    """
+    Handle /api/calculate - cost raw namespace rows (pods, cpu_req, override_size)
+    server-side, for headless clients that don't run calculatorCore.js
+    """
+    body = parse_json_body(event)
+    namespaces = body.get('namespaces')
+    if not namespaces or not isinstance(namespaces, list):
+        return error_response(400, 'namespaces must be a non-empty list of namespace rows', headers)
+
+    include_rows = body.get('include_rows', True)
+    try:
+        rows, finalized_costs, totals = calculate_raw_costs(namespaces, include_rows=include_rows)
+    except Exception as e:
+        log.exception("Error in handle_calculate")
+        return error_response(500, f'Calculation error: {str(e)}', headers)
+
+    payload = build_finalize_payload(finalized_costs)
+    payload['totals'] = totals
+    if include_rows:
+        payload['results'] = rows
+    return json_response(200, payload, headers)
+
+
+@router.route('POST', '/api/node-plan')
+def handle_node_plan(event, headers):
+    """
+    Handle /api/node-plan - first-fit-decreasing packing of each env's pods
+    onto the instance catalog, with node counts per instance type and waste
+    """
+    body = parse_json_body(event)
+    results_data = body.get('results')
+    if not results_data:
+        return error_response(400, NO_RESULTS_ERROR, headers)
+
+    catalog = body.get('instance_catalog')
+    errors = catalog_errors(catalog) if catalog is not None else None
+    if errors:
+        return error_response(400, 'Invalid instance_catalog: ' + '; '.join(errors), headers)
+
+    try:
+        buffer = float(body.get('buffer', BUFFER_MULTIPLIER))
+    except (TypeError, ValueError):
+        return error_response(400, 'buffer must be a number', headers)
+    if not math.isfinite(buffer) or buffer < 1:
+        return error_response(400, 'buffer must be a finite number of at least 1', headers)
+
+    try:
+        plans = plan_nodes_by_env(results_data, config_store.loader, catalog, buffer)
+    except InvalidRecordError as e:
+        return error_response(400, f'Invalid result entry: {str(e)}', headers)
+    except Exception as e:
+        log.exception("Error in handle_node_plan")
+        return error_response(500, f'Node planning error: {str(e)}', headers)
+
+    return json_response(200, {'success': True, 'buffer': buffer, 'node_plans': plans}, headers)
+
+
+@router.route('POST', '/api/scenarios')
+def handle_scenarios(event, headers):
+    """
+    Handle /api/scenarios - what-if sweep over sizing and price overrides.
+    Takes a base result set plus a parameter grid and/or explicit scenarios and
+    returns one totals row per scenario point.
+    """
+    body = parse_json_body(event)
+    results_data = body.get('results')
+    if not results_data:
+        return error_response(400, NO_RESULTS_ERROR, headers)
+
+    try:
+        names, points = expand_scenarios(body.get('grid'), body.get('scenarios'), MAX_SCENARIOS)
+    except (OverflowError, ValueError) as e:
+        # Too many points is a bad parameter, not a large body: a few grid values can expand past the limit
+        return error_response(400, str(e), headers)
+    if not points:
+        return error_response(400, 'Provide a grid of parameter values or a list of scenarios', headers)
+
+    try:
+        sweep = run_scenarios(results_data, names, points, include_envs=bool(body.get('include_envs')))
+    except InvalidRecordError as e:
+        return error_response(400, f'Invalid result entry: {str(e)}', headers)
+    except Exception as e:
+        log.exception("Error in handle_scenarios")
+        return error_response(500, f'Scenario error: {str(e)}', headers)
+
+    return json_response(200, {'success': True, 'scenario_count': len(points), **sweep}, headers)
+
+
+@router.route('POST', '/api/rollup')
+def handle_rollup(event, headers):
+    """
+    Handle /api/rollup - org-wide cost rollup of a result set by the orgMapping
+    hierarchy (env > approver > category > tribe), attributing every row to its
+    own tribe instead of the first entry's, in one pass
+    """
+    body = parse_json_body(event, stream_key='results')
+    results_data = body.get('results')
+    if not results_data:
+        return error_response(400, NO_RESULTS_ERROR, headers)
+
+    try:
+        leaves = aggregate_rollup(results_data, config_store.loader)
+        # Read only now: members after a streamed results array are parsed once it is consumed
+        levels = parse_levels(body.get('levels'))
+        rollup = build_rollup(leaves, levels, include_rows=bool(body.get('include_rows')))
+    except CodecError as e:
+        # Malformed JSON further into a streamed body
+        return error_response(e.status_code, e.message, headers)
+    except InvalidRecordError as e:
+        return error_response(400, f'Invalid result entry: {str(e)}', headers)
+    except ValueError as e:
+        return error_response(400, str(e), headers)
+    except Exception as e:
+        log.exception("Error in handle_rollup")
+        return error_response(500, f'Rollup error: {str(e)}', headers)
+
+    return json_response(200, {'success': True, **rollup}, headers)
+
+
+def get_session_id(event, body=None):
+    """Session id from the X-Session-Id header, the body or the ?session_id= query parameter"""
+    session_id = get_header(event, 'X-Session-Id') or (body or {}).get('session_id') or get_query_param(event, 'session_id')
+    return str(session_id) if session_id else None
+
+
+def require_state_store():
+    if not state_store.enabled:
+        raise RequestError('Server-side state is disabled (STATE_STORE_BACKEND=none)', 501)
+
+
+def build_session_accumulators(session_id):
+    """EnvAccumulators rebuilt from a session's running aggregates, without reading its entries"""
+    accumulators = {}
+    for env, aggregate in state_store.aggregates(session_id).items():
+        accumulator = accumulators[env] = EnvAccumulator()
+        accumulator.namespace_count = aggregate['namespace_count']
+        accumulator.total_monthly_cost = float(aggregate['monthly'])
+        accumulator.total_annual_cost = float(aggregate['annual'])
+        accumulator.first_entry = NamespaceEntry.from_dict(aggregate['first_entry'], env)
+    return accumulators
+
+
+@router.route('POST', '/api/add')
+def handle_add_entry(event, headers):
+    """
+    Handle /api/add endpoint - add a namespace entry to the caller's session,
+    or replace the entry with the same `id`. A new session id is issued when
+    none is sent; the session summary is returned with the entry. Without a
+    state store the entry is only echoed back for the frontend to keep.
+    """
+    body = parse_json_body(event)
     try:
-        body = event.get('body', '{}')
-        if isinstance(body, str):
-            body = json.loads(body)
-        
         if not body:
-            return {
-                'statusCode': 400,
-                'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                'body': json.dumps({'error': 'No data provided'})
-            }
+            return json_response(400, {'error': 'No data provided'}, headers)
+
+        session_id = get_session_id(event, body) or uuid.uuid4().hex
+        entry_id = str(body.get('id') or uuid.uuid4().hex)
 
-        env = body.get("env")
+        env = body.get("env") or "default"
         # CORRECT: Use CPU values that match Flask backend (6 nonprod, 128 prod)
         cpu_core_ns = 128 if env == "prod" else 6
 
         # CORRECT: Use Tier1 as default provisioner
         new_entry = {
-            **body, 
+            **{key: value for key, value in body.items() if key not in ('session_id', 'id')},
+            "env": env,
             "cpu_core_ns": cpu_core_ns,
             "cluster_name": body.get("cluster_name", ""),
             "provisioner": body.get("provisioner", "Tier1"),
@@ -167,180 +609,308 @@ def handle_add_entry(event, cors_headers):
             "eks_version": body.get("eks_version", "v1.32")
         }
 
-        # In Lambda, we don't have sessions, so we'll return the entry
-        # Frontend will need to manage state
-        return {
-            'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': True, 
+        if not state_store.enabled:
+            return json_response(200, {
+                'success': True,
                 'entry': new_entry,
                 'message': 'Entry added successfully (frontend should manage state)'
-            })
-        }
+            }, headers)
+
+        try:
+            stored = state_store.upsert(session_id, entry_id, new_entry)
+        except ValueError as e:
+            return error_response(400, str(e), headers)
+        except StateConflictError as e:
+            return error_response(409, str(e), headers)
+
+        return json_response(200, {
+            'success': True,
+            'session_id': session_id,
+            'id': entry_id,
+            'entry': stored,
+            'summary': state_store.summary(session_id)
+        }, {**headers, 'X-Session-Id': session_id})
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': False,
-                'error': f'Error adding entry: {str(e)}'
-            })
-        }
+        log.exception("Error in handle_add_entry")
+        return error_response(500, f'Error adding entry: {str(e)}', headers)
 
-def handle_get_summary(cors_headers):
-    """Handle /api/summary endpoint"""
-    # Since we don't have sessions in Lambda, return empty summary
-    # Frontend should manage its own state
-    return {
-        'statusCode': 200,
-        'headers': {**cors_headers, 'Content-Type': 'application/json'},
-        'body': json.dumps({
+
+@router.route('POST', '/api/remove')
+def handle_remove_entry(event, headers):
+    """Handle /api/remove endpoint - remove a namespace entry by `id` from the caller's session"""
+    require_state_store()
+    body = parse_json_body(event)
+    session_id = get_session_id(event, body)
+    entry_id = body.get('id')
+    if not session_id or not entry_id:
+        return error_response(400, 'session_id and id are required', headers)
+
+    try:
+        removed = state_store.remove(session_id, str(entry_id))
+    except StateConflictError as e:
+        return error_response(409, str(e), headers)
+    if not removed:
+        return error_response(404, f'Entry not found: {entry_id}', headers)
+    return json_response(200, {
+        'success': True,
+        'session_id': session_id,
+        'summary': state_store.summary(session_id)
+    }, headers)
+
+
+@router.route('GET', '/api/summary')
+def handle_get_summary(event, headers):
+    """Handle /api/summary endpoint - per-env running aggregates of the caller's session"""
+    if not state_store.enabled:
+        return json_response(200, {
             'message': 'State management should be handled by frontend in Lambda environment',
             'note': 'Use /api/finalize-cost for calculations with frontend-managed state'
-        })
-    }
+        }, headers)
+    session_id = get_session_id(event)
+    if not session_id:
+        return error_response(400, 'session_id is required (X-Session-Id header or ?session_id=)', headers)
+
+    return json_response(200, {
+        'success': True,
+        'session_id': session_id,
+        **state_store.summary(session_id)
+    }, headers)
+
+
+def choose_content_encoding(accept_encoding):
+    """Pick the best supported Content-Encoding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
 
-def handle_get_config(cors_headers):
+    accepted = set()
+    for token in accept_encoding.split(','):
+        coding, *params = token.split(';')
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def etag_matches(if_none_match, etag):
+    """Check an If-None-Match header against our ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return any(tag == etag or tag == 'W/' + etag for tag in candidates)
+
+
+def representation_etag(etag, encoding):
+    """ETag of a body sent with the given Content-Encoding: the identity ETag with a -gzip/-br suffix"""
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def encode_body(body, encoding, cache=None):
+    """Compress a response body for the given Content-Encoding, returning base64 text"""
+    if cache is not None and encoding in cache:
+        return cache[encoding]
+
+    raw = body.encode('utf-8')
+    if encoding == 'br':
+        compressed = brotli.compress(raw)
+    else:
+        compressed = gzip.compress(raw)
+    encoded = base64.b64encode(compressed).decode('ascii')
+
+    if cache is not None:
+        cache[encoding] = encoded
+    return encoded
+
+
+def encode_chunks(chunks, encoding):
+    """Compress text chunks incrementally for the given Content-Encoding, returning base64 text"""
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        compress, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+        compress, finish = compressor.compress, compressor.flush
+    parts = [compress(chunk.encode('utf-8')) for chunk in chunks]
+    parts.append(finish())
+    return base64.b64encode(b''.join(parts)).decode('ascii')
+
+
+@router.route('GET', '/api/config')
+def handle_get_config(event, headers):
     """Handle /api/config endpoint - return all configurations"""
     try:
-        from utils.config_loader import config_loader
-        
+        precomputed = PRECOMPUTED
+        encoding = choose_content_encoding(get_header(event, 'Accept-Encoding'))
+        # Each encoding is a different representation, so it gets its own strong ETag
+        etag = representation_etag(precomputed['config_etag'], encoding)
+        config_headers = {
+            **headers,
+            'ETag': etag,
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding'
+        }
+
+        if etag_matches(get_header(event, 'If-None-Match'), etag):
+            return {
+                'statusCode': 304,
+                'headers': config_headers,
+                'body': ''
+            }
+
+        if encoding:
+            return {
+                'statusCode': 200,
+                'headers': {**config_headers, 'Content-Encoding': encoding},
+                'body': encode_body(precomputed['config_body'], encoding, precomputed['config_encoded']),
+                'isBase64Encoded': True
+            }
+
         return {
             'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': True,
-                'configs': {
-                    'calculatorDefaults': config_loader.get_calculator_defaults(),
-                    'costMap': config_loader.get_cost_map(),
-                    'defaults': config_loader.get_defaults(),
-                    'orgMapping': config_loader.get_org_mapping()
-                },
-                'config_summary': {
-                    "calculatorDefaults_loaded": bool(config_loader.get_calculator_defaults()),
-                    "costMap_loaded": bool(config_loader.get_cost_map()),
-                    "defaults_loaded": bool(config_loader.get_defaults()),
-                    "orgMapping_loaded": bool(config_loader.get_org_mapping()),
-                    "available_provisioners": list(config_loader.get_cost_map().keys()),
-                    "available_environments": list(config_loader.get_defaults().keys())
-                }
-            })
+            'headers': config_headers,
+            'body': precomputed['config_body']
         }
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': False,
-                'error': f'Error loading config: {str(e)}'
-            })
-        }
+        return error_response(500, f'Error loading config: {str(e)}', headers)
+
 
-def handle_find_approver(event, cors_headers):
+@router.route('POST', '/api/find-approver')
+def handle_find_approver(event, headers):
     """Handle /api/find-approver endpoint"""
+    body = parse_json_body(event)
     try:
-        from utils.config_loader import config_loader
-        
-        body = event.get('body', '{}')
-        if isinstance(body, str):
-            body = json.loads(body)
-        
         tribe_name = body.get('tribe', '')
         if not tribe_name:
-            return {
-                'statusCode': 400,
-                'headers': {**cors_headers, 'Content-Type': 'application/json'},
-                'body': json.dumps({
-                    'success': False,
-                    'error': 'Tribe name is required'
-                })
-            }
+            return error_response(400, 'Tribe name is required', headers)
         
-        approver = config_loader.find_approver(tribe_name)
+        approver = config_store.loader.find_approver(tribe_name)
         
-        return {
-            'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': True,
-                'tribe': tribe_name,
-                'approver': approver
-            })
-        }
+        return json_response(200, {
+            'success': True,
+            'tribe': tribe_name,
+            'approver': approver
+        }, headers)
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': False,
-                'error': f'Error finding approver: {str(e)}'
-            })
-        }
+        return error_response(500, f'Error finding approver: {str(e)}', headers)
+
+
+@router.route('GET', '/api/search-tribes')
+def handle_search_tribes(event, headers):
+    """
+    Handle /api/search-tribes?q= - type-ahead lookup of tribes, categories and
+    approvers whose name (or a word in it) starts with `q`, best matches first
+    """
+    query = get_query_param(event, 'q') or ''
+    try:
+        limit = int(get_query_param(event, 'limit') or 10)
+    except ValueError:
+        return error_response(400, 'limit must be an integer', headers)
+    if not 1 <= limit <= MAX_SEARCH_RESULTS:
+        return error_response(400, f'limit must be between 1 and {MAX_SEARCH_RESULTS}', headers)
+
+    types = get_query_param(event, 'types')
+    if types:
+        types = frozenset(value.strip() for value in types.split(',') if value.strip())
+        if not types <= TYPE_RANKS.keys():
+            return error_response(400, f"types must be a comma-separated list of {', '.join(TYPE_RANKS)}", headers)
 
-def handle_debug_config(cors_headers):
+    # Answers only change with the config version, so they are cacheable by ETag
+    snapshot = config_store.current()
+    cache_key = f"{snapshot.version}|{normalize_tribe(query)}|{limit}|{','.join(sorted(types or ()))}"
+    etag = '"' + hashlib.sha256(cache_key.encode('utf-8')).hexdigest()[:32] + '"'
+    search_headers = {**headers, 'ETag': etag, 'Cache-Control': f'public, max-age={SEARCH_CACHE_SECONDS}'}
+    if etag_matches(get_header(event, 'If-None-Match'), etag):
+        return {'statusCode': 304, 'headers': search_headers, 'body': ''}
+
+    matches, total = snapshot.loader.search_index.search(query, limit, types or None)
+    return json_response(200, {
+        'success': True,
+        'query': query,
+        'results': matches,
+        'total_matches': total
+    }, search_headers)
+
+
+@router.route('GET', '/api/config-version')
+def handle_config_version(event, headers):
+    """
+    Handle /api/config-version - the active config version, and whether it
+    is served with built-in fallbacks (CONFIG_ALLOW_FALLBACK) for missing or invalid files
+    """
+    loader = config_store.loader
+    return json_response(200, {
+        'success': True,
+        'config_version': config_store.version,
+        'config_bundle': loader.bundle_path,
+        'fallback': bool(loader.config_errors),
+        'fallback_configs': list(loader.fallback_configs),
+        'config_errors': list(loader.config_errors)
+    }, headers)
+
+
+@router.route('GET', '/api/debug-config')
+def handle_debug_config(event, headers):
     """Debug endpoint to check config loading"""
     try:
-        from utils.config_loader import config_loader
-        from utils.calculator import get_config_summary
-        
-        return {
-            'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': True,
-                'config_summary': get_config_summary(),
-                'loaded_configs': list(config_loader.configs.keys())
-            })
-        }
+        return json_response(200, {
+            'success': True,
+            'config_summary': get_config_summary(),
+            'loaded_configs': list(config_store.loader.configs.keys()),
+            'config_version': config_store.version,
+            'config_bundle': config_store.loader.bundle_path,
+            'startup_timings': STARTUP_TIMINGS,
+            'result_cache': result_cache.stats(),
+            'json_backend': JSON_BACKEND,
+            'routes': [f"{method} {path}" for method, path in router.routes]
+        }, headers)
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': False,
-                'error': f'Debug error: {str(e)}'
-            })
-        }
+        return error_response(500, f'Debug error: {str(e)}', headers)
+
+
+@router.route('GET', '/api/metrics')
+def handle_metrics(event, headers):
+    """Debug endpoint with recent per-phase latency histograms and counters"""
+    return json_response(200, {
+        'success': True,
+        'namespace': metrics.namespace,
+        'enabled': metrics.enabled,
+        'metrics': metrics.snapshot()
+    }, headers)
+
 
-def handle_debug_input(event, cors_headers):
+@router.route('POST', '/api/debug-input')
+def handle_debug_input(event, headers):
     """Debug endpoint to see what data is received"""
+    body = parse_json_body(event)
     try:
-        body = event.get('body', '{}')
-        if isinstance(body, str):
-            body = json.loads(body)
-        
-        print("🔍 DEBUG Input data:", body)
-        
         results_data = body.get('results', [])
-        print(f"🔍 DEBUG: Received {len(results_data)} entries")
-        
-        for i, entry in enumerate(results_data):
-            print(f"🔍 DEBUG Entry {i}:")
-            print(f"  - env: {entry.get('env')}")
-            print(f"  - monthlyCost: {entry.get('monthlyCost')}")
-            print(f"  - annualCost: {entry.get('annualCost')}")
-            print(f"  - provisioner: {entry.get('provisioner')}")
-            print(f"  - cluster: {entry.get('cluster')}")
-            print(f"  - tribe: {entry.get('tribe')}")
-            print(f"  - cpu_core_ns: {entry.get('cpu_core_ns')}")
+        log.info("debug-input received", entries=len(results_data), body=lambda: body)
+
+        if log.is_enabled(logging.DEBUG):
+            fields = ('env', 'monthlyCost', 'annualCost', 'provisioner', 'cluster', 'tribe', 'cpu_core_ns')
+            for i, entry in enumerate(results_data):
+                log.debug("debug-input entry", index=i, **{field: entry.get(field) for field in fields})
         
-        return {
-            'statusCode': 200,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': True,
-                'received_data': body,
-                'entries_count': len(results_data),
-                'message': 'Check backend logs for debug info'
-            })
-        }
+        return json_response(200, {
+            'success': True,
+            'received_data': body,
+            'entries_count': len(results_data),
+            'message': 'Check backend logs for debug info'
+        }, headers)
     except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': {**cors_headers, 'Content-Type': 'application/json'},
-            'body': json.dumps({
-                'success': False,
-                'error': f'Debug error: {str(e)}'
-            })
-        }
\ No newline at end of file
+        return error_response(500, f'Debug error: {str(e)}', headers)
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Standalone HTTP server for running the calculator without API Gateway.
+
+Translates HTTP requests into API Gateway proxy events (HTTP API v2 by default,
+REST v1 with --payload-version 1), calls app.lambda_handler and serves the
+frontend static assets with caching headers. Uses a threaded HTTP/1.1
+keep-alive server per process, whose connections are handled by a fixed pool
+of threads, and can fork several worker processes that share one listening
+socket. Workers share session state through the SQLite state store.
+
+    python local_server.py --port 8080 --workers 4 --threads 16
+"""
+import argparse
+import base64
+import email.utils
+import hashlib
+import mimetypes
+import os
+import socket
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STATIC_DIR = os.path.join(BACKEND_DIR, '..', 'frontend')
+
+# Assets are cached by browsers; index.html is always revalidated
+ASSET_CACHE_CONTROL = 'public, max-age=3600'
+HTML_CACHE_CONTROL = 'no-cache'
+
+DEFAULT_THREADS = 16
+# Idle keep-alive connections are closed after this many seconds so they don't hold pool threads
+DEFAULT_KEEPALIVE_TIMEOUT = 5
+
+# State store backends whose sessions live in one process only
+PER_PROCESS_STATE_BACKENDS = ('memory', 'dynamodb-local')
+
+
+class LocalContext:
+    """Minimal stand-in for the Lambda context object"""
+
+    function_name = 'k8s-capacity-local'
+    memory_limit_in_mb = 0
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+
+    def get_remaining_time_in_millis(self):
+        return 30000
+
+
+class StaticFiles:
+    """In-memory cache of static files, refreshed when a file's mtime changes"""
+
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path):
+        relative = unquote(url_path).lstrip('/') or 'index.html'
+        path = os.path.realpath(os.path.join(self.root, relative))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        if os.path.isdir(path):
+            path = os.path.join(path, 'index.html')
+        return path if os.path.isfile(path) else None
+
+    def get(self, path):
+        """(body, etag, last_modified, content_type) for a resolved file path"""
+        stat = os.stat(path)
+        cached = self._cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns:
+            return cached[1]
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        last_modified = email.utils.formatdate(stat.st_mtime, usegmt=True)
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        entry = (body, etag, last_modified, content_type)
+        with self._lock:
+            self._cache[path] = (stat.st_mtime_ns, entry)
+        return entry
+
+
+def build_event(method, target, headers, body, payload_version):
+    """Build an API Gateway proxy event from a raw HTTP request"""
+    url = urlsplit(target)
+    query = dict(parse_qsl(url.query, keep_blank_values=True))
+
+    is_base64 = False
+    if body:
+        try:
+            body = body.decode('utf-8')
+        except UnicodeDecodeError:
+            body = base64.b64encode(body).decode('ascii')
+            is_base64 = True
+    else:
+        body = None
+
+    if payload_version == 1:
+        return {
+            'httpMethod': method,
+            'path': url.path,
+            'headers': headers,
+            'queryStringParameters': query or None,
+            'body': body,
+            'isBase64Encoded': is_base64,
+            'requestContext': {'requestId': str(uuid.uuid4()), 'stage': '$default'}
+        }
+
+    return {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': url.path,
+        'rawQueryString': url.query,
+        'headers': {key.lower(): value for key, value in headers.items()},
+        'queryStringParameters': query or None,
+        'body': body,
+        'isBase64Encoded': is_base64,
+        'requestContext': {
+            'http': {'method': method, 'path': url.path, 'protocol': 'HTTP/1.1'},
+            'requestId': str(uuid.uuid4()),
+            'stage': '$default'
+        }
+    }
+
+
+class CalculatorRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    server_version = 'k8s-capacity-calculator'
+
+    # Set by make_server
+    app = None
+    static_files = None
+    payload_version = 2
+    quiet = False
+
+    def do_GET(self):
+        self.dispatch()
+
+    def do_POST(self):
+        self.dispatch()
+
+    def do_PUT(self):
+        self.dispatch()
+
+    def do_DELETE(self):
+        self.dispatch()
+
+    def do_OPTIONS(self):
+        self.dispatch()
+
+    def do_HEAD(self):
+        self.dispatch()
+
+    def dispatch(self):
+        path = urlsplit(self.path).path
+        if path.startswith('/api/') or self.static_files is None:
+            self.handle_api()
+        elif self.command in ('GET', 'HEAD'):
+            self.handle_static(path)
+        else:
+            self.send_body(405, {'Content-Type': 'text/plain'}, b'Method Not Allowed')
+
+    def handle_api(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        event = build_event(self.command, self.path, dict(self.headers.items()), body, self.payload_version)
+
+        response = self.app.lambda_handler(event, LocalContext())
+
+        response_body = response.get('body') or ''
+        if response.get('isBase64Encoded'):
+            response_body = base64.b64decode(response_body)
+        elif isinstance(response_body, str):
+            response_body = response_body.encode('utf-8')
+        headers = {key: str(value) for key, value in (response.get('headers') or {}).items()}
+        self.send_body(response.get('statusCode', 200), headers, response_body)
+
+    def handle_static(self, url_path):
+        path = self.static_files.resolve(url_path)
+        if path is None:
+            self.send_body(404, {'Content-Type': 'text/plain'}, b'Not Found')
+            return
+
+        body, etag, last_modified, content_type = self.static_files.get(path)
+        headers = {
+            'Content-Type': content_type,
+            'ETag': etag,
+            'Last-Modified': last_modified,
+            'Cache-Control': HTML_CACHE_CONTROL if content_type == 'text/html' else ASSET_CACHE_CONTROL
+        }
+        if self.headers.get('If-None-Match') == etag:
+            self.send_body(304, headers, b'')
+        else:
+            self.send_body(200, headers, body)
+
+    def send_body(self, status_code, headers, body):
+        self.send_response(status_code)
+        for key, value in headers.items():
+            if key.lower() != 'content-length':
+                self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD' and status_code != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server whose connections are handled by a fixed ThreadPoolExecutor.
+    At most `threads` connections are served at once; the accept loop waits
+    for a free thread, so further connections queue in the listen backlog.
+    """
+
+    def __init__(self, server_address, handler, threads, bind_and_activate=True):
+        super().__init__(server_address, handler, bind_and_activate)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='http')
+        self.free_threads = threading.BoundedSemaphore(threads)
+
+    def process_request(self, request, client_address):
+        self.free_threads.acquire()
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.free_threads.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def make_server(app, args, sock=None):
+    """Pooled keep-alive server; reuses `sock` when workers share a listening socket"""
+    handler = type('Handler', (CalculatorRequestHandler,), {
+        'app': app,
+        'static_files': StaticFiles(args.static_dir) if args.static_dir else None,
+        'payload_version': args.payload_version,
+        'quiet': args.quiet,
+        'timeout': args.keepalive_timeout
+    })
+    if sock is None:
+        return PooledHTTPServer((args.host, args.port), handler, args.threads)
+
+    server = PooledHTTPServer((args.host, args.port), handler, args.threads, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    return server
+
+
+def load_app():
+    """Import the backend (loads configs once per process, like a Lambda init phase)"""
+    # Read configs from the repo checkout regardless of the working directory
+    os.environ.setdefault('CONFIG_DIR', os.path.join(DEFAULT_STATIC_DIR, 'assets', 'config'))
+    # Keep EMF metric lines off the console; /api/metrics still shows them
+    os.environ.setdefault('METRICS_SINK', 'memory')
+    sys.path.insert(0, BACKEND_DIR)
+    import app
+    return app
+
+
+def configure_state_store(workers):
+    """
+    Pick the session state store before the backend is imported: one process
+    keeps sessions in memory, several share the SQLite store. Returns an error
+    message when the configured store would split sessions across workers.
+    """
+    backend_name = os.environ.get('STATE_STORE_BACKEND')
+    if workers <= 1:
+        os.environ.setdefault('STATE_STORE_BACKEND', 'memory')
+    elif backend_name is None:
+        os.environ['STATE_STORE_BACKEND'] = 'sqlite'
+    elif backend_name.lower() in PER_PROCESS_STATE_BACKENDS:
+        return (f"STATE_STORE_BACKEND={backend_name} keeps sessions per process; "
+                f"use sqlite (the default for --workers > 1), dynamodb or none with {workers} workers")
+    return None
+
+
+def serve_workers(app, args):
+    """Fork `workers` processes that all accept on one listening socket"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            server = make_server(app, args, sock)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            os._exit(0)
+        children.append(pid)
+
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the calculator API and frontend without API Gateway')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes sharing the socket (0 = one per CPU core)')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS,
+                        help='Connections served at once by each worker')
+    parser.add_argument('--keepalive-timeout', type=float, default=DEFAULT_KEEPALIVE_TIMEOUT,
+                        help='Seconds an idle keep-alive connection is kept open')
+    parser.add_argument('--static-dir', default=DEFAULT_STATIC_DIR,
+                        help="Frontend directory to serve ('' to serve the API only)")
+    parser.add_argument('--payload-version', type=int, choices=(1, 2), default=2,
+                        help='API Gateway event format passed to lambda_handler')
+    parser.add_argument('--quiet', action='store_true', help='Disable per-request access logs')
+    args = parser.parse_args()
+
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
+    if not hasattr(os, 'fork'):
+        args.workers = 1
+    if args.threads < 1:
+        parser.error('--threads must be at least 1')
+
+    error = configure_state_store(args.workers)
+    if error:
+        parser.error(error)
+    app = load_app()
+
+    print(f"Serving on http://{args.host}:{args.port} "
+          f"({args.workers} worker(s) x {args.threads} thread(s), payload v{args.payload_version}, "
+          f"state: {os.environ['STATE_STORE_BACKEND']}, static: {args.static_dir or 'off'})")
+
+    if args.workers > 1:
+        serve_workers(app, args)
+        return
+
+    server = make_server(app, args)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
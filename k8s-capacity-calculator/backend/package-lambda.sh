@@ -3,6 +3,9 @@
 echo "Installing dependencies..."
 pip install -r requirements.txt -t .
 
+echo "Compiling config bundle..."
+python ../scripts/build_config_bundle.py --output config_bundle.bin || { echo "❌ Config bundle build failed"; exit 1; }
+
 echo "Creating deployment package..."
 zip -r lambda_function.zip . -x "*.git*" "*.DS_Store" "package-lambda.sh" "__pycache__/*" "*.pyc"
 
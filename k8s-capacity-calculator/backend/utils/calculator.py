@@ -1,105 +1,462 @@
+import itertools
 import math
+from types import MappingProxyType
 
-def calculate_final_cost(results):
+from .config_loader import FALLBACK_TIER
+from .logger import get_logger
+from .metrics import COUNT, metrics
+from .records import (
+    NUMBER_TYPES, FinalizedEnv, InvalidRecordError, NamespaceEntry, entry_costs, round_2dp, to_cost
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch mode falls back to the streaming path
+    np = None
+
+log = get_logger('calculator')
+
+# Same constants as calculatorCore.js
+BUFFER_MULTIPLIER = 1.3
+CPU_SCALING_FACTOR = 1000  # Convert millicores to cores
+# Parsed result lists at least this long are finalized by calculate_final_cost_batch
+BATCH_MIN_ROWS = 1000
+# Costs of a row whose size has no price, not even the recommended one
+NO_TIER_COSTS = (0.0, 0.0)
+
+# Env sizing used by finalize_env (matches Flask backend); /api/scenarios overrides these
+DEFAULT_SIZING = MappingProxyType({
+    "buffer": BUFFER_MULTIPLIER,          # 30% headroom on CPU
+    "prod_cpu_per_namespace": 128,        # cores per prod namespace
+    "nonprod_cpu_per_namespace": 6,       # cores per non-prod namespace
+    "prod_cores_per_node": 2.29,          # 128 cores ÷ 56 nodes
+    "nonprod_cores_per_node": 2           # 6 cores ÷ 3 nodes
+})
+
+
+class EnvAccumulator:
+    """Running totals for a single environment, fed one namespace entry at a time"""
+
+    __slots__ = ("namespace_count", "total_monthly_cost", "total_annual_cost", "first_entry")
+
+    def __init__(self):
+        self.namespace_count = 0
+        self.total_monthly_cost = 0
+        self.total_annual_cost = 0
+        self.first_entry = None
+
+    def add(self, entry, env):
+        if self.first_entry is None:
+            self.first_entry = NamespaceEntry.from_dict(entry, env)
+        self.namespace_count += 1
+        # Use actual costs calculated by frontend; plain numbers add directly,
+        # anything else (numeric strings, null) is coerced and bools are rejected
+        monthly_cost, annual_cost = entry_costs(entry)
+        self.total_monthly_cost += monthly_cost
+        self.total_annual_cost += annual_cost
+
+
+def iter_env_entries(results):
+    """
+    Yield (env, entry) pairs from either the list format (from frontend)
+    or the env-grouped dict format (from session) without copying rows
+    """
+    if isinstance(results, dict):
+        for env, env_entries in results.items():
+            # Keep empty environments so they still show up in the output
+            yield env, None
+            if not isinstance(env_entries, list):
+                raise InvalidRecordError(f'Results for env {env!r} must be a list, got {type(env_entries).__name__}')
+            for entry in env_entries:
+                if not isinstance(entry, dict):
+                    raise InvalidRecordError(f'Each result must be an object, got {type(entry).__name__}')
+                yield env, entry
+    else:
+        for entry in results:
+            try:
+                env = entry.get("env", "default")
+            except AttributeError:
+                raise InvalidRecordError(f'Each result must be an object, got {type(entry).__name__}') from None
+            yield env, entry
+
+
+def aggregate_by_env(results):
+    """
+    Single streaming pass over results, keeping only one accumulator per environment.
+    Row costs are validated as they are added; bad rows raise InvalidRecordError.
+    """
+    accumulators = {}
+    for env, entry in iter_env_entries(results):
+        accumulator = accumulators.get(env)
+        if accumulator is None:
+            accumulator = accumulators[env] = EnvAccumulator()
+        if entry is not None:
+            accumulator.add(entry, env)
+    return accumulators
+
+
+def finalize_accumulators(accumulators, config_loader):
+    """FinalizedEnv records for {env: EnvAccumulator}, e.g. from aggregate_by_env or the state store"""
+    with metrics.timer('FinalizeTime'):
+        return {
+            env: finalize_env(env, accumulator, config_loader)
+            for env, accumulator in accumulators.items()
+        }
+
+
+def finalize_env(env, accumulator, config_loader):
+    """Turn an environment accumulator into its FinalizedEnv record"""
+    namespace_count = accumulator.namespace_count
+    total_monthly_cost = accumulator.total_monthly_cost
+    total_annual_cost = accumulator.total_annual_cost
+
+    total_cpu_cores, total_cpu_buffered_cores, node_count = size_env(env, namespace_count)
+
+    return build_env_result(
+        accumulator.first_entry, namespace_count, total_monthly_cost, total_annual_cost,
+        total_cpu_cores, total_cpu_buffered_cores, node_count, config_loader
+    )
+
+
+def size_env(env, namespace_count, sizing=DEFAULT_SIZING):
+    """
+    (total CPU cores, buffered cores, node count) for an env's namespace count.
+    FIXED: Uses CORRECT CPU values that match Flask backend (6 nonprod, 128 prod)
+    """
+    if env == "prod":
+        cpu_per_namespace = sizing["prod_cpu_per_namespace"]
+        cores_per_node = sizing["prod_cores_per_node"]
+    else:
+        cpu_per_namespace = sizing["nonprod_cpu_per_namespace"]
+        cores_per_node = sizing["nonprod_cores_per_node"]
+
+    # Calculate total CPU based on namespace count and environment limits
+    total_cpu_cores = namespace_count * cpu_per_namespace
+
+    # Apply the buffer (30% by default)
+    total_cpu_buffered_cores = math.ceil(total_cpu_cores * sizing["buffer"])
+
+    # FIXED: Node count calculation that matches Flask backend exactly
+    node_count = math.ceil(total_cpu_buffered_cores / cores_per_node)
+    return total_cpu_cores, total_cpu_buffered_cores, node_count
+
+
+def build_env_result(first_entry, namespace_count, total_monthly_cost, total_annual_cost,
+                     total_cpu_cores, total_cpu_buffered_cores, node_count, config_loader):
+    """Build the FinalizedEnv record for one environment from its computed totals"""
+    # Get provisioner, PDB, EKS version and cluster FROM USER INPUT (first entry seen)
+    first_entry = first_entry or NamespaceEntry(None)
+
+    # Get tribe and find approver from orgMapping
+    tribe_name = first_entry.tribe
+    with metrics.timer('ApproverLookupTime'):
+        approver = config_loader.find_approver(tribe_name) if tribe_name else "Unknown"
+
+    return FinalizedEnv(
+        first_entry.cluster, first_entry.provisioner, first_entry.pdb, first_entry.eks_version,
+        namespace_count, total_cpu_cores, total_cpu_buffered_cores, node_count,
+        total_monthly_cost, total_annual_cost, approver
+    )
+
+
+def get_config_summary():
+    """Summary of the loaded configuration used by the calculator"""
+    # Import here to avoid circular imports
+    from .config_store import config_store
+
+    return config_store.loader.get_config_summary()
+
+
+def select_tier(cpu_cores):
+    """Pick the pricing tier for the given buffered CPU cores from the active configs"""
+    # Import here to avoid circular imports
+    from .config_store import config_store
+
+    return config_store.loader.select_tier(cpu_cores)
+
+
+def to_number(value):
+    """Coerce like JS Number(): None/'' -> 0, unparseable -> NaN"""
+    if value is None or isinstance(value, bool):
+        return float(value or 0)
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return 0
+        try:
+            return float(value)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def get_buffered_cpu(cpu_core):
+    """Calculate buffered CPU with safety margin (getBufferedCpu in calculatorCore.js)"""
+    if isinstance(cpu_core, bool) or not isinstance(cpu_core, (int, float)) \
+            or cpu_core < 0 or not math.isfinite(cpu_core):
+        return 0
+    return math.ceil(cpu_core * BUFFER_MULTIPLIER)
+
+
+def namespace_costs(ns, config_loader):
+    """
+    (cpuCoresTotal, bufferedCpu, recommendedSize, monthlyCost, annualCost,
+    calculationError) of one raw namespace row (pods, cpu_req in millicores,
+    optional override_size), computed the way calculateNamespaceCost does in the browser
+    """
+    if not isinstance(ns, dict):
+        return namespace_error_costs('Invalid namespace data')
+    if "pods" not in ns or "cpu_req" not in ns:
+        return namespace_error_costs('Missing required fields')
+
+    pods = to_number(ns["pods"])
+    cpu_req = to_number(ns["cpu_req"])
+    if math.isnan(pods) or math.isnan(cpu_req):
+        return namespace_error_costs('Invalid numeric values')
+
+    # Zero or negative inputs cost nothing rather than failing, as in the JS
+    cpu_cores_total = pods * cpu_req / CPU_SCALING_FACTOR if pods > 0 and cpu_req > 0 else 0
+    if not math.isfinite(cpu_cores_total):
+        return namespace_error_costs('Invalid CPU calculation')
+
+    buffered_cpu = get_buffered_cpu(cpu_cores_total)
+    size = ns.get("override_size") or config_loader.select_tier(buffered_cpu)
+    # Tier prices are rounded once per config version in build_tier_costs
+    costs = config_loader.tier_costs.get(size)
+    if costs is None:
+        # Invalid override size, use the recommended size instead
+        size = config_loader.select_tier(buffered_cpu)
+        costs = config_loader.tier_costs.get(size, NO_TIER_COSTS)
+
+    return round_2dp(cpu_cores_total), buffered_cpu, size, costs[0], costs[1], None
+
+
+def namespace_error_costs(error_message):
+    """Zero costs for a row that couldn't be costed (createErrorResult in calculatorCore.js)"""
+    return 0, 0, FALLBACK_TIER, 0, 0, error_message
+
+
+def calculate_namespace_cost(ns, config_loader):
+    """
+    Cost one raw namespace row (pods, cpu_req in millicores, optional
+    override_size) the same way calculateNamespaceCost does in the browser
+    """
+    return namespace_row(ns, namespace_costs(ns, config_loader))
+
+
+def namespace_row(ns, costs):
+    """The costed row for a raw namespace row and its namespace_costs()"""
+    cpu_cores_total, buffered_cpu, size, monthly_cost, annual_cost, error = costs
+    return {
+        **(ns if isinstance(ns, dict) else {}),
+        "cpuCoresTotal": cpu_cores_total,
+        "bufferedCpu": buffered_cpu,
+        "recommendedSize": size,
+        "monthlyCost": monthly_cost,
+        "annualCost": annual_cost,
+        "calculationError": error
+    }
+
+
+def calculate_raw_costs(rows, config_loader=None, include_rows=True):
+    """
+    Cost raw namespace rows server-side and aggregate them per env in one pass.
+    Returns (costed rows, finalized per-env costs, totals); with
+    include_rows=False the costed rows aren't kept and memory stays O(environments).
+    """
+    if config_loader is None:
+        # Import here to avoid circular imports
+        from .config_store import config_store
+        config_loader = config_store.loader
+
+    totals = {"monthly": 0, "annual": 0, "namespaces": 0, "errors": 0}
+    if not include_rows:
+        return None, aggregate_raw_costs(rows, config_loader, totals), totals
+
+    costed_rows = []
+
+    def costed():
+        for ns in rows:
+            row = calculate_namespace_cost(ns, config_loader)
+            totals["monthly"] += row["monthlyCost"]
+            totals["annual"] += row["annualCost"]
+            totals["namespaces"] += 1
+            if row["calculationError"]:
+                totals["errors"] += 1
+            costed_rows.append(row)
+            yield row
+
+    finalized_costs = calculate_final_cost(costed(), config_loader)
+    return costed_rows, finalized_costs, totals
+
+
+def aggregate_raw_costs(rows, config_loader, totals):
+    """
+    calculate_raw_costs without the costed rows: each row's (env, size, cost)
+    goes straight into its env accumulator and only an env's first row is
+    turned into a row dict, for its NamespaceEntry
+    """
+    accumulators = {}
+    with metrics.timer('AggregateTime'):
+        for ns in rows:
+            costs = namespace_costs(ns, config_loader)
+            monthly_cost = costs[3]
+            annual_cost = costs[4]
+            totals["monthly"] += monthly_cost
+            totals["annual"] += annual_cost
+            totals["namespaces"] += 1
+            if costs[5]:
+                totals["errors"] += 1
+
+            env = ns.get("env", "default") if isinstance(ns, dict) else "default"
+            accumulator = accumulators.get(env)
+            if accumulator is None:
+                accumulator = accumulators[env] = EnvAccumulator()
+                accumulator.first_entry = NamespaceEntry.from_dict(namespace_row(ns, costs), env)
+            accumulator.namespace_count += 1
+            accumulator.total_monthly_cost += monthly_cost
+            accumulator.total_annual_cost += annual_cost
+
+    metrics.put('Rows', totals["namespaces"], COUNT)
+    return finalize_accumulators(accumulators, config_loader)
+
+
+def calculate_final_cost(results, config_loader=None):
     """
     Calculate finalized cost based on the actual user inputs
     FIXED: Uses correct CPU values (6 nonprod, 128 prod) to match Flask backend
+
+    Accepts a list, any iterable of entries (e.g. a generator over a parsed
+    JSON stream) or an env-grouped dict; memory is O(environments), not O(rows).
+    Uses the active config snapshot unless a config_loader is passed in.
     """
-    print(f"🔍 DEBUG calculate_final_cost: Input results type: {type(results)}")
-    print(f"🔍 DEBUG calculate_final_cost: Input results: {results}")
-    
-    # Import here to avoid circular imports
-    from .config_loader import config_loader
-    
-    finalized_results = {}
-    
-    # Handle both list format (from frontend) and dict format (from session)
-    if isinstance(results, list):
-        # Convert list to environment-grouped dict
-        env_groups = {}
-        for entry in results:
-            env = entry.get("env", "default")
-            if env not in env_groups:
-                env_groups[env] = []
-            env_groups[env].append(entry)
-        results = env_groups
-        print(f"🔍 DEBUG: Converted list to environment groups: {env_groups}")
-    
-    for env, env_entries in results.items():
-        print(f"🔍 DEBUG: Processing environment: {env} with {len(env_entries)} entries")
-        
-        namespace_count = len(env_entries)
-        
-        # FIXED: Use the ACTUAL monthlyCost and annualCost from frontend calculations
-        total_monthly_cost = 0
-        total_annual_cost = 0
-        
-        for entry in env_entries:
-            # Use actual costs calculated by frontend
-            monthly_cost = entry.get("monthlyCost", 0)
-            annual_cost = entry.get("annualCost", 0)
-            
-            total_monthly_cost += monthly_cost
-            total_annual_cost += annual_cost
-            
-            print(f"🔍 DEBUG: Namespace - Monthly: ${monthly_cost}, Annual: ${annual_cost}")
-        
-        print(f"🔍 DEBUG: Environment {env} - Total Monthly: ${total_monthly_cost}, Total Annual: ${total_annual_cost}")
-        
-        # FIXED: Use CORRECT CPU values that match Flask backend (6 nonprod, 128 prod)
-        if env == "prod":
-            cpu_per_namespace = 128  # 128 cores for production (matches Flask)
-        else:
-            cpu_per_namespace = 6    # 6 cores for non-prod (matches Flask)
-        
-        # Calculate total CPU based on namespace count and environment limits
-        total_cpu_cores = namespace_count * cpu_per_namespace
-        
-        print(f"🔍 DEBUG: Environment {env} - CPU per namespace: {cpu_per_namespace} cores, Total CPU: {total_cpu_cores} cores")
-        
-        # Apply 30% buffer
-        total_cpu_buffered_cores = math.ceil(total_cpu_cores * 1.3)
-        
-        print(f"🔍 DEBUG: CPU with 30% buffer: {total_cpu_buffered_cores} cores")
-        
-        # FIXED: Node count calculation that matches Flask backend exactly
-        if env == "prod":
-            # Production: 128 cores ÷ 56 nodes = ~2.29 cores per node
-            node_count = math.ceil(total_cpu_buffered_cores / 2.29)
+    if config_loader is None:
+        # Import here to avoid circular imports
+        from .config_store import config_store
+        config_loader = config_store.loader
+
+    with metrics.timer('AggregateTime'):
+        accumulators = aggregate_by_env(results)
+
+    finalized_results = finalize_accumulators(accumulators, config_loader)
+    metrics.put('Rows', sum(a.namespace_count for a in accumulators.values()), COUNT)
+
+    log.debug(
+        "calculate_final_cost done",
+        entries=lambda: sum(a.namespace_count for a in accumulators.values()),
+        environments=len(finalized_results)
+    )
+    return finalized_results
+
+
+def cost_column(rows, field):
+    """
+    One cost field of every row as a float64 array, plus a per-row "was a float"
+    mask (None when no row mixes ints and floats). Values are checked like
+    entry_costs(): plain numbers pass, anything else goes through to_cost().
+    """
+    values = [row.get(field, 0) for row in rows]
+    value_types = set(map(type, values))
+    if not value_types <= set(NUMBER_TYPES):
+        values = [value if type(value) in NUMBER_TYPES else to_cost(value, field) for value in values]
+        value_types = set(map(type, values))
+    column = np.fromiter(values, dtype=np.float64, count=len(values))
+    if value_types == {int, float}:
+        return column, np.fromiter((type(value) is float for value in values), dtype=bool, count=len(values))
+    return column, (float in value_types)
+
+
+def env_cost_sums(codes, column, is_float, env_count):
+    """
+    Per-env sums of a cost column. bincount adds in row order, so the floats
+    match the streaming sums exactly; envs whose rows were all ints stay ints.
+    """
+    sums = np.bincount(codes, weights=column, minlength=env_count)
+    if isinstance(is_float, np.ndarray):
+        has_float = np.bincount(codes, weights=is_float, minlength=env_count) > 0
+    else:
+        has_float = np.full(env_count, is_float)
+    return [float(total) if floats else int(total) for total, floats in zip(sums.tolist(), has_float.tolist())]
+
+
+def calculate_final_cost_batch(results, config_loader=None, sizing=DEFAULT_SIZING):
+    """
+    Columnar variant of calculate_final_cost for very large namespace sets
+    (100k+ rows). Env codes and costs are converted to NumPy columns once, and
+    per-env counts, cost sums, CPU, buffer and node counts are grouped
+    reductions over them. Returns the same FinalizedEnv records; falls back
+    to the streaming path when NumPy is not installed.
+    """
+    if np is None:
+        return calculate_final_cost(results, config_loader)
+
+    if config_loader is None:
+        # Import here to avoid circular imports
+        from .config_store import config_store
+        config_loader = config_store.loader
+
+    with metrics.timer('AggregateTime'):
+        if isinstance(results, dict):
+            groups = list(results.items())
+            for env, env_rows in groups:
+                if not isinstance(env_rows, list) or not all(isinstance(row, dict) for row in env_rows):
+                    # Raise the same InvalidRecordError as the streaming path
+                    for _ in iter_env_entries({env: env_rows}):
+                        pass
+            envs = [env for env, _ in groups]
+            rows = [row for _, env_rows in groups for row in env_rows]
+            group_sizes = [len(env_rows) for _, env_rows in groups]
+            codes = np.repeat(np.arange(len(groups), dtype=np.intp), group_sizes)
+            offsets = itertools.accumulate([0] + group_sizes[:-1])
+            first_rows = [offset if size else None for offset, size in zip(offsets, group_sizes)]
         else:
-            # Non-prod: 6 cores ÷ 3 nodes = 2 cores per node
-            node_count = math.ceil(total_cpu_buffered_cores / 2)
-        
-        print(f"🔍 DEBUG: Node count: {node_count}")
-        
-        # Get provisioner cost FROM USER INPUT
-        provisioner = env_entries[0].get("provisioner", "Tier1") if env_entries else "Tier1"
-        
-        # Get PDB and EKS version FROM USER INPUTS
-        pdb_value = env_entries[0].get("pdb", "minUnavailable = 1") if env_entries else "minUnavailable = 1"
-        eks_version = env_entries[0].get("eks_version", "v1.32") if env_entries else "v1.32"
-        cluster_name = env_entries[0].get("cluster", "Unknown Cluster") if env_entries else "Unknown Cluster"
-        
-        # Get tribe and find approver from orgMapping
-        tribe_name = env_entries[0].get("tribe", "") if env_entries else ""
-        approver = config_loader.find_approver(tribe_name) if tribe_name else "Unknown"
-        
-        # FIXED: Display CPU as numbers (cores) instead of millicores
-        finalized_results[env] = {
-            "cluster_name": cluster_name,
-            "provisioner": provisioner,
-            "pdb": pdb_value,
-            "eks_version": eks_version,
-            "namespace_count": namespace_count,
-            "total_cpu": f"{total_cpu_cores}",  # Just the number, no "m"
-            "total_cpu_buffered": f"{total_cpu_buffered_cores}",  # Just the number, no "m"
-            "node_count": node_count,
-            "monthly_cost": f"${total_monthly_cost:,.2f}",
-            "annual_cost": f"${total_annual_cost:,.2f}",
-            "raw_monthly": total_monthly_cost,
-            "raw_annual": total_annual_cost,
-            "tribe_approver": approver
+            rows = results if isinstance(results, list) else list(results)
+            try:
+                row_envs = [row.get("env", "default") for row in rows]
+            except AttributeError:
+                for _ in iter_env_entries(rows):
+                    pass
+                raise
+            # Env codes in order of first appearance, like the streaming accumulators
+            envs = list(dict.fromkeys(row_envs))
+            env_index = {env: code for code, env in enumerate(envs)}
+            codes = np.fromiter(map(env_index.__getitem__, row_envs), dtype=np.intp, count=len(row_envs))
+            first_rows = [row_envs.index(env) for env in envs]
+
+        env_count = len(envs)
+        monthly, monthly_is_float = cost_column(rows, "monthlyCost")
+        annual, annual_is_float = cost_column(rows, "annualCost")
+
+        namespace_counts = np.bincount(codes, minlength=env_count)
+        total_monthly = env_cost_sums(codes, monthly, monthly_is_float, env_count)
+        total_annual = env_cost_sums(codes, annual, annual_is_float, env_count)
+
+        # size_env, vectorized over envs
+        is_prod = np.fromiter((env == "prod" for env in envs), dtype=bool, count=env_count)
+        total_cpu = namespace_counts * np.where(
+            is_prod, sizing["prod_cpu_per_namespace"], sizing["nonprod_cpu_per_namespace"]
+        )
+        total_cpu_buffered = np.ceil(total_cpu * sizing["buffer"])
+        node_counts = np.ceil(
+            total_cpu_buffered / np.where(is_prod, sizing["prod_cores_per_node"], sizing["nonprod_cores_per_node"])
+        )
+
+        first_entries = [
+            NamespaceEntry.from_dict(rows[index], env) if index is not None else None
+            for env, index in zip(envs, first_rows)
+        ]
+
+    with metrics.timer('FinalizeTime'):
+        finalized_results = {
+            env: build_env_result(
+                first_entries[code], int(namespace_counts[code]), total_monthly[code], total_annual[code],
+                int(total_cpu[code]), int(total_cpu_buffered[code]), int(node_counts[code]), config_loader
+            )
+            for code, env in enumerate(envs)
         }
-    
-    print(f"🔍 DEBUG: Finalized results: {finalized_results}")
-    return finalized_results
\ No newline at end of file
+    metrics.put('Rows', len(rows), COUNT)
+
+    log.debug("calculate_final_cost_batch done", entries=len(rows), environments=env_count)
+    return finalized_results
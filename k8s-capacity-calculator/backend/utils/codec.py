@@ -0,0 +1,273 @@
+import base64
+import binascii
+import json
+import os
+import re
+import zlib
+
+try:
+    import orjson
+except ImportError:  # the stdlib json module is used when orjson is not installed
+    orjson = None
+
+# Largest request body accepted as received (after API Gateway, before base64/gzip decoding)
+MAX_BODY_BYTES = int(os.environ.get('MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+# Largest body after base64/gzip decoding; also bounds gzip bombs
+MAX_DECODED_BODY_BYTES = int(os.environ.get('MAX_DECODED_BODY_BYTES', str(64 * 1024 * 1024)))
+# Bodies at least this large have their big arrays decoded one element at a time,
+# trading some CPU for memory that no longer grows with the row count
+STREAM_THRESHOLD_BYTES = int(os.environ.get('JSON_STREAM_THRESHOLD_BYTES', str(4 * 1024 * 1024)))
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+_WHITESPACE_CHARS = frozenset(' \t\n\r')
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class CodecError(ValueError):
+    """Request body that can't be decoded; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def loads(data):
+    """Parse JSON from str or bytes with orjson when available"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # NaN/Infinity and other stdlib-only extensions: defer to json for the final word
+            pass
+    return json.loads(data)
+
+
+def dumps(payload):
+    """Serialize to a JSON str with orjson when available"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload).decode('utf-8')
+        except TypeError:
+            # Non-string keys, integers over 64 bits, ...
+            pass
+    return json.dumps(payload)
+
+
+def gunzip(data, limit=None):
+    """Decompress a gzip body, refusing to inflate past `limit` bytes"""
+    limit = MAX_DECODED_BODY_BYTES if limit is None else limit
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        inflated = decompressor.decompress(data, limit + 1)
+    except zlib.error as e:
+        raise CodecError(f'Invalid gzip body: {str(e)}')
+    if len(inflated) > limit:
+        raise CodecError(f'Decompressed body exceeds {limit} bytes', 413)
+    if not decompressor.eof:
+        raise CodecError('Invalid gzip body: truncated stream')
+    return inflated
+
+
+def decode_body(body, is_base64=False, content_encoding=None):
+    """
+    Raw request body with base64 (isBase64Encoded) and gzip (Content-Encoding)
+    undone and size limits enforced. Returns str or bytes; None when empty.
+    """
+    if body is None or body == '' or body == b'':
+        return None
+    if len(body) > MAX_BODY_BYTES:
+        raise CodecError(f'Request body exceeds {MAX_BODY_BYTES} bytes', 413)
+
+    if is_base64:
+        try:
+            body = base64.b64decode(body, validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise CodecError(f'Invalid base64 body: {str(e)}')
+
+    encoding = (content_encoding or '').strip().lower()
+    if encoding in ('gzip', 'x-gzip'):
+        body = gunzip(body if isinstance(body, bytes) else body.encode('latin-1'))
+    elif encoding and encoding != 'identity':
+        raise CodecError(f'Unsupported Content-Encoding: {encoding}', 415)
+
+    if len(body) > MAX_DECODED_BODY_BYTES:
+        raise CodecError(f'Decoded body exceeds {MAX_DECODED_BODY_BYTES} bytes', 413)
+    return body
+
+
+def _skip_whitespace(text, index):
+    return _whitespace.match(text, index).end()
+
+
+class StreamedArray:
+    """
+    A top-level JSON array member decoded lazily, one element per iteration step,
+    so a large `results` list never exists in memory as a whole. Iterating again
+    re-decodes from the raw text.
+    """
+
+    def __init__(self, text, start, on_end=None):
+        self.text = text
+        self.start = start
+        self.end = None
+        self._on_end = on_end
+
+    def __bool__(self):
+        index = _skip_whitespace(self.text, self.start + 1)
+        return self.text[index:index + 1] != ']'
+
+    def __iter__(self):
+        text = self.text
+        index = _skip_whitespace(text, self.start + 1)
+        if text[index:index + 1] == ']':
+            self._finish(index + 1)
+            return
+
+        raw_decode = _decoder.raw_decode
+        while True:
+            try:
+                value, index = raw_decode(text, index)
+            except ValueError as e:
+                raise CodecError(f'Invalid JSON body: {str(e)}')
+            yield value
+
+            # Fast path for the common ", " / "," separators
+            delimiter = text[index:index + 1]
+            if delimiter in _WHITESPACE_CHARS:
+                index = _skip_whitespace(text, index)
+                delimiter = text[index:index + 1]
+            index += 1
+            if text[index:index + 1] in _WHITESPACE_CHARS:
+                index = _skip_whitespace(text, index)
+            if delimiter == ']':
+                self._finish(index)
+                return
+            if delimiter != ',':
+                raise CodecError(f'Invalid JSON body: expected , or ] at char {index - 1}')
+
+    def _finish(self, end):
+        if self.end is None:
+            self.end = end
+            if self._on_end is not None:
+                self._on_end(end)
+
+
+def iter_json_array(stream, chunk_chars=1024 * 1024, max_element_chars=None):
+    """
+    Yield the elements of a top-level JSON array read from a text file object
+    `chunk_chars` at a time, so files far larger than memory can be processed
+    row by row. Only the undecoded tail of the current chunk is kept.
+    """
+    max_element_chars = MAX_DECODED_BODY_BYTES if max_element_chars is None else max_element_chars
+    buffer = ''
+    index = 0
+    eof = False
+    expect_value = None  # None until the opening bracket has been read
+    after_comma = False
+
+    raw_decode = _decoder.raw_decode
+    while True:
+        index = _skip_whitespace(buffer, index)
+        if index == len(buffer) and not eof:
+            buffer = stream.read(chunk_chars)
+            index = 0
+            eof = not buffer
+            continue
+
+        char = buffer[index:index + 1]
+        if expect_value is None:
+            if char != '[':
+                raise CodecError('Input must be a JSON array')
+            index += 1
+            expect_value = True
+            continue
+        if char == ']' and not after_comma:
+            # Only whitespace may follow the closing bracket
+            index = _skip_whitespace(buffer, index + 1)
+            while index == len(buffer) and not eof:
+                buffer = stream.read(chunk_chars)
+                index = _skip_whitespace(buffer, 0)
+                eof = not buffer
+            if index < len(buffer):
+                raise CodecError('Invalid JSON input: extra data after array')
+            return
+        if not expect_value:
+            if char != ',':
+                raise CodecError(f'Invalid JSON input: expected , or ] but got {char!r}')
+            index += 1
+            expect_value = after_comma = True
+            continue
+
+        try:
+            value, end = raw_decode(buffer, index)
+        except ValueError as e:
+            if eof:
+                raise CodecError(f'Invalid JSON input: {str(e)}')
+            if len(buffer) - index > max_element_chars:
+                raise CodecError(f'Invalid JSON input: array element exceeds {max_element_chars} chars ({str(e)})')
+            end = None
+        if end is None or (not eof and (end == len(buffer) or (
+                type(value) in (int, float) and buffer[end] in _NUMBER_CHARS))):
+            # The element continues in the next chunk (or a number was cut short)
+            more = stream.read(chunk_chars)
+            buffer = buffer[index:] + more
+            index = 0
+            eof = not more
+            continue
+        yield value
+        index = end
+        expect_value = after_comma = False
+
+
+def loads_streaming(text, stream_key):
+    """
+    Parse a JSON object, leaving the array under `stream_key` as a StreamedArray.
+    Members before the array are parsed up front; members after it are added to
+    the returned dict once the array has been iterated to the end.
+    """
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+
+    body = {}
+
+    def parse_members(index, first):
+        # Parses `"key": value` pairs until the closing brace or the streamed array
+        while True:
+            index = _skip_whitespace(text, index)
+            if text[index:index + 1] == '}':
+                if _skip_whitespace(text, index + 1) != len(text):
+                    raise CodecError('Invalid JSON body: extra data after object')
+                return
+            if not first:
+                if text[index:index + 1] != ',':
+                    raise CodecError(f'Invalid JSON body: expected , or }} at char {index}')
+                index = _skip_whitespace(text, index + 1)
+            first = False
+
+            try:
+                key, index = _decoder.raw_decode(text, index)
+            except ValueError as e:
+                raise CodecError(f'Invalid JSON body: {str(e)}')
+            index = _skip_whitespace(text, index)
+            if not isinstance(key, str) or text[index:index + 1] != ':':
+                raise CodecError(f'Invalid JSON body: expected "key": at char {index}')
+            index = _skip_whitespace(text, index + 1)
+
+            if key == stream_key and text[index:index + 1] == '[':
+                body[key] = StreamedArray(text, index, on_end=lambda end: parse_members(end, False))
+                return
+
+            try:
+                body[key], index = _decoder.raw_decode(text, index)
+            except ValueError as e:
+                raise CodecError(f'Invalid JSON body: {str(e)}')
+
+    start = _skip_whitespace(text, 0)
+    if text[start:start + 1] != '{':
+        raise CodecError('Request body must be a JSON object')
+    parse_members(start + 1, True)
+    return body
@@ -0,0 +1,198 @@
+import hashlib
+import io
+import math
+import os
+import pickle
+import struct
+
+BUNDLE_FILENAME = 'config_bundle.bin'
+# Packaged next to app.py by package-lambda.sh
+DEFAULT_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), BUNDLE_FILENAME)
+
+BUNDLE_MAGIC = b'K8SCFGBN'
+# Layout of the file; bump when the header or encoding changes
+BUNDLE_FORMAT = 1
+# Layout of the saved ConfigLoader state and the config schema it was validated
+# against; bump whenever either changes so stale bundles fail at cold start
+CONFIG_SCHEMA_VERSION = 1
+
+# magic, bundle format, config schema version, sha256 of the payload
+HEADER = struct.Struct('>8sHH32s')
+PICKLE_PROTOCOL = 4
+
+
+class ConfigError(Exception):
+    """Missing or invalid configs; raised at cold start instead of serving built-in fallbacks"""
+
+
+class ConfigBundleError(ConfigError):
+    """Config bundle that can't be built or loaded"""
+
+
+class DataUnpickler(pickle.Unpickler):
+    """Bundles hold plain data only; refusing every class lookup keeps loading free of code execution"""
+
+    def find_class(self, module, name):
+        raise ConfigBundleError(f'Config bundle references {module}.{name}; only plain data is allowed')
+
+
+def find_bundle_path():
+    """
+    Bundle to load at cold start: CONFIG_BUNDLE if set ('none' disables bundles),
+    none when CONFIG_DIR points at JSON configs, else the packaged bundle if present
+    """
+    configured = os.environ.get('CONFIG_BUNDLE')
+    if configured is not None:
+        return None if configured.strip().lower() in ('', 'none') else configured
+    if os.environ.get('CONFIG_DIR'):
+        return None
+    return DEFAULT_BUNDLE_PATH if os.path.exists(DEFAULT_BUNDLE_PATH) else None
+
+
+def write_bundle(path, state):
+    """Write loader state as a bundle, atomically replacing any existing file"""
+    payload = pickle.dumps(state, protocol=PICKLE_PROTOCOL)
+    header = HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT, CONFIG_SCHEMA_VERSION, hashlib.sha256(payload).digest())
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(header)
+        f.write(payload)
+    os.replace(temp_path, path)
+    return HEADER.size + len(payload)
+
+
+def read_bundle(path):
+    """Loader state from a bundle, with one read; any mismatch raises ConfigBundleError"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise ConfigBundleError(f'Cannot read config bundle {path}: {e}')
+
+    if len(data) < HEADER.size:
+        raise ConfigBundleError(f'{path} is not a config bundle (truncated header)')
+    magic, bundle_format, schema_version, digest = HEADER.unpack_from(data)
+    if magic != BUNDLE_MAGIC:
+        raise ConfigBundleError(f'{path} is not a config bundle')
+    if bundle_format != BUNDLE_FORMAT or schema_version != CONFIG_SCHEMA_VERSION:
+        raise ConfigBundleError(
+            f'Config bundle {path} has format {bundle_format}/schema {schema_version}, '
+            f'expected {BUNDLE_FORMAT}/{CONFIG_SCHEMA_VERSION}; rebuild it with package-lambda.sh'
+        )
+
+    payload = memoryview(data)[HEADER.size:]
+    if hashlib.sha256(payload).digest() != digest:
+        raise ConfigBundleError(f'Config bundle {path} is corrupt (checksum mismatch)')
+    try:
+        return DataUnpickler(io.BytesIO(payload)).load()
+    except ConfigBundleError:
+        raise
+    except Exception as e:
+        raise ConfigBundleError(f'Config bundle {path} is corrupt: {e}')
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def validate_configs(configs):
+    """Schema problems in the four config files, as readable messages (empty when valid)"""
+    errors = []
+
+    calculator_defaults = configs.get('calculatorDefaults')
+    if not isinstance(calculator_defaults, dict):
+        errors.append('calculatorDefaults.json: must be an object')
+    else:
+        pricing = calculator_defaults.get('pricing')
+        if not isinstance(pricing, dict) or not pricing:
+            errors.append('calculatorDefaults.json: "pricing" must be a non-empty object')
+        else:
+            for tier, info in pricing.items():
+                if not isinstance(info, dict):
+                    errors.append(f'calculatorDefaults.json: pricing.{tier} must be an object')
+                    continue
+                if not is_number(info.get('cpu_max')) or info['cpu_max'] <= 0:
+                    errors.append(f'calculatorDefaults.json: pricing.{tier}.cpu_max must be a positive number')
+                if not is_number(info.get('monthly')) or info['monthly'] < 0:
+                    errors.append(f'calculatorDefaults.json: pricing.{tier}.monthly must be a non-negative number')
+        defaults = calculator_defaults.get('defaults', {})
+        if not isinstance(defaults, dict) or not all(is_number(value) for value in defaults.values()):
+            errors.append('calculatorDefaults.json: "defaults" must be an object of numbers')
+        if calculator_defaults.get('instance_catalog') is not None:
+            # Import here to avoid circular imports
+            from .node_planner import catalog_errors
+            errors.extend(catalog_errors(calculator_defaults['instance_catalog'], 'calculatorDefaults.json: instance_catalog'))
+
+    cost_map = configs.get('costMap')
+    if not isinstance(cost_map, dict):
+        errors.append('costMap.json: must be an object')
+    else:
+        for provisioner, price in cost_map.items():
+            if not is_number(price) or price < 0:
+                errors.append(f'costMap.json: {provisioner} must be a non-negative number')
+
+    env_defaults = configs.get('defaults')
+    if not isinstance(env_defaults, dict):
+        errors.append('defaults.json: must be an object')
+    else:
+        for env, value in env_defaults.items():
+            # An env is either its own settings or the name of another env ("dev": "nonprod")
+            if isinstance(value, str):
+                if not isinstance(env_defaults.get(value), dict):
+                    errors.append(f'defaults.json: {env} refers to "{value}", which is not an env object')
+            elif not isinstance(value, dict):
+                errors.append(f'defaults.json: {env} must be an object or the name of another env')
+
+    org_mapping = configs.get('orgMapping')
+    if not isinstance(org_mapping, list):
+        errors.append('orgMapping.json: must be a list')
+    else:
+        for position, approver_data in enumerate(org_mapping):
+            where = f'orgMapping.json: [{position}]'
+            if not isinstance(approver_data, dict):
+                errors.append(f'{where} must be an object')
+                continue
+            if not isinstance(approver_data.get('approver'), str) or not approver_data['approver'].strip():
+                errors.append(f'{where}.approver must be a non-empty string')
+            tribes = approver_data.get('tribes')
+            if not isinstance(tribes, dict):
+                errors.append(f'{where}.tribes must be an object of category -> tribe list')
+                continue
+            for category, tribe_list in tribes.items():
+                if not isinstance(tribe_list, list) or not all(
+                        isinstance(tribe, str) and tribe.strip() for tribe in tribe_list):
+                    errors.append(f'{where}.tribes.{category} must be a list of non-empty tribe names')
+
+    return errors
+
+
+def build_bundle(config_dir, output_path):
+    """
+    Load the JSON configs from `config_dir` (no fallbacks), validate them,
+    build every derived index once and write the bundle. Returns the loader
+    and the bundle size in bytes.
+    """
+    # Import here to avoid circular imports
+    from .config_loader import CONFIG_FILES, ConfigLoader
+
+    config_dir = os.path.abspath(config_dir)
+    previous = os.environ.get('CONFIG_DIR')
+    os.environ['CONFIG_DIR'] = config_dir
+    try:
+        # Collect every problem instead of stopping at the first
+        loader = ConfigLoader(use_bundle=False, allow_fallback=True)
+    finally:
+        if previous is None:
+            del os.environ['CONFIG_DIR']
+        else:
+            os.environ['CONFIG_DIR'] = previous
+
+    errors = list(loader.config_errors)
+    for filename in CONFIG_FILES.values():
+        source = loader.config_sources.get(filename)
+        if source is not None and os.path.dirname(os.path.abspath(source)) != config_dir:
+            errors.append(f'{filename}: missing or unreadable in {config_dir} (found in {os.path.dirname(source)})')
+    if errors:
+        raise ConfigBundleError('Invalid configs:\n  ' + '\n  '.join(errors))
+
+    return loader, write_bundle(output_path, loader.export_state())
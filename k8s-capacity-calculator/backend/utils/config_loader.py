@@ -1,23 +1,262 @@
+import bisect
+import hashlib
 import json
+import math
 import os
+import threading
+import time
+from types import MappingProxyType
+
+from .codec import dumps
+from .config_bundle import BUNDLE_FILENAME, ConfigError, find_bundle_path, read_bundle, validate_configs
+from .logger import get_logger
+from .metrics import MILLISECONDS, metrics
+from .records import NUMBER_TYPES, round_2dp
+from .tribe_search import TribeSearchIndex, normalize_tribe
+
+log = get_logger('config_loader')
+
+UNKNOWN_APPROVER = "Unknown Approver"
+
+# Config name -> file, for the four calculator configs
+CONFIG_FILES = MappingProxyType({
+    'calculatorDefaults': 'calculatorDefaults.json',
+    'costMap': 'costMap.json',
+    'defaults': 'defaults.json',
+    'orgMapping': 'orgMapping.json'
+})
+
+# Fallback pricing for Tiers, used when a provisioner isn't in either config
+FALLBACK_TIER_PRICING = MappingProxyType({
+    "Tier1": 413.46,
+    "Tier2": 583.84,
+    "Tier3": 1102.56,
+    "Tier4": 2205.12
+})
+# Same fallback size as calculatorCore.js
+FALLBACK_TIER = 'XL'
+
+
+def fallback_allowed():
+    """CONFIG_ALLOW_FALLBACK=1 serves built-in defaults for missing or invalid configs instead of failing"""
+    return os.environ.get('CONFIG_ALLOW_FALLBACK', '').strip().lower() in ('1', 'true', 'yes')
+
 
 class ConfigLoader:
-    def __init__(self):
+    def __init__(self, use_bundle=True, allow_fallback=None):
         self.configs = {}
-        self.load_all_configs()
+        self.tribe_approvers = MappingProxyType({})
+        self.tribe_categories = MappingProxyType({})
+        self.tribe_hierarchy = MappingProxyType({})
+        self.search_index = None
+        self.index_conflicts = ()
+        self.provisioner_prices = MappingProxyType({})
+        self.tier_names = ()
+        self.tier_monthly = MappingProxyType({})
+        self.tier_costs = MappingProxyType({})
+        self.tier_cpu_max = ()
+        self.config_dir = None
+        self.config_sources = {}
+        # Missing or unparseable files and schema problems found while loading the JSON configs;
+        # any of them fails the load unless fallbacks are allowed
+        self.config_errors = []
+        self.fallback_configs = []
+        self.allow_fallback = fallback_allowed() if allow_fallback is None else allow_fallback
+        self.version = None
+        self.load_timings = {}
+        self.bundle_path = None
+        # Serialized /api/config body; compiled into bundles, else built on first use
+        self.config_body = None
+
+        bundle_path = find_bundle_path() if use_bundle else None
+        if bundle_path:
+            self.load_bundle(bundle_path)
+        else:
+            self.load_all_configs()
     
     def load_all_configs(self):
-        """Load all configuration files"""
-        config_files = {
-            'calculatorDefaults': 'calculatorDefaults.json',
-            'costMap': 'costMap.json', 
-            'defaults': 'defaults.json',
-            'orgMapping': 'orgMapping.json'
-        }
-        
-        for config_name, filename in config_files.items():
+        """Load all configuration files; raises ConfigError on any problem unless fallbacks are allowed"""
+        started = time.perf_counter()
+        for config_name, filename in CONFIG_FILES.items():
             self.configs[config_name] = self.load_config_file(filename)
+        self.load_timings['load_configs_ms'] = round((time.perf_counter() - started) * 1000, 3)
+
+        for error in validate_configs(self.configs):
+            log.warning("Config schema problem", detail=error)
+            self.config_errors.append(error)
+        if self.config_errors:
+            if not self.allow_fallback:
+                raise ConfigError(
+                    'Invalid configs (CONFIG_ALLOW_FALLBACK=1 serves built-in defaults instead):\n  '
+                    + '\n  '.join(self.config_errors)
+                )
+            log.warning("Loaded configs with problems, using fallbacks",
+                        fallback_configs=self.fallback_configs, problems=self.config_errors)
+
+        # Content-derived version, so identical configs always share a version
+        canonical = json.dumps(self.configs, sort_keys=True, separators=(',', ':'))
+        self.version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
+
+        started = time.perf_counter()
+        self.build_org_index()
+        self.load_timings['build_org_index_ms'] = round((time.perf_counter() - started) * 1000, 3)
+
+        started = time.perf_counter()
+        self.build_search_index()
+        self.load_timings['build_search_index_ms'] = round((time.perf_counter() - started) * 1000, 3)
+
+        started = time.perf_counter()
+        self.build_pricing_table()
+        self.load_timings['build_pricing_table_ms'] = round((time.perf_counter() - started) * 1000, 3)
+
+        metrics.put('ConfigLoadTime', sum(self.load_timings.values()), MILLISECONDS)
+
+    def load_bundle(self, path):
+        """
+        Restore configs and every derived index from a bundle built by
+        build_config_bundle.py, with one file read and no rebuilding.
+        Raises ConfigBundleError rather than falling back to other configs.
+        """
+        started = time.perf_counter()
+        state = read_bundle(path)
+
+        self.configs = state['configs']
+        self.version = state['version']
+        self.tribe_approvers = MappingProxyType(state['tribe_approvers'])
+        self.tribe_categories = MappingProxyType(state['tribe_categories'])
+        self.tribe_hierarchy = MappingProxyType(state['tribe_hierarchy'])
+        self.index_conflicts = tuple(state['index_conflicts'])
+        self.search_index = TribeSearchIndex.from_state(state['search_index'])
+        self.provisioner_prices = MappingProxyType(state['provisioner_prices'])
+        self.tier_names = tuple(state['tier_names'])
+        self.tier_cpu_max = tuple(state['tier_cpu_max'])
+        self.tier_monthly = MappingProxyType(state['tier_monthly'])
+        self.build_tier_costs()
+        self.config_body = state['config_body']
+
+        self.bundle_path = path
+        self.config_dir = os.path.dirname(os.path.abspath(path))
+        # Revalidation watches the bundle itself, so replacing it reloads the configs
+        self.config_sources = {BUNDLE_FILENAME: path}
+        self.load_timings['load_bundle_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        log.info("Loaded config bundle", path=path, version=self.version)
+        metrics.put('ConfigLoadTime', sum(self.load_timings.values()), MILLISECONDS)
+
+    def export_state(self):
+        """Loaded configs and derived indexes as plain data, for config bundles"""
+        return {
+            'configs': self.configs,
+            'version': self.version,
+            'tribe_approvers': dict(self.tribe_approvers),
+            'tribe_categories': dict(self.tribe_categories),
+            'tribe_hierarchy': dict(self.tribe_hierarchy),
+            'index_conflicts': self.index_conflicts,
+            'search_index': self.search_index.get_state(),
+            'provisioner_prices': dict(self.provisioner_prices),
+            'tier_names': self.tier_names,
+            'tier_cpu_max': self.tier_cpu_max,
+            'tier_monthly': dict(self.tier_monthly),
+            'config_body': self.get_config_body()
+        }
+
+    def get_config_body(self):
+        """The /api/config response body for this config version, serialized once"""
+        if self.config_body is None:
+            self.config_body = dumps({
+                'success': True,
+                'config_version': self.version,
+                'configs': {
+                    'calculatorDefaults': self.get_calculator_defaults(),
+                    'costMap': self.get_cost_map(),
+                    'defaults': self.get_defaults(),
+                    'orgMapping': self.get_org_mapping()
+                },
+                'config_summary': self.get_config_summary()
+            })
+        return self.config_body
+
+    def build_org_index(self):
+        """
+        Build the immutable tribe -> approver, tribe -> category and
+        tribe -> (approver, category, tribe name) indexes from orgMapping
+        so lookups are a single dict hit instead of a scan.
+        The first mapping for a tribe wins; later conflicting entries are reported.
+        """
+        tribe_approvers = {}
+        tribe_categories = {}
+        tribe_hierarchy = {}
+        conflicts = []
+
+        for approver_data in self.get_org_mapping():
+            approver = approver_data.get('approver', '')
+            tribes = approver_data.get('tribes', {})
+
+            for category, tribe_list in tribes.items():
+                for tribe_name in tribe_list:
+                    key = normalize_tribe(tribe_name)
+                    if not key:
+                        continue
+
+                    if key not in tribe_approvers:
+                        tribe_approvers[key] = approver
+                        tribe_categories[key] = category
+                        tribe_hierarchy[key] = (approver, category, tribe_name)
+                    elif (tribe_approvers[key], tribe_categories[key]) == (approver, category):
+                        conflicts.append(f"duplicate tribe '{tribe_name}' under {approver}/{category}")
+                    else:
+                        conflicts.append(
+                            f"tribe '{tribe_name}' mapped to {approver}/{category}, "
+                            f"keeping {tribe_approvers[key]}/{tribe_categories[key]}"
+                        )
+
+        for conflict in conflicts:
+            log.warning("orgMapping conflict", detail=conflict)
+
+        self.tribe_approvers = MappingProxyType(tribe_approvers)
+        self.tribe_categories = MappingProxyType(tribe_categories)
+        self.tribe_hierarchy = MappingProxyType(tribe_hierarchy)
+        self.index_conflicts = tuple(conflicts)
     
+    def build_search_index(self):
+        """Build the prefix search index over tribes, categories and approvers for /api/search-tribes"""
+        self.search_index = TribeSearchIndex(self.get_org_mapping())
+
+    def build_pricing_table(self):
+        """
+        Compile pricing once per config version: a merged provisioner -> monthly
+        price map (calculatorDefaults over costMap over the Tier fallbacks) and
+        tiers sorted by cpu_max for bisect-based size selection
+        """
+        pricing_data = self.get_calculator_defaults().get('pricing', {})
+
+        prices = dict(FALLBACK_TIER_PRICING)
+        prices.update(self.get_cost_map())
+        for provisioner, info in pricing_data.items():
+            prices[provisioner] = info.get('monthly')
+
+        tiers = sorted(
+            (info['cpu_max'], provisioner)
+            for provisioner, info in pricing_data.items()
+            if isinstance(info.get('cpu_max'), (int, float))
+        )
+
+        self.provisioner_prices = MappingProxyType(prices)
+        self.tier_cpu_max = tuple(cpu_max for cpu_max, _ in tiers)
+        self.tier_names = tuple(provisioner for _, provisioner in tiers)
+        self.tier_monthly = MappingProxyType({provisioner: prices[provisioner] for provisioner in self.tier_names})
+        self.build_tier_costs()
+
+    def build_tier_costs(self):
+        """
+        Rounded (monthlyCost, annualCost) per tier, so costing a namespace row
+        is a dict lookup instead of two round_2dp calls
+        """
+        self.tier_costs = MappingProxyType({
+            provisioner: (round_2dp(monthly), round_2dp(monthly * 12))
+            for provisioner, monthly in self.tier_monthly.items()
+            if type(monthly) in NUMBER_TYPES
+        })
+
     def load_config_file(self, filename):
         """
         Load a specific config file from multiple possible locations
@@ -32,19 +271,34 @@ class ConfigLoader:
             # Absolute path fallback
             os.path.join(os.path.dirname(__file__), f'../frontend/assets/config/{filename}')
         ]
+
+        # Explicit override, e.g. an EFS mount holding hot-reloadable configs
+        if os.environ.get('CONFIG_DIR'):
+            possible_paths.insert(0, os.path.join(os.environ['CONFIG_DIR'], filename))
+
+        # Once one config has been found, try its directory first so the
+        # remaining files cost a single probe each
+        if self.config_dir:
+            possible_paths.insert(0, os.path.join(self.config_dir, filename))
         
         for path in possible_paths:
             if os.path.exists(path):
                 try:
                     with open(path, 'r') as f:
                         config_data = json.load(f)
-                        print(f"✅ Loaded {filename} from {path}")
+                        log.info("Loaded config", file=filename, path=path)
+                        self.config_dir = os.path.dirname(path)
+                        self.config_sources[filename] = path
                         return config_data
                 except Exception as e:
-                    print(f"❌ Error loading {filename} from {path}: {e}")
+                    log.error("Error loading config", file=filename, path=path, error=str(e))
+                    self.config_errors.append(f'{filename}: cannot load {path}: {e}')
         
         # Return fallback defaults if file not found
-        print(f"⚠️  {filename} not found, using fallback defaults")
+        log.warning("Config not found, using fallback defaults", file=filename)
+        self.config_sources[filename] = None
+        self.fallback_configs.append(filename)
+        self.config_errors.append(f'{filename}: not found (would fall back to built-in defaults)')
         return self.get_fallback_config(filename)
     
     def get_fallback_config(self, filename):
@@ -116,32 +370,37 @@ class ConfigLoader:
     def get_org_mapping(self):
         return self.configs.get('orgMapping', [])
     
-    def get_pricing(self, provisioner):
-        """Get pricing for a specific provisioner - FIXED for Tier pricing"""
+    def get_config_summary(self):
+        """Summarize which configs are loaded and what they provide"""
         calculator_defaults = self.get_calculator_defaults()
         cost_map = self.get_cost_map()
-        
-        # Try calculatorDefaults first, then costMap as fallback
-        pricing_data = calculator_defaults.get('pricing', {})
-        
-        # FIXED: Support both old (S,M,L) and new (Tier1,Tier2,Tier3) provisioner names
-        if provisioner in pricing_data:
-            return pricing_data[provisioner].get('monthly')
-        
-        # Also check costMap
-        if provisioner in cost_map:
-            return cost_map.get(provisioner)
-        
-        # Fallback pricing for Tiers
-        tier_pricing = {
-            "Tier1": 413.46,
-            "Tier2": 583.84, 
-            "Tier3": 1102.56,
-            "Tier4": 2205.12
+        defaults = self.get_defaults()
+        org_mapping = self.get_org_mapping()
+
+        return {
+            "calculatorDefaults_loaded": bool(calculator_defaults),
+            "costMap_loaded": bool(cost_map),
+            "defaults_loaded": bool(defaults),
+            "orgMapping_loaded": bool(org_mapping),
+            "available_provisioners": list(cost_map.keys()),
+            "available_environments": list(defaults.keys())
         }
-        
-        return tier_pricing.get(provisioner, 413.46)  # Default to Tier1
-    
+
+    def select_tier(self, cpu_cores):
+        """
+        Smallest tier whose cpu_max fits the (buffered) CPU cores, like
+        getStandardSize in calculatorCore.js; the largest tier if none fits
+        """
+        tier_names = self.tier_names
+        if not tier_names:
+            return FALLBACK_TIER
+        if isinstance(cpu_cores, bool) or not isinstance(cpu_cores, (int, float)) \
+                or cpu_cores < 0 or not math.isfinite(cpu_cores):
+            return FALLBACK_TIER
+
+        index = bisect.bisect_left(self.tier_cpu_max, cpu_cores)
+        return tier_names[min(index, len(tier_names) - 1)]
+
     def get_environment_defaults(self, env):
         """Get defaults for a specific environment"""
         defaults = self.get_defaults()
@@ -154,17 +413,23 @@ class ConfigLoader:
     
     def find_approver(self, tribe_name):
         """Find approver for a specific tribe"""
-        org_mapping = self.get_org_mapping()
-        
-        for approver_data in org_mapping:
-            approver = approver_data.get('approver', '')
-            tribes = approver_data.get('tribes', {})
-            
-            for category, tribe_list in tribes.items():
-                if tribe_name in tribe_list:
-                    return approver
-        
-        return "Unknown Approver"
+        return self.tribe_approvers.get(normalize_tribe(tribe_name), UNKNOWN_APPROVER)
+
+    def find_hierarchy(self, tribe_name):
+        """(approver, category, orgMapping tribe name) for a tribe, or None when unmapped"""
+        return self.tribe_hierarchy.get(normalize_tribe(tribe_name))
+
+# Global config loader instance, created on first use of `config_loader`
+# so importing this module (as build_config_bundle.py does) never loads a bundle
+_config_loader = None
+_config_loader_lock = threading.Lock()
+
 
-# Global config loader instance
-config_loader = ConfigLoader()
\ No newline at end of file
+def __getattr__(name):
+    global _config_loader
+    if name != 'config_loader':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _config_loader_lock:
+        if _config_loader is None:
+            _config_loader = ConfigLoader()
+    return _config_loader
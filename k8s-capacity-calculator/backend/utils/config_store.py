@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+from .config_loader import ConfigLoader, config_loader
+from .logger import get_logger
+
+DEFAULT_TTL_SECONDS = 60
+
+log = get_logger('config_store')
+
+
+class ConfigSnapshot:
+    """Immutable view of one loaded config version"""
+
+    __slots__ = ("loader", "version", "loaded_at", "source_stamps")
+
+    def __init__(self, loader, source_stamps, loaded_at=None):
+        self.loader = loader
+        self.version = loader.version
+        self.loaded_at = loaded_at or time.time()
+        self.source_stamps = source_stamps
+
+
+def stat_sources(config_sources):
+    """(mtime, size) per config file; None for missing files or fallbacks"""
+    stamps = {}
+    for filename, path in config_sources.items():
+        try:
+            stat = os.stat(path) if path else None
+            stamps[filename] = (stat.st_mtime_ns, stat.st_size) if stat else None
+        except OSError:
+            stamps[filename] = None
+    return stamps
+
+
+def reload_problems(current_loader, loader):
+    """
+    Reasons not to swap `loader` in for `current_loader`: files it couldn't
+    parse or validate, and configs that no longer load from the path they did
+    (another probed directory, or the built-in fallbacks)
+    """
+    problems = list(loader.config_errors)
+    for filename, path in current_loader.config_sources.items():
+        new_path = loader.config_sources.get(filename)
+        if path and new_path != path:
+            problems.append(f'{filename}: loaded from {path}, now from {new_path or "fallback defaults"}')
+    return problems
+
+
+class ConfigStore:
+    """
+    Holds the active ConfigSnapshot and revalidates it against the config
+    files every `ttl_seconds`. A reload builds a fresh ConfigLoader and swaps
+    it in atomically; requests already holding the old snapshot keep using it.
+    """
+
+    def __init__(self, loader=None, ttl_seconds=None):
+        if ttl_seconds is None:
+            ttl_seconds = float(os.environ.get('CONFIG_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        self.ttl_seconds = ttl_seconds
+        loader = loader or ConfigLoader()
+        self._snapshot = ConfigSnapshot(loader, stat_sources(loader.config_sources))
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def loader(self):
+        return self._snapshot.loader
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def on_swap(self, callback):
+        """Register callback(snapshot) to rebuild caches derived from the configs"""
+        self._listeners.append(callback)
+
+    def current(self):
+        """Return the active snapshot, revalidating first if the TTL has expired"""
+        if self.ttl_seconds > 0 and time.monotonic() - self._checked_at >= self.ttl_seconds:
+            self.revalidate()
+        return self._snapshot
+
+    def revalidate(self, force=False):
+        """
+        Reload the configs if any source file changed (or always, with force).
+        Only one caller reloads at a time; concurrent callers don't wait and
+        keep serving the current snapshot. A reload with broken or moved config
+        files is rejected and retried after the next TTL. Returns True if a new
+        version was swapped in.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        try:
+            self._checked_at = time.monotonic()
+            snapshot = self._snapshot
+            stamps = stat_sources(snapshot.loader.config_sources)
+            if not force and stamps == snapshot.source_stamps:
+                return False
+
+            loader = ConfigLoader()
+            problems = reload_problems(snapshot.loader, loader)
+            if problems:
+                # The stamps still differ, so the next TTL tries again
+                log.error("Config reload rejected, keeping current version", version=snapshot.version, problems=problems)
+                return False
+
+            new_snapshot = ConfigSnapshot(loader, stat_sources(loader.config_sources))
+            if new_snapshot.version == snapshot.version:
+                # Touched but unchanged; remember the new stamps and keep the loader and its caches
+                self._snapshot = ConfigSnapshot(snapshot.loader, new_snapshot.source_stamps, snapshot.loaded_at)
+                return False
+
+            self._snapshot = new_snapshot
+            log.info("Config reloaded", old_version=snapshot.version, new_version=new_snapshot.version)
+            for callback in self._listeners:
+                callback(new_snapshot)
+            return True
+        except Exception:
+            log.exception("Config reload failed", version=self._snapshot.version)
+            return False
+        finally:
+            self._reload_lock.release()
+
+
+# Global config store wrapping the already-loaded config_loader
+config_store = ConfigStore(config_loader)
@@ -0,0 +1,167 @@
+import csv
+import io
+import os
+
+from .calculator import EnvAccumulator, finalize_accumulators, iter_env_entries
+from .codec import CodecError, dumps, iter_json_array, loads
+from .metrics import COUNT, metrics
+from .records import InvalidRecordError, entry_costs
+from .rollup import TribeResolver
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson'
+}
+INPUT_FORMATS = ('json', 'ndjson', 'csv')
+
+# Output is flushed in chunks of about this many characters
+EXPORT_CHUNK_CHARS = int(os.environ.get('EXPORT_CHUNK_CHARS', str(64 * 1024)))
+
+# One column set for every record type; columns that don't apply are left empty (CSV) / null (NDJSON).
+# Costs are raw numbers, not the "$1,234.00" display strings.
+EXPORT_COLUMNS = (
+    'record', 'env', 'cluster', 'namespace', 'tribe', 'approver', 'category', 'provisioner',
+    'namespace_count', 'pods', 'total_cpu', 'total_cpu_buffered', 'node_count',
+    'monthly_cost', 'annual_cost'
+)
+NAMESPACE_RECORD = 'namespace'
+ENV_RECORD = 'env'
+TOTAL_RECORD = 'total'
+
+
+def iter_export_records(results, config_loader, include_namespaces=True):
+    """
+    Yield export records (dicts over EXPORT_COLUMNS) in one pass: a namespace
+    record per row as it is aggregated, then one record per env and a total.
+    Only the per-env accumulators are held, so memory doesn't grow with the rows.
+    """
+    resolve = TribeResolver(config_loader).resolve
+    accumulators = {}
+    rows = 0
+    for env, entry in iter_env_entries(results):
+        accumulator = accumulators.get(env)
+        if accumulator is None:
+            accumulator = accumulators[env] = EnvAccumulator()
+        if entry is None:
+            continue
+        if not isinstance(entry, dict):
+            raise InvalidRecordError(f'Each result must be an object, got {type(entry).__name__}')
+        accumulator.add(entry, env)
+        rows += 1
+
+        if include_namespaces:
+            monthly_cost, annual_cost = entry_costs(entry)
+            approver, category, _ = resolve(entry.get("tribe"))
+            yield {
+                'record': NAMESPACE_RECORD,
+                'env': env,
+                'cluster': entry.get("cluster"),
+                'namespace': entry.get("namespace"),
+                'tribe': entry.get("tribe"),
+                'approver': approver,
+                'category': category,
+                'provisioner': entry.get("provisioner", "Tier1"),
+                'pods': entry.get("pods"),
+                'monthly_cost': monthly_cost,
+                'annual_cost': annual_cost
+            }
+
+    metrics.put('Rows', rows, COUNT)
+    totals = {'namespace_count': 0, 'total_cpu': 0, 'total_cpu_buffered': 0, 'node_count': 0,
+              'monthly_cost': 0, 'annual_cost': 0}
+    for env, env_data in finalize_accumulators(accumulators, config_loader).items():
+        first_entry = accumulators[env].first_entry
+        record = {
+            'record': ENV_RECORD,
+            'env': env,
+            'cluster': env_data.cluster_name,
+            'tribe': first_entry.tribe if first_entry is not None else None,
+            'approver': env_data.tribe_approver,
+            'provisioner': env_data.provisioner,
+            'namespace_count': env_data.namespace_count,
+            'total_cpu': env_data.total_cpu,
+            'total_cpu_buffered': env_data.total_cpu_buffered,
+            'node_count': env_data.node_count,
+            'monthly_cost': env_data.raw_monthly,
+            'annual_cost': env_data.raw_annual
+        }
+        for key in totals:
+            totals[key] += record[key]
+        yield record
+
+    yield {'record': TOTAL_RECORD, **totals}
+
+
+def iter_csv_chunks(records, chunk_chars=None):
+    """CSV text (header first) in chunks of about `chunk_chars` characters"""
+    chunk_chars = EXPORT_CHUNK_CHARS if chunk_chars is None else chunk_chars
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    for record in records:
+        writer.writerow([record.get(column) for column in EXPORT_COLUMNS])
+        if buffer.tell() >= chunk_chars:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson_chunks(records, chunk_chars=None):
+    """One JSON object per line, in chunks of about `chunk_chars` characters"""
+    chunk_chars = EXPORT_CHUNK_CHARS if chunk_chars is None else chunk_chars
+    lines = []
+    size = 0
+    for record in records:
+        line = dumps({column: record.get(column) for column in EXPORT_COLUMNS})
+        lines.append(line)
+        size += len(line) + 1
+        if size >= chunk_chars:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+            size = 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def iter_export_chunks(results, config_loader, export_format, include_namespaces=True, chunk_chars=None):
+    """Encoded export of a result set as a generator of text chunks"""
+    records = iter_export_records(results, config_loader, include_namespaces)
+    if export_format == 'csv':
+        return iter_csv_chunks(records, chunk_chars)
+    if export_format == 'ndjson':
+        return iter_ndjson_chunks(records, chunk_chars)
+    raise ValueError(f"Unsupported export format: {export_format} (expected {', '.join(EXPORT_FORMATS)})")
+
+
+def guess_input_format(path):
+    """Input format from a file extension; JSON arrays by default"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if extension == '.csv':
+        return 'csv'
+    return 'json'
+
+
+def iter_input_rows(stream, input_format):
+    """
+    Result rows read from a text file object one at a time: a JSON array,
+    NDJSON (one object per line) or CSV with a header row. CSV costs arrive
+    as strings and are coerced like any other numeric-string cost.
+    """
+    if input_format == 'json':
+        return iter_json_array(stream)
+    if input_format == 'ndjson':
+        return (loads_line(line, number) for number, line in enumerate(stream, 1) if line.strip())
+    if input_format == 'csv':
+        return csv.DictReader(stream)
+    raise ValueError(f"Unsupported input format: {input_format} (expected {', '.join(INPUT_FORMATS)})")
+
+
+def loads_line(line, number):
+    try:
+        return loads(line)
+    except ValueError as e:
+        raise CodecError(f'Invalid JSON on line {number}: {str(e)}')
@@ -0,0 +1,176 @@
+import contextvars
+import json
+import logging
+import math
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+
+LOG_LEVEL = (os.environ.get('LOG_LEVEL') or 'INFO').upper()
+# Fraction of requests whose bodies are logged at DEBUG level (LOG_DEBUG_SAMPLE_RATE, read below)
+DEBUG_SAMPLE_RATE = 0.1
+# Longest serialized value kept per log field (LOG_MAX_FIELD_CHARS, read below)
+MAX_FIELD_CHARS = 2048
+
+_correlation_id = contextvars.ContextVar('correlation_id', default=None)
+_debug_sampled = contextvars.ContextVar('debug_sampled', default=False)
+
+
+def start_request(event=None, context=None):
+    """
+    Set up logging context for the current request and return its correlation id:
+    an incoming X-Correlation-Id / X-Request-Id header, the Lambda request id, or
+    a new uuid. Also decides once whether this request's bodies get debug-logged.
+    """
+    correlation_id = None
+    headers = (event or {}).get('headers') or {}
+    for key, value in headers.items():
+        if key.lower() in ('x-correlation-id', 'x-request-id') and value:
+            correlation_id = value
+            break
+
+    if not correlation_id:
+        correlation_id = getattr(context, 'aws_request_id', None) or str(uuid.uuid4())
+
+    _correlation_id.set(correlation_id)
+    _debug_sampled.set(_root.isEnabledFor(logging.DEBUG) and random.random() < DEBUG_SAMPLE_RATE)
+    return correlation_id
+
+
+def get_correlation_id():
+    return _correlation_id.get()
+
+
+def truncate(value, limit=None):
+    """Cut a field value down to `limit` characters of its serialized form"""
+    limit = MAX_FIELD_CHARS if limit is None else limit
+    if isinstance(value, (int, float, bool)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    if len(text) > limit:
+        return f"{text[:limit]}...(truncated {len(text) - limit} chars)"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, which CloudWatch Logs Insights can query directly"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'correlation_id': get_correlation_id()
+        }
+        for key, value in getattr(record, 'fields', {}).items():
+            entry[key] = truncate(value)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class StructuredLogger:
+    """
+    Level-gated structured logger. Field values may be callables; they are
+    only evaluated (and serialized) when the record is actually emitted.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def is_enabled(self, level):
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level, message, exc_info=False, **fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        resolved = {key: value() if callable(value) else value for key, value in fields.items()}
+        self.logger.log(level, message, exc_info=exc_info, extra={'fields': resolved})
+
+    def debug(self, message, **fields):
+        self.log(logging.DEBUG, message, **fields)
+
+    def debug_sampled(self, message, **fields):
+        """DEBUG record emitted only for the DEBUG_SAMPLE_RATE fraction of requests"""
+        if _debug_sampled.get():
+            self.log(logging.DEBUG, message, **fields)
+
+    def info(self, message, **fields):
+        self.log(logging.INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(logging.WARNING, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(logging.ERROR, message, **fields)
+
+    def exception(self, message, **fields):
+        self.log(logging.ERROR, message, exc_info=True, **fields)
+
+
+_root = logging.getLogger('k8s_calculator')
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(JsonFormatter())
+    _root.addHandler(_handler)
+    # The Lambda runtime installs its own root handler; don't log twice
+    _root.propagate = False
+
+
+def get_logger(name):
+    """Structured logger under the shared k8s_calculator namespace"""
+    return StructuredLogger(_root.getChild(name))
+
+
+def set_level(level_name):
+    """
+    Set the log level by name; an unknown name (e.g. a LOG_LEVEL typo) falls
+    back to INFO with a warning instead of failing every invocation
+    """
+    try:
+        _root.setLevel(level_name)
+    except ValueError:
+        _root.setLevel(logging.INFO)
+        get_logger('logger').warning("Unknown log level, using INFO", log_level=level_name)
+
+
+set_level(LOG_LEVEL)
+
+
+def parse_sample_rate(value):
+    """A sample rate clamped to [0, 1]; NaN and non-numbers are invalid"""
+    rate = float(value)
+    if math.isnan(rate):
+        raise ValueError(f"not a number: {value!r}")
+    return min(max(rate, 0.0), 1.0)
+
+
+def parse_field_chars(value):
+    """A positive whole number of characters"""
+    chars = int(value)
+    if chars < 1:
+        raise ValueError(f"must be at least 1: {value!r}")
+    return chars
+
+
+def env_setting(name, default, parse):
+    """
+    Read a numeric logging setting from the environment; a malformed value
+    falls back to the default with a warning instead of failing the import
+    """
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        get_logger('logger').warning("Invalid logging setting, using the default", setting=name, value=value,
+                                     default=default)
+        return default
+
+
+DEBUG_SAMPLE_RATE = env_setting('LOG_DEBUG_SAMPLE_RATE', DEBUG_SAMPLE_RATE, parse_sample_rate)
+MAX_FIELD_CHARS = env_setting('LOG_MAX_FIELD_CHARS', MAX_FIELD_CHARS, parse_field_chars)
@@ -0,0 +1,230 @@
+import bisect
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .logger import get_correlation_id
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'K8sCapacityCalculator')
+# stdout (EMF lines picked up from CloudWatch Logs) | memory | none
+METRICS_SINK = os.environ.get('METRICS_SINK', 'stdout').lower()
+# Recent values kept per metric for /api/metrics
+METRICS_HISTORY = int(os.environ.get('METRICS_HISTORY', '1000'))
+
+MILLISECONDS = 'Milliseconds'
+COUNT = 'Count'
+BYTES = 'Bytes'
+
+# Upper bounds (ms) of the latency histogram buckets shown by /api/metrics
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class StdoutSink:
+    """Writes EMF records as JSON lines; in Lambda they become CloudWatch metrics"""
+
+    def emit(self, record):
+        sys.stdout.write(json.dumps(record, default=str) + '\n')
+        sys.stdout.flush()
+
+
+class MemorySink:
+    """Keeps emitted EMF records in a bounded list, for tests and local runs"""
+
+    def __init__(self, max_records=1000):
+        self.records = deque(maxlen=max_records)
+
+    def emit(self, record):
+        self.records.append(record)
+
+    def clear(self):
+        self.records.clear()
+
+
+class RequestMetrics:
+    """Metric values and properties collected during one request"""
+
+    __slots__ = ('dimensions', 'properties', 'values', 'units')
+
+    def __init__(self, dimensions, properties):
+        self.dimensions = dimensions
+        self.properties = properties
+        self.values = {}
+        self.units = {}
+
+    def put(self, name, value, unit):
+        # Repeated timers within a request (e.g. one approver lookup per env) add up
+        self.values[name] = self.values.get(name, 0) + value
+        self.units[name] = unit
+
+
+class MetricHistory:
+    """The last `size` observations of one metric"""
+
+    def __init__(self, unit, size):
+        self.unit = unit
+        self.values = deque(maxlen=size)
+        self.total_count = 0
+
+    def add(self, value):
+        self.values.append(value)
+        self.total_count += 1
+
+    def summary(self):
+        values = sorted(self.values)
+        if not values:
+            return {'unit': self.unit, 'count': 0, 'total_count': self.total_count}
+
+        def percentile(fraction):
+            return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+        summary = {
+            'unit': self.unit,
+            'count': len(values),
+            'total_count': self.total_count,
+            'min': round(values[0], 3),
+            'max': round(values[-1], 3),
+            'mean': round(sum(values) / len(values), 3),
+            'p50': round(percentile(0.50), 3),
+            'p95': round(percentile(0.95), 3),
+            'p99': round(percentile(0.99), 3)
+        }
+        if self.unit == MILLISECONDS:
+            counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+            for value in values:
+                counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+            labels = [f"<={bound}" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}"]
+            summary['buckets'] = dict(zip(labels, counts))
+        return summary
+
+
+class MetricsRecorder:
+    """
+    Collects per-request timings and counters and flushes them as one CloudWatch
+    Embedded Metric Format record per request. Values recorded outside a request
+    (e.g. config loading during init) only go into the recent-value histories.
+    """
+
+    def __init__(self, sink=None, namespace=METRICS_NAMESPACE, history_size=METRICS_HISTORY):
+        self.sink = sink
+        self.namespace = namespace
+        self.history_size = history_size
+        self.histories = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def start(self, dimensions=None, **properties):
+        """Begin collecting metrics for the current request"""
+        if self.sink is None:
+            return None
+        request_metrics = RequestMetrics(dimensions or {}, properties)
+        _current.set(request_metrics)
+        return request_metrics
+
+    def put(self, name, value, unit=COUNT):
+        if self.sink is None:
+            return
+        request_metrics = _current.get()
+        if request_metrics is None:
+            self.observe(name, value, unit)
+        else:
+            request_metrics.put(name, value, unit)
+
+    def set_property(self, key, value):
+        request_metrics = _current.get()
+        if request_metrics is not None:
+            request_metrics.properties[key] = value
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block in milliseconds under `name`"""
+        if self.sink is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.put(name, (time.perf_counter() - started) * 1000, MILLISECONDS)
+
+    def timed(self, name):
+        """Decorator form of timer()"""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def observe(self, name, value, unit):
+        with self._lock:
+            history = self.histories.get(name)
+            if history is None:
+                history = self.histories[name] = MetricHistory(unit, self.history_size)
+            history.add(value)
+
+    def flush(self):
+        """Emit the current request's metrics as an EMF record and end the request"""
+        request_metrics = _current.get()
+        if request_metrics is None:
+            return None
+        _current.set(None)
+
+        for name, value in request_metrics.values.items():
+            self.observe(name, value, request_metrics.units[name])
+
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': self.namespace,
+                    'Dimensions': [list(request_metrics.dimensions)],
+                    'Metrics': [
+                        {'Name': name, 'Unit': unit} for name, unit in request_metrics.units.items()
+                    ]
+                }]
+            },
+            **request_metrics.dimensions,
+            **request_metrics.properties,
+            'correlation_id': get_correlation_id(),
+            **{
+                name: round(value, 3) if isinstance(value, float) else value
+                for name, value in request_metrics.values.items()
+            }
+        }
+        try:
+            self.sink.emit(record)
+        except Exception:
+            # Metrics must never fail a request
+            pass
+        return record
+
+    def snapshot(self):
+        """Summaries of the recent values of every metric"""
+        with self._lock:
+            histories = dict(self.histories)
+        return {name: history.summary() for name, history in sorted(histories.items())}
+
+
+def create_metrics():
+    """Build the recorder from METRICS_SINK (stdout | memory | none)"""
+    if METRICS_SINK == 'none':
+        return MetricsRecorder(None)
+    if METRICS_SINK == 'memory':
+        return MetricsRecorder(MemorySink())
+    return MetricsRecorder(StdoutSink())
+
+
+# Global metrics recorder shared by app.py and utils
+metrics = create_metrics()
@@ -0,0 +1,200 @@
+import math
+
+from .calculator import iter_env_entries
+from .metrics import metrics
+from .records import NUMBER_TYPES
+
+# Allocatable capacity (CPU millicores, memory MiB) and on-demand monthly price per
+# instance type; override with "instance_catalog" in calculatorDefaults.json
+DEFAULT_INSTANCE_CATALOG = (
+    {"name": "m5.large", "cpu": 1930, "memory": 7100, "monthly": 70.08},
+    {"name": "m5.xlarge", "cpu": 3920, "memory": 14500, "monthly": 140.16},
+    {"name": "m5.2xlarge", "cpu": 7910, "memory": 29800, "monthly": 280.32},
+    {"name": "m5.4xlarge", "cpu": 15890, "memory": 60000, "monthly": 560.64},
+)
+
+
+def get_instance_catalog(config_loader):
+    """Instance catalog from calculatorDefaults.json, or the built-in m5 catalog"""
+    catalog = config_loader.get_calculator_defaults().get('instance_catalog')
+    return tuple(catalog) if catalog else DEFAULT_INSTANCE_CATALOG
+
+
+def is_positive_number(value):
+    return type(value) in NUMBER_TYPES and math.isfinite(value) and value > 0
+
+
+def catalog_errors(catalog, where='instance_catalog'):
+    """Problems with an instance catalog, as readable messages (empty when valid)"""
+    if not isinstance(catalog, list):
+        return [f'{where} must be a list of {{name, cpu, memory[, monthly]}} objects']
+    errors = []
+    for position, instance in enumerate(catalog):
+        item = f'{where}[{position}]'
+        if not isinstance(instance, dict):
+            errors.append(f'{item} must be an object')
+            continue
+        if not isinstance(instance.get('name'), str) or not instance['name'].strip():
+            errors.append(f'{item}.name must be a non-empty string')
+        for field in ('cpu', 'memory'):
+            if not is_positive_number(instance.get(field)):
+                errors.append(f'{item}.{field} must be a positive number')
+        if instance.get('monthly') is not None and not is_positive_number(instance['monthly']):
+            errors.append(f'{item}.monthly must be a positive number')
+    return errors
+
+
+def add_pod_shape(shapes, row, standard_pod_cpu, standard_pod_memory):
+    """
+    Count one namespace row's pods under its (cpu, memory) request shape.
+    Rows use pods, cpu_req (millicores per pod) and optionally mem_req (MiB per pod);
+    missing requests fall back to the standard pod size. Unusable rows are skipped.
+    """
+    try:
+        pods = int(row.get("pods") or 0)
+        cpu = int(math.ceil(float(row.get("cpu_req") or standard_pod_cpu)))
+        memory = int(math.ceil(float(row.get("mem_req") or standard_pod_memory)))
+    except (TypeError, ValueError):
+        return
+    if pods <= 0 or cpu <= 0 or memory < 0:
+        return
+    key = (cpu, memory)
+    shapes[key] = shapes.get(key, 0) + pods
+
+
+def pack_first_fit_decreasing(shapes, node_cpu, node_memory):
+    """
+    First-fit-decreasing packing of pod shapes onto identical nodes.
+
+    Nodes with the same free capacity are kept as one [free_cpu, free_memory, count]
+    group in opening order, and each shape is placed in bulk, so the cost depends on
+    the number of distinct shapes and groups rather than the number of pods.
+    Returns (node groups, unplaceable pod count).
+    """
+    if node_cpu <= 0 or node_memory <= 0:
+        # Buffered capacity rounds down to nothing; no pod fits
+        return [], sum(shapes.values())
+
+    # Largest dominant-resource share first
+    ordered = sorted(
+        shapes.items(),
+        key=lambda item: max(item[0][0] / node_cpu, item[0][1] / node_memory),
+        reverse=True
+    )
+
+    groups = []
+    unplaceable = 0
+    for (cpu, memory), remaining in ordered:
+        index = 0
+        while remaining and index < len(groups):
+            free_cpu, free_memory, count = groups[index]
+            fit = free_cpu // cpu
+            if memory:
+                fit = min(fit, free_memory // memory)
+            if not fit:
+                index += 1
+                continue
+
+            # The first `filled` nodes of the group each take `fit` pods,
+            # the next one takes the leftover, the rest stay untouched
+            filled = min(count, remaining // fit)
+            remaining -= filled * fit
+            split = []
+            if filled:
+                split.append([free_cpu - fit * cpu, free_memory - fit * memory, filled])
+            if remaining and filled < count:
+                split.append([free_cpu - remaining * cpu, free_memory - remaining * memory, 1])
+                filled += 1
+                remaining = 0
+            if filled < count:
+                split.append([free_cpu, free_memory, count - filled])
+            groups[index:index + 1] = split
+            index += len(split)
+
+        if not remaining:
+            continue
+
+        per_node = node_cpu // cpu
+        if memory:
+            per_node = min(per_node, node_memory // memory)
+        if not per_node:
+            unplaceable += remaining
+            continue
+
+        full_nodes, leftover = divmod(remaining, per_node)
+        if full_nodes:
+            groups.append([node_cpu - per_node * cpu, node_memory - per_node * memory, full_nodes])
+        if leftover:
+            groups.append([node_cpu - leftover * cpu, node_memory - leftover * memory, 1])
+
+    return groups, unplaceable
+
+
+def plan_for_instance(shapes, instance, buffer=1.0):
+    """Pack pod shapes onto one instance type; buffer reserves headroom on every node"""
+    node_cpu = int(instance["cpu"] / buffer)
+    node_memory = int(instance["memory"] / buffer)
+    groups, unplaceable = pack_first_fit_decreasing(shapes, node_cpu, node_memory)
+
+    node_count = sum(count for _, _, count in groups)
+    requested_cpu = sum(cpu * pods for (cpu, _), pods in shapes.items())
+    requested_memory = sum(memory * pods for (_, memory), pods in shapes.items())
+    capacity_cpu = node_count * instance["cpu"]
+    capacity_memory = node_count * instance["memory"]
+    monthly = instance.get("monthly")
+
+    return {
+        "instance_type": instance["name"],
+        "node_count": node_count,
+        "unplaceable_pods": unplaceable,
+        "cpu_utilization": round(requested_cpu / capacity_cpu, 4) if capacity_cpu else 0,
+        "memory_utilization": round(requested_memory / capacity_memory, 4) if capacity_memory else 0,
+        "wasted_cpu_millicores": capacity_cpu - requested_cpu if node_count else 0,
+        "wasted_memory_mib": capacity_memory - requested_memory if node_count else 0,
+        "monthly_cost": round(node_count * monthly, 2) if monthly is not None else None
+    }
+
+
+def plan_nodes(shapes, catalog, buffer=1.0):
+    """
+    Plan nodes for one environment's pod shapes. Every instance type in the
+    catalog is evaluated; the cheapest one that fits all pods is recommended
+    (fewest nodes when prices are missing) and per-type node counts are returned.
+    """
+    plans = [plan_for_instance(shapes, instance, buffer) for instance in catalog]
+    feasible = [plan for plan in plans if not plan["unplaceable_pods"]]
+    best = min(
+        feasible or plans,
+        key=lambda plan: (plan["unplaceable_pods"], plan["monthly_cost"] or 0, plan["node_count"])
+    ) if plans else None
+
+    return {
+        "pod_count": sum(shapes.values()),
+        "pod_shapes": len(shapes),
+        "recommended": best,
+        "node_counts": {plan["instance_type"]: plan["node_count"] for plan in plans},
+        "alternatives": plans
+    }
+
+
+@metrics.timed('NodePlanTime')
+def plan_nodes_by_env(results, config_loader, catalog=None, buffer=1.0):
+    """
+    Plan nodes per env for a list/iterable of rows or an env-grouped dict.
+    Rows are streamed into per-env pod shape counts, so memory doesn't grow with pods.
+    """
+    defaults = config_loader.get_calculator_defaults().get('defaults', {})
+    standard_pod_cpu = defaults.get('standard_pod_cpu', 1000)
+    standard_pod_memory = defaults.get('standard_pod_memory', 4096)
+    catalog = catalog or get_instance_catalog(config_loader)
+
+    env_shapes = {}
+    for env, row in iter_env_entries(results):
+        shapes = env_shapes.setdefault(env, {})
+        if row is not None:
+            add_pod_shape(shapes, row, standard_pod_cpu, standard_pod_memory)
+
+    return {
+        env: plan_nodes(shapes, catalog, buffer)
+        for env, shapes in env_shapes.items()
+    }
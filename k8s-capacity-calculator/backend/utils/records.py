@@ -0,0 +1,134 @@
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+
+# Exact types only, so bools (an int subclass) still go through to_cost
+NUMBER_TYPES = (int, float)
+TWO_PLACES = Decimal('0.01')
+
+
+class InvalidRecordError(ValueError):
+    """Input row that can't be coerced into a record; answered with a 400"""
+
+
+def to_cost(value, field):
+    """Coerce a cost field once: numbers pass through, None/'' -> 0, numeric strings -> float"""
+    if type(value) in NUMBER_TYPES:
+        return value
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return 0
+        try:
+            number = float(value)
+        except ValueError:
+            number = math.nan
+        if math.isfinite(number):
+            return number
+    raise InvalidRecordError(f'{field} must be a number, got {value!r}')
+
+
+def round_2dp(value):
+    """parseFloat(value.toFixed(2)): ties round up on the exact binary value, unlike round()"""
+    if not math.isfinite(value) or abs(value) >= 1e21:
+        return value
+    return float(Decimal(value).quantize(TWO_PLACES, rounding=ROUND_HALF_UP))
+
+
+def entry_costs(entry):
+    """(monthlyCost, annualCost) of a row dict; plain numbers skip the coercion call"""
+    monthly = entry.get("monthlyCost", 0)
+    annual = entry.get("annualCost", 0)
+    if type(monthly) not in NUMBER_TYPES:
+        monthly = to_cost(monthly, "monthlyCost")
+    if type(annual) not in NUMBER_TYPES:
+        annual = to_cost(annual, "annualCost")
+    return monthly, annual
+
+
+class NamespaceEntry:
+    """
+    One namespace row as sent by the frontend, validated and coerced once.
+    Only rows that are kept (an env's first entry) become records; the
+    streaming totals read costs straight from the row via entry_costs().
+    """
+
+    __slots__ = ("env", "monthly_cost", "annual_cost", "provisioner", "pdb", "eks_version", "cluster", "tribe")
+
+    def __init__(self, env, monthly_cost=0, annual_cost=0, provisioner="Tier1", pdb="minUnavailable = 1",
+                 eks_version="v1.32", cluster="Unknown Cluster", tribe=""):
+        self.env = env
+        self.monthly_cost = monthly_cost
+        self.annual_cost = annual_cost
+        self.provisioner = provisioner
+        self.pdb = pdb
+        self.eks_version = eks_version
+        self.cluster = cluster
+        self.tribe = tribe
+
+    @classmethod
+    def from_dict(cls, data, env=None):
+        """Build from a row dict; `env` overrides the row's own (env-grouped input)"""
+        if isinstance(data, cls):
+            return data
+        if not isinstance(data, dict):
+            raise InvalidRecordError(f'Each result must be an object, got {type(data).__name__}')
+        monthly_cost, annual_cost = entry_costs(data)
+        return cls(
+            env if env is not None else data.get("env", "default"),
+            monthly_cost,
+            annual_cost,
+            data.get("provisioner", "Tier1"),
+            data.get("pdb", "minUnavailable = 1"),
+            data.get("eks_version", "v1.32"),
+            data.get("cluster", "Unknown Cluster"),
+            data.get("tribe", "")
+        )
+
+
+class FinalizedEnv:
+    """
+    Finalized cost of one environment, kept as raw values; to_dict() does the
+    display formatting only when the response is serialized
+    """
+
+    __slots__ = ("cluster_name", "provisioner", "pdb", "eks_version", "namespace_count", "total_cpu",
+                 "total_cpu_buffered", "node_count", "raw_monthly", "raw_annual", "tribe_approver", "node_plan")
+
+    def __init__(self, cluster_name, provisioner, pdb, eks_version, namespace_count, total_cpu,
+                 total_cpu_buffered, node_count, raw_monthly, raw_annual, tribe_approver, node_plan=None):
+        self.cluster_name = cluster_name
+        self.provisioner = provisioner
+        self.pdb = pdb
+        self.eks_version = eks_version
+        self.namespace_count = namespace_count
+        self.total_cpu = total_cpu
+        self.total_cpu_buffered = total_cpu_buffered
+        self.node_count = node_count
+        self.raw_monthly = raw_monthly
+        self.raw_annual = raw_annual
+        self.tribe_approver = tribe_approver
+        self.node_plan = node_plan
+
+    def to_dict(self):
+        # FIXED: Display CPU as numbers (cores) instead of millicores
+        result = {
+            "cluster_name": self.cluster_name,
+            "provisioner": self.provisioner,
+            "pdb": self.pdb,
+            "eks_version": self.eks_version,
+            "namespace_count": self.namespace_count,
+            "total_cpu": f"{self.total_cpu}",  # Just the number, no "m"
+            "total_cpu_buffered": f"{self.total_cpu_buffered}",  # Just the number, no "m"
+            "node_count": self.node_count,
+            "monthly_cost": f"${self.raw_monthly:,.2f}",
+            "annual_cost": f"${self.raw_annual:,.2f}",
+            "raw_monthly": self.raw_monthly,
+            "raw_annual": self.raw_annual,
+            "tribe_approver": self.tribe_approver
+        }
+        if self.node_plan is not None:
+            result["node_plan"] = self.node_plan
+        return result
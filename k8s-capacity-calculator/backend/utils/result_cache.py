@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from .logger import get_logger
+
+log = get_logger('result_cache')
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_SQLITE_PATH = '/tmp/k8s-calculator-result-cache.sqlite3'  # /tmp is writable in Lambda
+
+
+def canonical_key(payload, config_version, namespace=''):
+    """Content hash of a request payload, independent of key order, tied to a config version"""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256()
+    digest.update(f"{namespace}\0{config_version}\0".encode('utf-8'))
+    digest.update(canonical.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CacheBackend(ABC):
+    """Storage interface for serialized response bodies keyed by content hash"""
+
+    @abstractmethod
+    def get(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key, value):
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def size_bytes(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self):
+        raise NotImplementedError
+
+
+class MemoryLRUBackend(CacheBackend):
+    """In-process LRU bounded by the total size of the stored bodies"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def size_bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    File-backed LRU shared by every process on the host (e.g. local_server.py
+    workers). Entries are evicted least-recently-used first once over max_bytes.
+    The total size is kept up to date by triggers in a one-row table, so every
+    process sees the same total without summing the entries on each insert.
+    """
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache ('
+                ' key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS result_cache_accessed ON result_cache (accessed)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS result_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS result_cache_inserted AFTER INSERT ON result_cache BEGIN'
+                ' UPDATE result_cache_size SET total = total + NEW.size WHERE id = 0; END'
+            )
+            connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS result_cache_updated AFTER UPDATE OF size ON result_cache BEGIN'
+                ' UPDATE result_cache_size SET total = total + NEW.size - OLD.size WHERE id = 0; END'
+            )
+            connection.execute(
+                'CREATE TRIGGER IF NOT EXISTS result_cache_deleted AFTER DELETE ON result_cache BEGIN'
+                ' UPDATE result_cache_size SET total = total - OLD.size WHERE id = 0; END'
+            )
+            # Cache files written before the running total existed start from their current size
+            connection.execute(
+                'INSERT OR IGNORE INTO result_cache_size (id, total)'
+                ' SELECT 0, COALESCE(SUM(size), 0) FROM result_cache'
+            )
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        connection = self._connect()
+        row = connection.execute('SELECT value FROM result_cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        connection.execute('UPDATE result_cache SET accessed = ? WHERE key = ?', (time.time(), key))
+        return row[0].decode('utf-8')
+
+    def set(self, key, value):
+        data = value.encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+        connection = self._connect()
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete wouldn't fire the size trigger
+        connection.execute(
+            'INSERT INTO result_cache (key, value, size, accessed) VALUES (?, ?, ?, ?)'
+            ' ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, accessed = excluded.accessed',
+            (key, data, len(data), time.time())
+        )
+        total = self.size_bytes()
+        if total > self.max_bytes:
+            self._evict(connection, total - self.max_bytes)
+
+    def _evict(self, connection, excess):
+        freed = 0
+        stale = []
+        # Least recently used first, read only as far as needed
+        rows = connection.execute('SELECT key, size FROM result_cache ORDER BY accessed')
+        for key, size in rows:
+            if freed >= excess:
+                break
+            stale.append((key,))
+            freed += size
+        rows.close()
+        connection.executemany('DELETE FROM result_cache WHERE key = ?', stale)
+
+    def clear(self):
+        self._connect().execute('DELETE FROM result_cache')
+
+    def size_bytes(self):
+        return self._connect().execute('SELECT total FROM result_cache_size WHERE id = 0').fetchone()[0]
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM result_cache').fetchone()[0]
+
+
+class ResultCache:
+    """Pre-serialized response cache with hit/miss counters over a pluggable backend"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            log.warning("Result cache read failed", error=str(e))
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            log.warning("Result cache write failed", error=str(e))
+
+    def stats(self):
+        if self.backend is None:
+            return {'enabled': False}
+        lookups = self.hits + self.misses
+        return {
+            'enabled': True,
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'size_bytes': self.backend.size_bytes(),
+            'max_bytes': self.backend.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def create_result_cache():
+    """Build the cache from RESULT_CACHE_BACKEND (memory | sqlite | none) and related settings"""
+    backend_name = os.environ.get('RESULT_CACHE_BACKEND', 'memory').lower()
+    max_bytes = int(os.environ.get('RESULT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+    if backend_name == 'none':
+        return ResultCache(None)
+    if backend_name == 'sqlite':
+        try:
+            path = os.environ.get('RESULT_CACHE_PATH', DEFAULT_SQLITE_PATH)
+            return ResultCache(SQLiteBackend(path, max_bytes))
+        except sqlite3.Error as e:
+            log.warning("SQLite result cache unavailable, using memory", error=str(e))
+    return ResultCache(MemoryLRUBackend(max_bytes))
+
+
+# Global result cache for /api/finalize-cost
+result_cache = create_result_cache()
@@ -0,0 +1,155 @@
+from .calculator import iter_env_entries
+from .config_loader import UNKNOWN_APPROVER, normalize_tribe
+from .metrics import COUNT, metrics
+from .records import NUMBER_TYPES, InvalidRecordError, entry_costs
+
+# orgMapping hierarchy, outermost first; /api/rollup nests totals in any subset/order of these
+ROLLUP_LEVELS = ("env", "approver", "category", "tribe")
+LEVEL_CHILDREN = {
+    "env": "environments",
+    "approver": "approvers",
+    "category": "categories",
+    "tribe": "tribes"
+}
+ROW_COLUMNS = ROLLUP_LEVELS + ("namespace_count", "raw_monthly", "raw_annual")
+
+UNMAPPED_CATEGORY = "unmapped"
+NO_TRIBE = "(no tribe)"
+
+
+def parse_levels(levels):
+    """Validate the requested nesting order; defaults to env > approver > category > tribe"""
+    if levels is None:
+        return ROLLUP_LEVELS
+    if not isinstance(levels, list) or not levels or len(set(map(str, levels))) != len(levels):
+        raise ValueError(f"levels must be a non-empty list of distinct names from {', '.join(ROLLUP_LEVELS)}")
+    unknown = [level for level in levels if level not in ROLLUP_LEVELS]
+    if unknown:
+        raise ValueError(f"Unknown rollup levels: {', '.join(map(str, unknown))} (expected {', '.join(ROLLUP_LEVELS)})")
+    return tuple(levels)
+
+
+class TribeResolver:
+    """
+    Maps a row's raw tribe value to its (approver, category, tribe name) through
+    the config's precomputed hierarchy index, memoized per distinct raw value.
+    Unmapped tribes are grouped case/whitespace-insensitively under the first spelling seen.
+    """
+
+    def __init__(self, config_loader):
+        self.config_loader = config_loader
+        self.resolved = {}
+        self.unmapped = {}
+
+    def resolve(self, tribe):
+        if not isinstance(tribe, str):
+            tribe = ""
+        path = self.resolved.get(tribe)
+        if path is None:
+            path = self.config_loader.find_hierarchy(tribe)
+            if path is None:
+                key = normalize_tribe(tribe)
+                path = self.unmapped.get(key)
+                if path is None:
+                    path = self.unmapped[key] = (UNKNOWN_APPROVER, UNMAPPED_CATEGORY, " ".join(tribe.split()) or NO_TRIBE)
+            self.resolved[tribe] = path
+        return path
+
+
+@metrics.timed('RollupTime')
+def aggregate_rollup(results, config_loader):
+    """
+    Single streaming pass over results (list, iterable or env-grouped dict):
+    every row is attributed to its own tribe, category and approver and added
+    to one (env, approver, category, tribe) leaf of [count, monthly, annual].
+    Memory is O(leaves), not O(rows).
+    """
+    resolve = TribeResolver(config_loader).resolve
+    leaves = {}
+    for env, entry in iter_env_entries(results):
+        if entry is None:
+            continue
+        if not isinstance(entry, dict):
+            raise InvalidRecordError(f'Each result must be an object, got {type(entry).__name__}')
+
+        approver, category, tribe = resolve(entry.get("tribe"))
+        key = (env, approver, category, tribe)
+        leaf = leaves.get(key)
+        if leaf is None:
+            leaf = leaves[key] = [0, 0, 0]
+
+        monthly_cost = entry.get("monthlyCost", 0)
+        annual_cost = entry.get("annualCost", 0)
+        if type(monthly_cost) not in NUMBER_TYPES or type(annual_cost) not in NUMBER_TYPES:
+            monthly_cost, annual_cost = entry_costs(entry)
+        leaf[0] += 1
+        leaf[1] += monthly_cost
+        leaf[2] += annual_cost
+    return leaves
+
+
+def format_node(count, monthly, annual):
+    return {
+        "namespace_count": count,
+        "monthly_cost": f"${monthly:,.2f}",
+        "annual_cost": f"${annual:,.2f}",
+        "raw_monthly": monthly,
+        "raw_annual": annual
+    }
+
+
+def build_tree(leaves, levels):
+    """
+    Nest leaf totals by `levels`, summing every intermediate level. Children
+    are ordered by monthly cost, largest first, then by name.
+    """
+    positions = [ROLLUP_LEVELS.index(level) for level in levels]
+    # node: [count, monthly, annual, {child name: node}]
+    root = [0, 0, 0, {}]
+    for key, (count, monthly, annual) in leaves.items():
+        node = root
+        node[0] += count
+        node[1] += monthly
+        node[2] += annual
+        for position in positions:
+            name = key[position]
+            child = node[3].get(name)
+            if child is None:
+                child = node[3][name] = [0, 0, 0, {}]
+            child[0] += count
+            child[1] += monthly
+            child[2] += annual
+            node = child
+
+    def render(node, depth):
+        result = format_node(node[0], node[1], node[2])
+        if depth < len(levels):
+            children = sorted(node[3].items(), key=lambda item: (-item[1][1], str(item[0])))
+            result[LEVEL_CHILDREN[levels[depth]]] = {
+                str(name): render(child, depth + 1) for name, child in children
+            }
+        return result
+
+    return render(root, 0)
+
+
+def build_rollup(leaves, levels=ROLLUP_LEVELS, include_rows=False):
+    """
+    Rollup payload from aggregate_rollup leaves: totals nested in `levels`
+    order and, with include_rows, the flat leaf rows (ROW_COLUMNS)
+    """
+    tree = build_tree(leaves, levels)
+    metrics.put('Rows', tree["namespace_count"], COUNT)
+    metrics.put('RollupGroups', len(leaves), COUNT)
+
+    rollup = {
+        "levels": list(levels),
+        "totals": {key: value for key, value in tree.items() if key != LEVEL_CHILDREN[levels[0]]},
+        "rollup": tree[LEVEL_CHILDREN[levels[0]]]
+    }
+    if include_rows:
+        rollup["columns"] = list(ROW_COLUMNS)
+        rows = sorted(leaves.items(), key=lambda item: tuple(map(str, item[0])))
+        rollup["rows"] = [list(key) + leaf for key, leaf in rows]
+    return rollup
+
@@ -0,0 +1,133 @@
+from .codec import STREAM_THRESHOLD_BYTES, CodecError, decode_body, dumps, loads, loads_streaming
+from .metrics import metrics
+
+# Shared CORS headers; header values are strings so HTTP API v2 accepts them as-is
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS, PUT, DELETE',
+    'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,X-Session-Id',
+    'Access-Control-Allow-Credentials': 'true',
+    'Access-Control-Expose-Headers': 'ETag,X-Config-Version,X-Session-Id'
+}
+
+
+class RequestError(Exception):
+    """Client error that should be returned as a JSON error response"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class Router:
+    """Route registry keyed by (method, path) for O(1) dispatch"""
+
+    def __init__(self):
+        self.routes = {}
+        # path -> registered methods, for the Allow header of a 405
+        self.path_methods = {}
+
+    def route(self, method, path):
+        """Decorator registering handler(event, headers) for a method and path"""
+        def register(handler):
+            key = (method.upper(), path)
+            if key in self.routes:
+                raise ValueError(f"Route already registered: {method} {path}")
+            self.routes[key] = handler
+            self.path_methods.setdefault(path, []).append(key[0])
+            return handler
+        return register
+
+    def resolve(self, method, path):
+        return self.routes.get((method, path))
+
+    def allowed_methods(self, path):
+        """Methods registered for a path (empty for unknown paths)"""
+        return self.path_methods.get(path, [])
+
+
+def build_headers(version=None):
+    """Build the JSON response header dict once per config version"""
+    headers = {**CORS_HEADERS, 'Content-Type': 'application/json'}
+    if version:
+        headers['X-Config-Version'] = version
+    return headers
+
+
+def get_request_method(event):
+    """HTTP method for REST API (v1) and HTTP API (v2) events"""
+    method = event.get('httpMethod')
+    if not method:
+        method = ((event.get('requestContext') or {}).get('http') or {}).get('method', 'GET')
+    return method.upper()
+
+
+def get_request_path(event):
+    """Request path for REST API (v1) and HTTP API (v2) events, without the stage prefix"""
+    path = event.get('path')
+    if path is None:
+        path = event.get('rawPath', '')
+        # HTTP API keeps named stages in rawPath, e.g. /dev/api/test
+        stage = (event.get('requestContext') or {}).get('stage')
+        if stage and stage != '$default' and path.startswith(f'/{stage}/'):
+            path = path[len(stage) + 1:]
+    return path
+
+
+def get_header(event, name):
+    """Case-insensitive request header lookup (REST v1 keeps client casing, HTTP API v2 lowercases)"""
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def get_query_param(event, name):
+    """Query string parameter for REST API (v1) and HTTP API (v2) events"""
+    return (event.get('queryStringParameters') or {}).get(name)
+
+
+def parse_json_body(event, stream_key=None):
+    """
+    Parse the request body into a dict; malformed JSON is a 400.
+    Base64 and gzip bodies are decoded first and size limits enforced. With
+    `stream_key`, a large body's array under that key is returned as a lazily
+    decoded StreamedArray (see codec.loads_streaming).
+    """
+    body = event.get('body')
+    if isinstance(body, dict):
+        return body
+    try:
+        with metrics.timer('ParseBodyTime'):
+            body = decode_body(body, event.get('isBase64Encoded'), get_header(event, 'Content-Encoding'))
+            if body is None:
+                return {}
+            if stream_key and len(body) >= STREAM_THRESHOLD_BYTES:
+                return loads_streaming(body, stream_key)
+            body = loads(body)
+    except CodecError as e:
+        raise RequestError(e.message, e.status_code)
+    except ValueError as e:
+        raise RequestError(f'Invalid JSON body: {str(e)}')
+    if not isinstance(body, dict):
+        raise RequestError('Request body must be a JSON object')
+    return body
+
+
+def json_response(status_code, payload, headers):
+    """Build a Lambda proxy response with a JSON body"""
+    with metrics.timer('SerializeTime'):
+        body = dumps(payload)
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': body
+    }
+
+
+def error_response(status_code, message, headers):
+    """Build the standard {'success': False, 'error': ...} response"""
+    return json_response(status_code, {'success': False, 'error': message}, headers)
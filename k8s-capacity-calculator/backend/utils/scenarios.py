@@ -0,0 +1,199 @@
+import itertools
+import math
+
+from .calculator import DEFAULT_SIZING, iter_env_entries, np, size_env
+from .metrics import metrics
+from .records import entry_costs
+
+# Scales every row's monthly/annual cost; "price_multiplier.<provisioner>" scales one tier
+PRICE_MULTIPLIER = "price_multiplier"
+SCENARIO_PARAMETERS = tuple(DEFAULT_SIZING) + (PRICE_MULTIPLIER,)
+
+TOTAL_COLUMNS = ("total_monthly", "total_annual", "total_cpu", "total_cpu_buffered", "node_count")
+
+
+def is_scenario_parameter(name):
+    return name in SCENARIO_PARAMETERS or (name.startswith(PRICE_MULTIPLIER + ".") and len(name) > len(PRICE_MULTIPLIER) + 1)
+
+
+def to_parameter_value(name, value):
+    """Validate one override value; every parameter is a positive number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError(f"{name} values must be positive numbers, got {value!r}")
+    return value
+
+
+def expand_scenarios(grid=None, scenarios=None, max_scenarios=10000):
+    """
+    Turn a parameter grid ({name: [values]}, swept as a cartesian product) and/or
+    an explicit list of override dicts into (parameter names, value tuples).
+    Parameters missing from a point keep their defaults.
+    """
+    grid = grid or {}
+    scenarios = scenarios or []
+    if not isinstance(grid, dict) or not isinstance(scenarios, list):
+        raise ValueError("grid must be an object of value lists and scenarios a list of objects")
+
+    names = list(grid)
+    for scenario in scenarios:
+        if not isinstance(scenario, dict):
+            raise ValueError("each scenario must be an object of parameter overrides")
+        names.extend(name for name in scenario if name not in names)
+
+    unknown = [name for name in names if not is_scenario_parameter(name)]
+    if unknown:
+        raise ValueError(f"Unknown scenario parameters: {', '.join(unknown)} (expected {', '.join(SCENARIO_PARAMETERS)})")
+
+    axes = []
+    for name, values in grid.items():
+        if not isinstance(values, list) or not values:
+            raise ValueError(f"grid.{name} must be a non-empty list")
+        axes.append([to_parameter_value(name, value) for value in values])
+
+    grid_size = math.prod(len(axis) for axis in axes) if axes else 0
+    if grid_size + len(scenarios) > max_scenarios:
+        raise OverflowError(f"Too many scenarios: {grid_size + len(scenarios)} (max {max_scenarios})")
+
+    points = []
+    if axes:
+        padding = (None,) * (len(names) - len(axes))
+        points.extend(values + padding for values in itertools.product(*axes))
+    for scenario in scenarios:
+        points.append(tuple(
+            to_parameter_value(name, scenario[name]) if name in scenario else None
+            for name in names
+        ))
+    return names, points
+
+
+def build_cost_profile(results):
+    """
+    One pass over a result set (list or env-grouped dict): per env, the namespace
+    count and monthly/annual cost per provisioner. Every scenario is priced from this.
+    """
+    profile = {}
+    for env, entry in iter_env_entries(results):
+        env_profile = profile.get(env)
+        if env_profile is None:
+            env_profile = profile[env] = [0, {}]
+        if entry is None:
+            continue
+        env_profile[0] += 1
+        costs = env_profile[1].setdefault(entry.get("provisioner", "Tier1"), [0, 0])
+        monthly, annual = entry_costs(entry)
+        costs[0] += monthly
+        costs[1] += annual
+    return profile
+
+
+def price_multipliers(overrides, provisioners):
+    base = overrides.get(PRICE_MULTIPLIER, 1)
+    return [overrides.get(f"{PRICE_MULTIPLIER}.{provisioner}", base) for provisioner in provisioners]
+
+
+def evaluate_scenario(profile, overrides):
+    """Totals row (TOTAL_COLUMNS) and per-env node counts for one set of overrides"""
+    sizing = {**DEFAULT_SIZING, **{name: overrides[name] for name in DEFAULT_SIZING if name in overrides}}
+    totals = [0, 0, 0, 0, 0]
+    env_node_counts = []
+    for env, (namespace_count, costs) in profile.items():
+        multipliers = price_multipliers(overrides, costs)
+        for (monthly, annual), multiplier in zip(costs.values(), multipliers):
+            totals[0] += monthly * multiplier
+            totals[1] += annual * multiplier
+        total_cpu, total_cpu_buffered, node_count = size_env(env, namespace_count, sizing)
+        totals[2] += total_cpu
+        totals[3] += total_cpu_buffered
+        totals[4] += node_count
+        env_node_counts.append(node_count)
+    return totals, env_node_counts
+
+
+def evaluate_scenarios_vectorized(profile, names, points):
+    """
+    NumPy variant of evaluate_scenario over every point at once: sizing is
+    broadcast as a (scenarios × environments) matrix and prices as
+    (scenarios × provisioners) multipliers against per-provisioner cost totals.
+    """
+    envs = list(profile)
+    provisioners = sorted({provisioner for _, costs in profile.values() for provisioner in costs})
+    provisioner_index = {provisioner: index for index, provisioner in enumerate(provisioners)}
+
+    namespace_counts = np.array([profile[env][0] for env in envs], dtype=np.float64)
+    is_prod = np.array([env == "prod" for env in envs], dtype=bool)
+    cost_by_provisioner = np.zeros((2, len(provisioners)))
+    for _, costs in profile.values():
+        for provisioner, (monthly, annual) in costs.items():
+            cost_by_provisioner[0, provisioner_index[provisioner]] += monthly
+            cost_by_provisioner[1, provisioner_index[provisioner]] += annual
+
+    def column(name, default):
+        # Per-scenario values of one parameter, defaults where a point leaves it unset
+        if name not in names:
+            return np.full(len(points), default, dtype=np.float64)
+        position = names.index(name)
+        return np.array([default if point[position] is None else point[position] for point in points], dtype=np.float64)
+
+    sizing = {name: column(name, default)[:, None] for name, default in DEFAULT_SIZING.items()}
+    total_cpu = namespace_counts * np.where(is_prod, sizing["prod_cpu_per_namespace"], sizing["nonprod_cpu_per_namespace"])
+    total_cpu_buffered = np.ceil(total_cpu * sizing["buffer"])
+    node_counts = np.ceil(total_cpu_buffered / np.where(is_prod, sizing["prod_cores_per_node"], sizing["nonprod_cores_per_node"]))
+
+    base_multiplier = column(PRICE_MULTIPLIER, 1)
+    multipliers = np.empty((len(points), len(provisioners)))
+    for provisioner, index in provisioner_index.items():
+        tier = f"{PRICE_MULTIPLIER}.{provisioner}"
+        if tier in names:
+            position = names.index(tier)
+            multipliers[:, index] = [
+                base if point[position] is None else point[position]
+                for base, point in zip(base_multiplier, points)
+            ]
+        else:
+            multipliers[:, index] = base_multiplier
+    costs = multipliers @ cost_by_provisioner.T
+
+    totals = np.column_stack((
+        costs[:, 0], costs[:, 1],
+        total_cpu.sum(axis=1), total_cpu_buffered.sum(axis=1), node_counts.sum(axis=1)
+    ))
+    return totals.tolist(), node_counts.tolist()
+
+
+def format_totals(totals):
+    monthly, annual, total_cpu, total_cpu_buffered, node_count = totals
+    return [round(monthly, 2), round(annual, 2), int(total_cpu), int(total_cpu_buffered), int(node_count)]
+
+
+@metrics.timed('ScenarioSweepTime')
+def run_scenarios(results, names, points, include_envs=False):
+    """
+    Price a base result set under every scenario point. The rows are read once
+    into a cost profile; each scenario then costs O(environments), vectorized
+    with NumPy when it is installed.
+    """
+    profile = build_cost_profile(results)
+    baseline, _ = evaluate_scenario(profile, {})
+
+    if np is not None and points:
+        totals, env_node_counts = evaluate_scenarios_vectorized(profile, names, points)
+    else:
+        totals, env_node_counts = [], []
+        for point in points:
+            overrides = {name: value for name, value in zip(names, point) if value is not None}
+            scenario_totals, scenario_env_nodes = evaluate_scenario(profile, overrides)
+            totals.append(scenario_totals)
+            env_node_counts.append(scenario_env_nodes)
+
+    metrics.put('Scenarios', len(points))
+    sweep = {
+        "parameters": names,
+        "columns": list(TOTAL_COLUMNS),
+        "baseline": format_totals(baseline),
+        "points": [list(point) for point in points],
+        "totals": [format_totals(row) for row in totals]
+    }
+    if include_envs:
+        sweep["environments"] = list(profile)
+        sweep["env_node_counts"] = [[int(count) for count in row] for row in env_node_counts]
+    return sweep
@@ -0,0 +1,632 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal, InvalidOperation
+
+from .logger import get_logger
+
+try:
+    import boto3
+except ImportError:  # only needed for the dynamodb backend; the Lambda runtime ships it
+    boto3 = None
+
+log = get_logger('state_store')
+
+DEFAULT_SQLITE_PATH = '/tmp/k8s-calculator-state.sqlite3'  # /tmp is writable in Lambda
+
+# Memory backend bounds: sessions idle this long are dropped, and at most
+# this many are kept (least recently used first)
+DEFAULT_SESSION_TTL_SECONDS = 3600
+DEFAULT_MAX_SESSIONS = 10000
+
+# DynamoDB sessions are locked for writes by a lease item; a crashed writer's
+# lease expires after LOCK_LEASE_MS, and waiting writers give up after LOCK_WAIT_SECONDS
+LOCK_KEY = 'lock'
+LOCK_LEASE_MS = 10000
+LOCK_WAIT_SECONDS = 5
+CONDITION_FAILED = 'ConditionalCheckFailedException'
+
+ZERO = Decimal(0)
+
+
+def to_decimal(value):
+    """Exact running sums: costs are added and later subtracted again"""
+    if value is None or value == '':
+        return ZERO
+    if isinstance(value, bool):
+        raise ValueError(f'Invalid cost value: {value!r}')
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ValueError(f'Invalid cost value: {value!r}')
+    if not number.is_finite():
+        raise ValueError(f'Invalid cost value: {value!r}')
+    return number
+
+
+class StateConflictError(Exception):
+    """A session stayed locked by another writer for too long; safe to retry"""
+
+
+def is_condition_failure(error):
+    """True for a DynamoDB ConditionalCheckFailedException (boto3 ClientError or LocalDynamoTable)"""
+    response = getattr(error, 'response', None) or {}
+    return response.get('Error', {}).get('Code') == CONDITION_FAILED
+
+
+def new_aggregate():
+    return {
+        'namespace_count': 0,
+        'cpu_cores': 0,
+        'monthly': ZERO,
+        'annual': ZERO,
+        'first_entry_id': None,
+        'first_entry': None
+    }
+
+
+def dump_aggregate(aggregate):
+    return json.dumps(aggregate, default=str)
+
+
+def load_aggregate(data):
+    aggregate = json.loads(data)
+    aggregate['monthly'] = Decimal(aggregate['monthly'])
+    aggregate['annual'] = Decimal(aggregate['annual'])
+    return aggregate
+
+
+class StateBackend(ABC):
+    """
+    Storage interface for per-session namespace entries and per-env aggregates.
+    Entries are dicts carrying their `env` and an insertion `seq`.
+    """
+
+    @contextmanager
+    def transaction(self, session_id):
+        yield
+
+    @abstractmethod
+    def get_entry(self, session_id, entry_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_entry(self, session_id, entry_id, entry):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_entry(self, session_id, entry_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def first_entry(self, session_id, env):
+        """(entry_id, entry) with the lowest seq in an env, or (None, None)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_aggregate(self, session_id, env):
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_aggregate(self, session_id, env, aggregate):
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_aggregate(self, session_id, env):
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_aggregates(self, session_id):
+        raise NotImplementedError
+
+
+class MemorySession:
+    """One session's entries and aggregates in a MemoryStateBackend"""
+
+    __slots__ = ("entries", "env_of", "aggregates", "touched")
+
+    def __init__(self):
+        self.entries = {}       # env -> {entry_id -> entry} in insertion order
+        self.env_of = {}        # entry_id -> env
+        self.aggregates = {}    # env -> aggregate
+        self.touched = time.monotonic()
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    Per-process dicts; sessions only survive while the process is warm and are
+    not shared between Lambda containers or worker processes. Sessions idle for
+    `ttl_seconds` are dropped and at most `max_sessions` are kept, so memory stays bounded.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_SESSION_TTL_SECONDS, max_sessions=DEFAULT_MAX_SESSIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session -> MemorySession, least recently used first
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def transaction(self, session_id):
+        with self._lock:
+            yield
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _session(self, session_id, create=False):
+        """The session (None if missing and not `create`), marked as just used"""
+        with self._lock:
+            now = time.monotonic()
+            sessions = self._sessions
+            # Least recently used first, so expired sessions are always at the front
+            while sessions:
+                oldest = next(iter(sessions.values()))
+                if now - oldest.touched < self.ttl_seconds:
+                    break
+                sessions.popitem(last=False)
+
+            session = sessions.get(session_id)
+            if session is not None:
+                sessions.move_to_end(session_id)
+            elif create:
+                session = sessions[session_id] = MemorySession()
+                while len(sessions) > self.max_sessions:
+                    sessions.popitem(last=False)
+            else:
+                return None
+            session.touched = now
+            return session
+
+    def get_entry(self, session_id, entry_id):
+        session = self._session(session_id)
+        env = session.env_of.get(entry_id) if session else None
+        if env is None:
+            return None
+        return session.entries[env][entry_id]
+
+    def put_entry(self, session_id, entry_id, entry):
+        session = self._session(session_id, create=True)
+        previous_env = session.env_of.get(entry_id)
+        if previous_env is not None and previous_env != entry['env']:
+            del session.entries[previous_env][entry_id]
+        session.entries.setdefault(entry['env'], {})[entry_id] = entry
+        session.env_of[entry_id] = entry['env']
+
+    def delete_entry(self, session_id, entry_id):
+        session = self._session(session_id)
+        env = session.env_of.pop(entry_id, None) if session else None
+        if env is not None:
+            del session.entries[env][entry_id]
+
+    def first_entry(self, session_id, env):
+        session = self._session(session_id)
+        entries = (session.entries.get(env) if session else None) or {}
+        if not entries:
+            return None, None
+        entry_id = min(entries, key=lambda key: entries[key]['seq'])
+        return entry_id, entries[entry_id]
+
+    def get_aggregate(self, session_id, env):
+        session = self._session(session_id)
+        return session.aggregates.get(env) if session else None
+
+    def put_aggregate(self, session_id, env, aggregate):
+        self._session(session_id, create=True).aggregates[env] = aggregate
+
+    def delete_aggregate(self, session_id, env):
+        session = self._session(session_id)
+        if session:
+            session.aggregates.pop(env, None)
+
+    def list_aggregates(self, session_id):
+        session = self._session(session_id)
+        return dict(session.aggregates) if session else {}
+
+
+class SQLiteStateBackend(StateBackend):
+    """File-backed store shared by every process on the host (e.g. local_server.py workers)"""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connect()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS state_entries ('
+            ' session TEXT NOT NULL, entry_id TEXT NOT NULL, env TEXT NOT NULL, seq INTEGER NOT NULL,'
+            ' entry TEXT NOT NULL, PRIMARY KEY (session, entry_id))'
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS state_entries_env ON state_entries (session, env, seq)'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS state_aggregates ('
+            ' session TEXT NOT NULL, env TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (session, env))'
+        )
+
+    def _connect(self):
+        # One connection per thread and process; a connection opened before a
+        # fork (e.g. local_server.py workers) must not be shared with the children
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def transaction(self, session_id):
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def get_entry(self, session_id, entry_id):
+        row = self._connect().execute(
+            'SELECT entry FROM state_entries WHERE session = ? AND entry_id = ?', (session_id, entry_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_entry(self, session_id, entry_id, entry):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO state_entries (session, entry_id, env, seq, entry) VALUES (?, ?, ?, ?, ?)',
+            (session_id, entry_id, entry['env'], entry['seq'], json.dumps(entry))
+        )
+
+    def delete_entry(self, session_id, entry_id):
+        self._connect().execute(
+            'DELETE FROM state_entries WHERE session = ? AND entry_id = ?', (session_id, entry_id)
+        )
+
+    def first_entry(self, session_id, env):
+        row = self._connect().execute(
+            'SELECT entry_id, entry FROM state_entries WHERE session = ? AND env = ? ORDER BY seq LIMIT 1',
+            (session_id, env)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else (None, None)
+
+    def get_aggregate(self, session_id, env):
+        row = self._connect().execute(
+            'SELECT data FROM state_aggregates WHERE session = ? AND env = ?', (session_id, env)
+        ).fetchone()
+        return load_aggregate(row[0]) if row else None
+
+    def put_aggregate(self, session_id, env, aggregate):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO state_aggregates (session, env, data) VALUES (?, ?, ?)',
+            (session_id, env, dump_aggregate(aggregate))
+        )
+
+    def delete_aggregate(self, session_id, env):
+        self._connect().execute(
+            'DELETE FROM state_aggregates WHERE session = ? AND env = ?', (session_id, env)
+        )
+
+    def list_aggregates(self, session_id):
+        rows = self._connect().execute(
+            'SELECT env, data FROM state_aggregates WHERE session = ? ORDER BY rowid', (session_id,)
+        ).fetchall()
+        return {env: load_aggregate(data) for env, data in rows}
+
+
+class DynamoDBStateBackend(StateBackend):
+    """
+    Single-table DynamoDB layout: partition key `pk` = session id, sort key `sk` =
+    `entry#<id>` for entries and `agg#<env>` for aggregates. `table` is a boto3
+    Table resource or anything with the same get/put/delete_item and query calls
+    (see LocalDynamoTable). Writes to a session are serialized across
+    containers by a lease item (`sk` = `lock`) taken with a conditional put,
+    and reads inside a transaction are strongly consistent, so concurrent
+    adds never overwrite each other's aggregate updates.
+    """
+
+    def __init__(self, table, lease_ms=LOCK_LEASE_MS, wait_seconds=LOCK_WAIT_SECONDS):
+        self.table = table
+        self.lease_ms = lease_ms
+        self.wait_seconds = wait_seconds
+
+    @contextmanager
+    def transaction(self, session_id):
+        owner = uuid.uuid4().hex
+        self._acquire(session_id, owner)
+        try:
+            yield
+        finally:
+            self._release(session_id, owner)
+
+    def _acquire(self, session_id, owner):
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.005
+        while True:
+            now_ms = int(time.time() * 1000)
+            try:
+                self.table.put_item(
+                    Item={'pk': session_id, 'sk': LOCK_KEY, 'owner': owner, 'expires_at': now_ms + self.lease_ms},
+                    ConditionExpression='attribute_not_exists(pk) OR expires_at < :now',
+                    ExpressionAttributeValues={':now': now_ms}
+                )
+                return
+            except Exception as e:
+                if not is_condition_failure(e):
+                    raise
+            if time.monotonic() >= deadline:
+                raise StateConflictError(f'Session {session_id} is busy; retry the request')
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    def _release(self, session_id, owner):
+        try:
+            self.table.delete_item(
+                Key={'pk': session_id, 'sk': LOCK_KEY},
+                ConditionExpression='owner = :owner',
+                ExpressionAttributeValues={':owner': owner}
+            )
+        except Exception as e:
+            # The lease expired and another writer holds the lock now
+            if not is_condition_failure(e):
+                raise
+
+    def _query(self, session_id, prefix):
+        kwargs = {
+            'KeyConditionExpression': 'pk = :pk AND begins_with(sk, :prefix)',
+            'ExpressionAttributeValues': {':pk': session_id, ':prefix': prefix},
+            'ConsistentRead': True
+        }
+        while True:
+            page = self.table.query(**kwargs)
+            yield from page.get('Items', [])
+            if not page.get('LastEvaluatedKey'):
+                return
+            kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    def get_entry(self, session_id, entry_id):
+        item = self.table.get_item(Key={'pk': session_id, 'sk': f'entry#{entry_id}'}, ConsistentRead=True).get('Item')
+        return json.loads(item['entry']) if item else None
+
+    def put_entry(self, session_id, entry_id, entry):
+        self.table.put_item(Item={
+            'pk': session_id, 'sk': f'entry#{entry_id}', 'env': entry['env'], 'entry': json.dumps(entry)
+        })
+
+    def delete_entry(self, session_id, entry_id):
+        self.table.delete_item(Key={'pk': session_id, 'sk': f'entry#{entry_id}'})
+
+    def first_entry(self, session_id, env):
+        # Only needed when an env's first entry is removed
+        first_id, first = None, None
+        for item in self._query(session_id, 'entry#'):
+            if item.get('env') != env:
+                continue
+            entry = json.loads(item['entry'])
+            if first is None or entry['seq'] < first['seq']:
+                first_id, first = item['sk'][len('entry#'):], entry
+        return first_id, first
+
+    def get_aggregate(self, session_id, env):
+        item = self.table.get_item(Key={'pk': session_id, 'sk': f'agg#{env}'}, ConsistentRead=True).get('Item')
+        return load_aggregate(item['data']) if item else None
+
+    def put_aggregate(self, session_id, env, aggregate):
+        self.table.put_item(Item={'pk': session_id, 'sk': f'agg#{env}', 'data': dump_aggregate(aggregate)})
+
+    def delete_aggregate(self, session_id, env):
+        self.table.delete_item(Key={'pk': session_id, 'sk': f'agg#{env}'})
+
+    def list_aggregates(self, session_id):
+        return {
+            item['sk'][len('agg#'):]: load_aggregate(item['data'])
+            for item in self._query(session_id, 'agg#')
+        }
+
+
+class ConditionalCheckFailed(Exception):
+    """LocalDynamoTable's stand-in for boto3's ConditionalCheckFailedException"""
+
+    response = {'Error': {'Code': CONDITION_FAILED}}
+
+
+class LocalDynamoTable:
+    """
+    In-process stand-in for a boto3 DynamoDB Table, covering the calls
+    DynamoDBStateBackend makes (pk/sk keys, `pk = :pk AND begins_with(sk, :prefix)`
+    queries and the lock's conditional put/delete). Each call is atomic, as in DynamoDB.
+    """
+
+    def __init__(self, page_size=100):
+        self.items = {}
+        self.page_size = page_size
+        self._lock = threading.Lock()
+
+    def _check(self, item, ConditionExpression, ExpressionAttributeValues):
+        if ConditionExpression is None:
+            return
+        if ConditionExpression == 'attribute_not_exists(pk) OR expires_at < :now':
+            passed = item is None or item['expires_at'] < ExpressionAttributeValues[':now']
+        elif ConditionExpression == 'owner = :owner':
+            passed = item is not None and item.get('owner') == ExpressionAttributeValues[':owner']
+        else:
+            raise NotImplementedError(ConditionExpression)
+        if not passed:
+            raise ConditionalCheckFailed(ConditionExpression)
+
+    def get_item(self, Key, ConsistentRead=False):
+        item = self.items.get((Key['pk'], Key['sk']))
+        return {'Item': dict(item)} if item else {}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        key = (Item['pk'], Item['sk'])
+        with self._lock:
+            self._check(self.items.get(key), ConditionExpression, ExpressionAttributeValues)
+            self.items[key] = dict(Item)
+        return {}
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeValues=None):
+        key = (Key['pk'], Key['sk'])
+        with self._lock:
+            self._check(self.items.get(key), ConditionExpression, ExpressionAttributeValues)
+            self.items.pop(key, None)
+        return {}
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues, ExclusiveStartKey=None, ConsistentRead=False):
+        if KeyConditionExpression != 'pk = :pk AND begins_with(sk, :prefix)':
+            raise NotImplementedError(KeyConditionExpression)
+        pk, prefix = ExpressionAttributeValues[':pk'], ExpressionAttributeValues[':prefix']
+        with self._lock:
+            keys = sorted(key for key in self.items if key[0] == pk and key[1].startswith(prefix))
+            if ExclusiveStartKey:
+                keys = [key for key in keys if key[1] > ExclusiveStartKey['sk']]
+            page = keys[:self.page_size]
+            response = {'Items': [dict(self.items[key]) for key in page]}
+        if len(keys) > self.page_size:
+            response['LastEvaluatedKey'] = {'pk': pk, 'sk': page[-1][1]}
+        return response
+
+
+class StateStore:
+    """
+    Namespace entries per session with per-env running aggregates
+    (count, CPU cores, monthly/annual cost). Add, update and remove adjust
+    the aggregates by the entry's delta, so summaries never rescan entries.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    @staticmethod
+    def _apply(aggregate, entry, sign):
+        aggregate['namespace_count'] += sign
+        aggregate['cpu_cores'] += sign * entry.get('cpu_core_ns', 0)
+        aggregate['monthly'] += sign * to_decimal(entry.get('monthlyCost'))
+        aggregate['annual'] += sign * to_decimal(entry.get('annualCost'))
+
+    def upsert(self, session_id, entry_id, entry):
+        """Add an entry, or replace the one with the same id; returns the stored entry"""
+        backend = self.backend
+        with backend.transaction(session_id):
+            previous = backend.get_entry(session_id, entry_id)
+            entry = {**entry, 'seq': previous['seq'] if previous else time.time_ns()}
+            # Validate costs before anything is written
+            to_decimal(entry.get('monthlyCost'))
+            to_decimal(entry.get('annualCost'))
+
+            if previous is not None:
+                self._remove_from_aggregate(session_id, entry_id, previous, replaced_by=entry)
+            backend.put_entry(session_id, entry_id, entry)
+
+            env = entry['env']
+            aggregate = backend.get_aggregate(session_id, env) or new_aggregate()
+            self._apply(aggregate, entry, 1)
+            if aggregate['first_entry_id'] is None or aggregate['first_entry_id'] == entry_id or \
+                    entry['seq'] < aggregate['first_entry']['seq']:
+                aggregate['first_entry_id'], aggregate['first_entry'] = entry_id, entry
+            backend.put_aggregate(session_id, env, aggregate)
+        return entry
+
+    def remove(self, session_id, entry_id):
+        """Remove an entry; returns False if it didn't exist"""
+        backend = self.backend
+        with backend.transaction(session_id):
+            previous = backend.get_entry(session_id, entry_id)
+            if previous is None:
+                return False
+            backend.delete_entry(session_id, entry_id)
+            self._remove_from_aggregate(session_id, entry_id, previous)
+        return True
+
+    def _remove_from_aggregate(self, session_id, entry_id, entry, replaced_by=None):
+        backend = self.backend
+        env = entry['env']
+        aggregate = backend.get_aggregate(session_id, env)
+        if aggregate is None:
+            return
+        self._apply(aggregate, entry, -1)
+        if aggregate['namespace_count'] <= 0:
+            backend.delete_aggregate(session_id, env)
+            return
+        if aggregate['first_entry_id'] == entry_id:
+            if replaced_by is not None and replaced_by['env'] == env:
+                aggregate['first_entry'] = replaced_by
+            else:
+                if replaced_by is not None:
+                    # Moving to another env: find the next-oldest entry left behind
+                    backend.delete_entry(session_id, entry_id)
+                aggregate['first_entry_id'], aggregate['first_entry'] = backend.first_entry(session_id, env)
+        backend.put_aggregate(session_id, env, aggregate)
+
+    def aggregates(self, session_id):
+        """{env: aggregate} for a session, read straight from the running aggregates"""
+        return self.backend.list_aggregates(session_id)
+
+    def summary(self, session_id):
+        environments = {}
+        total_monthly = ZERO
+        total_annual = ZERO
+        namespace_count = 0
+        for env, aggregate in self.aggregates(session_id).items():
+            environments[env] = {
+                'namespace_count': aggregate['namespace_count'],
+                'total_cpu_cores': aggregate['cpu_cores'],
+                'monthly_cost': float(aggregate['monthly']),
+                'annual_cost': float(aggregate['annual'])
+            }
+            namespace_count += aggregate['namespace_count']
+            total_monthly += aggregate['monthly']
+            total_annual += aggregate['annual']
+        return {
+            'environments': environments,
+            'namespace_count': namespace_count,
+            'raw_total_monthly': float(total_monthly),
+            'raw_total_annual': float(total_annual)
+        }
+
+
+def create_state_store():
+    """
+    Build the store from STATE_STORE_BACKEND (none | memory | sqlite | dynamodb | dynamodb-local).
+    Sessions are off unless a backend is configured: per-process state would
+    silently split a session across Lambda containers. A backend that can't be
+    set up also turns sessions off rather than falling back to memory.
+    """
+    backend_name = (os.environ.get('STATE_STORE_BACKEND') or 'none').lower()
+
+    if backend_name == 'none':
+        return StateStore(None)
+    if backend_name == 'memory':
+        return StateStore(MemoryStateBackend(
+            float(os.environ.get('STATE_SESSION_TTL_SECONDS', DEFAULT_SESSION_TTL_SECONDS)),
+            int(os.environ.get('STATE_MAX_SESSIONS', DEFAULT_MAX_SESSIONS))
+        ))
+    if backend_name == 'sqlite':
+        try:
+            return StateStore(SQLiteStateBackend(os.environ.get('STATE_STORE_PATH', DEFAULT_SQLITE_PATH)))
+        except sqlite3.Error as e:
+            log.error("SQLite state store unavailable, sessions disabled", error=str(e))
+            return StateStore(None)
+    if backend_name == 'dynamodb':
+        table_name = os.environ.get('STATE_TABLE_NAME')
+        if boto3 is not None and table_name:
+            return StateStore(DynamoDBStateBackend(boto3.resource('dynamodb').Table(table_name)))
+        log.error("DynamoDB state store needs boto3 and STATE_TABLE_NAME, sessions disabled")
+        return StateStore(None)
+    if backend_name == 'dynamodb-local':
+        return StateStore(DynamoDBStateBackend(LocalDynamoTable()))
+    log.error("Unknown STATE_STORE_BACKEND, sessions disabled", backend=backend_name)
+    return StateStore(None)
+
+
+# Global state store for /api/add, /api/remove and /api/summary
+state_store = create_state_store()
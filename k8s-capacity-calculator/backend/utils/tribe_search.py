@@ -0,0 +1,172 @@
+import bisect
+import heapq
+import os
+from operator import itemgetter
+
+# Largest number of results one search returns (the ?limit= ceiling of /api/search-tribes)
+MAX_SEARCH_RESULTS = int(os.environ.get('MAX_SEARCH_RESULTS', '50'))
+# Queries up to this many characters match a large share of the index, so their
+# ranked results are kept per index (i.e. per config version) after the first lookup
+SHORTLIST_PREFIX_CHARS = 2
+MAX_SHORTLISTS = 4096
+
+TRIBE = 'tribe'
+CATEGORY = 'category'
+APPROVER = 'approver'
+# Tribes rank above categories, categories above approvers, at equal match quality
+TYPE_RANKS = {TRIBE: 0, CATEGORY: 1, APPROVER: 2}
+
+# Match quality: the whole name, a prefix of the whole name, a prefix of one of its words
+EXACT_MATCH = 0
+NAME_PREFIX = 1
+WORD_PREFIX = 2
+
+# Above every character a normalized key can contain, for the end of a prefix range
+PREFIX_END = '\U0010ffff'
+
+_word_separators = str.maketrans('_-./', '    ')
+
+
+def normalize_tribe(tribe_name):
+    """Normalize a tribe name for index lookups (case/whitespace-insensitive)"""
+    if not isinstance(tribe_name, str):
+        return ''
+    return ' '.join(tribe_name.split()).lower()
+
+
+def name_words(key):
+    """Words after the first in a normalized name, e.g. 'bank_cashin' -> ['cashin']"""
+    return key.translate(_word_separators).split()[1:]
+
+
+class TribeSearchIndex:
+    """
+    Sorted search keys over the orgMapping tribes, categories and approvers,
+    built once per config version. Every name is indexed whole and by each
+    later word, so 'cashin' finds 'bank_cashin'. A query is two bisections
+    for its prefix range plus ranking of the matches in that range.
+    """
+
+    def __init__(self, org_mapping, max_results=MAX_SEARCH_RESULTS):
+        self.max_results = max_results
+        # (type, result dict, normalized name) per searchable item
+        items = []
+        seen = set()
+        tribe_counts = {}
+
+        for approver_data in org_mapping:
+            approver = approver_data.get('approver', '')
+            tribes = approver_data.get('tribes', {})
+            if approver and (APPROVER, approver) not in seen:
+                seen.add((APPROVER, approver))
+                items.append((APPROVER, {'type': APPROVER, 'approver': approver}, normalize_tribe(approver)))
+
+            for category, tribe_list in tribes.items():
+                if (CATEGORY, approver, category) not in seen:
+                    seen.add((CATEGORY, approver, category))
+                    items.append((CATEGORY, {'type': CATEGORY, 'category': category, 'approver': approver},
+                                  normalize_tribe(category)))
+
+                for tribe_name in tribe_list:
+                    key = normalize_tribe(tribe_name)
+                    # The first mapping for a tribe wins, as in ConfigLoader.build_org_index
+                    if not key or (TRIBE, key) in seen:
+                        continue
+                    seen.add((TRIBE, key))
+                    items.append((TRIBE, {'type': TRIBE, 'tribe': tribe_name, 'category': category, 'approver': approver}, key))
+                    tribe_counts[(approver, category)] = tribe_counts.get((approver, category), 0) + 1
+                    tribe_counts[approver] = tribe_counts.get(approver, 0) + 1
+
+        for item_type, result, _ in items:
+            if item_type == APPROVER:
+                result['tribe_count'] = tribe_counts.get(result['approver'], 0)
+            elif item_type == CATEGORY:
+                result['tribe_count'] = tribe_counts.get((result['approver'], result['category']), 0)
+
+        # (key, index << 1 | is_word) pairs, sorted by key alone (much cheaper than comparing tuples)
+        entries = []
+        for index, (_, _, key) in enumerate(items):
+            if not key:
+                continue
+            code = index << 1
+            entries.append((key, code))
+            for word in name_words(key):
+                entries.append((word, code | 1))
+        entries.sort(key=itemgetter(0))
+
+        self.keys = [key for key, _ in entries]
+        self.codes = [code for _, code in entries]
+        self.results = [result for _, result, _ in items]
+        self.types = [item_type for item_type, _, _ in items]
+        # (type rank, name length, name) tie-breakers, precomputed per item
+        self.ranks = [(TYPE_RANKS[item_type], len(key), key) for item_type, _, key in items]
+        self._shortlists = {}
+
+    # Attributes saved in config bundles (see utils/config_bundle.py)
+    STATE_FIELDS = ('max_results', 'keys', 'codes', 'results', 'types', 'ranks')
+
+    def get_state(self):
+        """Built index as plain data, for config bundles"""
+        return {field: getattr(self, field) for field in self.STATE_FIELDS}
+
+    @classmethod
+    def from_state(cls, state):
+        """Index restored from get_state() without rebuilding it"""
+        index = cls.__new__(cls)
+        for field in cls.STATE_FIELDS:
+            setattr(index, field, state[field])
+        index._shortlists = {}
+        return index
+
+    def __len__(self):
+        return len(self.results)
+
+    def search(self, query, limit=10, types=None):
+        """
+        Up to `limit` items whose name or one of its words starts with `query`
+        (case/whitespace-insensitive), best first, plus the total match count
+        """
+        query = normalize_tribe(query)
+        if not query:
+            return [], 0
+        limit = min(limit, self.max_results)
+
+        if len(query) <= SHORTLIST_PREFIX_CHARS:
+            shortlist_key = (query, types)
+            shortlist = self._shortlists.get(shortlist_key)
+            if shortlist is None:
+                shortlist = self._rank(query, self.max_results, types)
+                if len(self._shortlists) < MAX_SHORTLISTS:
+                    self._shortlists[shortlist_key] = shortlist
+            ranked, total = shortlist
+        else:
+            ranked, total = self._rank(query, limit, types)
+
+        results = self.results
+        return [results[index] for index in ranked[:limit]], total
+
+    def _rank(self, query, limit, types):
+        """(best `limit` item indexes, number of matching items) for a normalized query"""
+        keys = self.keys
+        codes = self.codes
+        lo = bisect.bisect_left(keys, query)
+        hi = bisect.bisect_left(keys, query + PREFIX_END, lo)
+        exact_hi = bisect.bisect_right(keys, query, lo, hi)
+
+        best = {}
+        item_types = self.types
+        for position in range(lo, hi):
+            code = codes[position]
+            index = code >> 1
+            if types is not None and item_types[index] not in types:
+                continue
+            if code & 1:
+                quality = WORD_PREFIX
+            else:
+                quality = EXACT_MATCH if position < exact_hi else NAME_PREFIX
+            if quality < best.get(index, WORD_PREFIX + 1):
+                best[index] = quality
+
+        ranks = self.ranks
+        top = heapq.nsmallest(limit, best.items(), key=lambda match: (match[1],) + ranks[match[0]])
+        return [index for index, _ in top], len(best)
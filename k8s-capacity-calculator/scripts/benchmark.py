@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the Lambda backend.
+
+Builds synthetic API Gateway events (REST v1 shape) and drives
+app.lambda_handler in-process, reporting p50/p95/p99 latency, throughput and
+peak memory (tracemalloc) per endpoint and payload size.
+
+Examples:
+    python scripts/benchmark.py
+    python scripts/benchmark.py --rows 1,1000,100000 --tribes 5000 --save-baseline bench.json
+    python scripts/benchmark.py --compare bench.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'assets', 'config')
+
+ENVIRONMENTS = ('prod', 'staging', 'uat', 'dev', 'sit', 'perf')
+SIZES = ('S', 'M', 'L', 'XL')
+
+
+class FakeContext:
+    """Minimal stand-in for the Lambda context object"""
+
+    def __init__(self):
+        self.aws_request_id = str(uuid.uuid4())
+        self.function_name = 'k8s-capacity-benchmark'
+
+
+def build_org_mapping(tribe_count, tribes_per_category=50, categories_per_approver=4):
+    """Synthetic orgMapping.json with `tribe_count` tribes"""
+    org_mapping = []
+    tribe_index = 0
+    approver_index = 0
+    while tribe_index < tribe_count:
+        tribes = {}
+        for category_index in range(categories_per_approver):
+            names = [f"tribe_{tribe_index + i}" for i in range(min(tribes_per_category, tribe_count - tribe_index))]
+            if not names:
+                break
+            tribes[f"category_{approver_index}_{category_index}"] = names
+            tribe_index += len(names)
+        org_mapping.append({"approver": f"Approver {approver_index}", "tribes": tribes})
+        approver_index += 1
+    return org_mapping
+
+
+def build_rows(row_count, tribe_count, env_count, seed=42):
+    """Synthetic finalize-cost rows as the frontend would send them"""
+    rng = random.Random(seed)
+    environments = ENVIRONMENTS[:env_count]
+    rows = []
+    for i in range(row_count):
+        size = rng.choice(SIZES)
+        monthly = {'S': 413.46, 'M': 583.84, 'L': 1102.56, 'XL': 2205.12}[size]
+        rows.append({
+            "env": rng.choice(environments),
+            "namespace": f"ns-{i}",
+            "cluster": f"cluster-{i % 37}",
+            "tribe": f"tribe_{rng.randrange(tribe_count)}",
+            "provisioner": size,
+            "pods": rng.randint(1, 30),
+            "cpu_req": rng.choice((100, 250, 500, 1000, 2000)),
+            "pdb": "minUnavailable = 1",
+            "eks_version": "v1.32",
+            "monthlyCost": monthly,
+            "annualCost": round(monthly * 12, 2)
+        })
+    return rows
+
+
+def make_event(method, path, body=None, headers=None):
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': headers or {'Content-Type': 'application/json'},
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False
+    }
+
+
+def build_scenarios(row_counts, tribe_count, env_count):
+    """(name, rows, event) for every endpoint and payload size"""
+    scenarios = [
+        ('GET /api/config', 0, make_event('GET', '/api/config')),
+        ('GET /api/config gzip', 0, make_event('GET', '/api/config', headers={'Accept-Encoding': 'gzip'})),
+        ('POST /api/find-approver', 1, make_event('POST', '/api/find-approver', {'tribe': f'tribe_{tribe_count - 1}'})),
+    ]
+    for row_count in row_counts:
+        rows = build_rows(row_count, tribe_count, env_count)
+        scenarios.append(
+            (f'POST /api/finalize-cost [{row_count} rows]', row_count,
+             make_event('POST', '/api/finalize-cost', {'results': rows}))
+        )
+        scenarios.append(
+            (f'POST /api/calculate [{row_count} rows]', row_count,
+             make_event('POST', '/api/calculate', {'namespaces': rows, 'include_rows': False}))
+        )
+        batch_size = 10
+        per_item = max(1, row_count // batch_size)
+        batch = [{'request_id': f'req-{i}', 'results': rows[i * per_item:(i + 1) * per_item] or rows[:1]}
+                 for i in range(batch_size)]
+        scenarios.append(
+            (f'POST /api/finalize-cost/batch [{row_count} rows]', row_count,
+             make_event('POST', '/api/finalize-cost/batch', {'requests': batch}))
+        )
+    return scenarios
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_scenario(handler, event, rows, iterations, time_budget):
+    """Time repeated invocations, then measure peak memory for one extra call"""
+    # One untimed call so imports and lazily built caches don't skew the numbers
+    response = handler(event, FakeContext())
+    if response['statusCode'] >= 400:
+        raise RuntimeError(f"{event['path']} returned {response['statusCode']}: {response['body'][:200]}")
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        handler(event, FakeContext())
+        latencies.append((time.perf_counter() - call_started) * 1000)
+        if time.perf_counter() - started > time_budget and len(latencies) >= 3:
+            break
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    handler(event, FakeContext())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'iterations': len(latencies),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'rows_per_s': round(rows * len(latencies) / elapsed, 1) if elapsed and rows else 0.0,
+        'peak_memory_kib': round(peak / 1024, 1),
+        'request_bytes': len(event['body'] or '')
+    }
+
+
+def compare(results, baseline, threshold):
+    """Regressions where p50 or peak memory grew by more than `threshold`"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('p50_ms', 'peak_memory_kib'):
+            before, after = previous.get(metric), current.get(metric)
+            if before and after and after > before * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before} -> {after} (+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_report(results):
+    header = f"{'scenario':<48} {'n':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'req/s':>9} {'rows/s':>12} {'peak KiB':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        print(f"{name:<48} {r['iterations']:>5} {r['p50_ms']:>10} {r['p95_ms']:>10} {r['p99_ms']:>10} "
+              f"{r['requests_per_s']:>9} {r['rows_per_s']:>12} {r['peak_memory_kib']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark app.lambda_handler in-process')
+    parser.add_argument('--rows', default='1,100,1000,10000', help='Comma-separated namespace row counts')
+    parser.add_argument('--tribes', type=int, default=1000, help='Tribes in the synthetic orgMapping.json')
+    parser.add_argument('--envs', type=int, default=4, help=f'Number of environments (max {len(ENVIRONMENTS)})')
+    parser.add_argument('--iterations', type=int, default=50, help='Maximum timed calls per scenario')
+    parser.add_argument('--time-budget', type=float, default=5.0, help='Seconds of timed calls per scenario')
+    parser.add_argument('--filter', default='', help='Only run scenarios whose name contains this text')
+    parser.add_argument('--save-baseline', help='Write results as JSON to this path')
+    parser.add_argument('--compare', help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative regression (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    row_counts = [int(value) for value in args.rows.split(',') if value.strip()]
+    env_count = max(1, min(args.envs, len(ENVIRONMENTS)))
+
+    # Synthetic configs: the real pricing files plus a large orgMapping.json
+    config_dir = tempfile.mkdtemp(prefix='k8s-bench-config-')
+    for filename in ('calculatorDefaults.json', 'costMap.json', 'defaults.json'):
+        with open(os.path.join(CONFIG_DIR, filename)) as src, open(os.path.join(config_dir, filename), 'w') as dst:
+            dst.write(src.read())
+    with open(os.path.join(config_dir, 'orgMapping.json'), 'w') as f:
+        json.dump(build_org_mapping(args.tribes), f)
+
+    os.environ['CONFIG_DIR'] = config_dir
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('CONFIG_TTL_SECONDS', '0')
+    os.environ.setdefault('METRICS_SINK', 'memory')
+    # Measure the calculation itself, not repeated result-cache hits
+    os.environ.setdefault('RESULT_CACHE_BACKEND', 'none')
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+    import_started = time.perf_counter()
+    import app
+    print(f"Cold import: {(time.perf_counter() - import_started) * 1000:.1f} ms "
+          f"(startup timings: {json.dumps(app.STARTUP_TIMINGS)})\n")
+
+    results = {}
+    for name, rows, event in build_scenarios(row_counts, args.tribes, env_count):
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = run_scenario(app.lambda_handler, event, rows, args.iterations, args.time_budget)
+
+    print_report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {args.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Validate the four calculator configs and compile them, with every index the
+backend derives from them, into one versioned bundle loaded at cold start.
+
+Run by backend/package-lambda.sh; fails (exit 1) on missing files or schema
+problems instead of letting the backend fall back to built-in defaults.
+
+Examples:
+    python scripts/build_config_bundle.py
+    python scripts/build_config_bundle.py --config-dir /mnt/config --output /tmp/config_bundle.bin
+    python scripts/build_config_bundle.py --check
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'assets', 'config')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the calculator configs into a config bundle')
+    parser.add_argument('--config-dir', default=CONFIG_DIR, help='Directory with the calculator config files')
+    parser.add_argument('--output', help='Bundle path (default: config_bundle.bin next to backend/app.py)')
+    parser.add_argument('--check', action='store_true', help='Validate and build, but write nothing')
+    args = parser.parse_args()
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('METRICS_SINK', 'none')
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+    from utils.config_bundle import DEFAULT_BUNDLE_PATH, ConfigBundleError, build_bundle, read_bundle
+
+    output = args.output or DEFAULT_BUNDLE_PATH
+    if args.check:
+        output = os.path.join(tempfile.mkdtemp(), 'config_bundle.bin')
+    try:
+        loader, size = build_bundle(args.config_dir, output)
+        # Read it back the way the backend will, so a bad bundle never ships
+        read_bundle(output)
+    except ConfigBundleError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if args.check and os.path.exists(output):
+            os.remove(output)
+            os.rmdir(os.path.dirname(output))
+
+    for conflict in loader.index_conflicts:
+        print(f"warning: orgMapping conflict: {conflict}", file=sys.stderr)
+    action = 'Checked' if args.check else f'Wrote {output}:'
+    print(f"{action} config version {loader.version}, {size} bytes, {len(loader.tribe_approvers)} tribes")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
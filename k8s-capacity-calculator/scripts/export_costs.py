@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Finalize costs for a local result file without going through the API.
+
+Reads result rows (as sent to /api/finalize-cost) from a JSON array, NDJSON or
+CSV file one row at a time, so inputs can be far larger than memory, and
+writes the same CSV/NDJSON export as /api/finalize-cost?format=... in chunks,
+or the finalized per-env costs as JSON.
+
+Examples:
+    python scripts/export_costs.py results.json > costs.csv
+    python scripts/export_costs.py results.ndjson --format ndjson --output costs.ndjson
+    python scripts/export_costs.py results.csv --format json --no-namespaces
+    cat results.json | python scripts/export_costs.py - --input-format json
+"""
+import argparse
+import logging
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'assets', 'config')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Finalize costs for a local result file')
+    parser.add_argument('input', help="Result rows: JSON array, NDJSON or CSV file ('-' for stdin)")
+    parser.add_argument('--input-format', choices=('json', 'ndjson', 'csv'),
+                        help='Input format (default: from the file extension, else json)')
+    parser.add_argument('--format', choices=('csv', 'ndjson', 'json'), default='csv',
+                        help='csv/ndjson: namespace, env and total rows; json: finalized costs per env')
+    parser.add_argument('--output', default='-', help="Output file ('-' for stdout)")
+    parser.add_argument('--no-namespaces', action='store_true', help='Only write env and total rows')
+    parser.add_argument('--config-dir', default=CONFIG_DIR, help='Directory with the calculator config files')
+    args = parser.parse_args()
+
+    os.environ['CONFIG_DIR'] = args.config_dir
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ.setdefault('METRICS_SINK', 'none')
+    sys.path.insert(0, os.path.abspath(BACKEND_DIR))
+
+    from utils.calculator import calculate_final_cost
+    from utils.codec import CodecError, dumps
+    from utils.config_store import config_store
+    from utils.export import guess_input_format, iter_export_chunks, iter_input_rows
+    from utils.records import InvalidRecordError
+
+    # Log lines go to stderr so they never end up in the exported data
+    for handler in logging.getLogger('k8s_calculator').handlers:
+        handler.setStream(sys.stderr)
+
+    input_format = args.input_format or ('json' if args.input == '-' else guess_input_format(args.input))
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        rows = iter_input_rows(source, input_format)
+        if args.format == 'json':
+            finalized_costs = calculate_final_cost(rows, config_store.loader)
+            target.write(dumps({env: env_data.to_dict() for env, env_data in finalized_costs.items()}) + '\n')
+        else:
+            for chunk in iter_export_chunks(rows, config_store.loader, args.format, not args.no_namespaces):
+                target.write(chunk)
+    except (CodecError, InvalidRecordError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
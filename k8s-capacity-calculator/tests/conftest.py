@@ -0,0 +1,13 @@
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT_DIR, 'backend')
+CONFIG_DIR = os.path.join(ROOT_DIR, 'frontend', 'assets', 'config')
+
+# Set before the backend is imported: the checked-in JSON configs (never a
+# locally built bundle), no metrics output and only errors in the logs
+os.environ['CONFIG_DIR'] = CONFIG_DIR
+os.environ['METRICS_SINK'] = 'none'
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+sys.path.insert(0, BACKEND_DIR)
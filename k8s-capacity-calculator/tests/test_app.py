@@ -0,0 +1,176 @@
+"""lambda_handler routes, driven with API Gateway proxy events"""
+import json
+
+import pytest
+
+import app
+
+
+def make_event(method, path, body=None, query=None):
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': {'Content-Type': 'application/json'},
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None
+    }
+
+
+def call(method, path, body=None, query=None):
+    response = app.lambda_handler(make_event(method, path, body, query), None)
+    return response['statusCode'], json.loads(response['body']), response['headers']
+
+
+def test_warmup_uses_shared_response_headers():
+    response = app.lambda_handler({'warmup': True}, None)
+    assert response['statusCode'] == 200
+    assert json.loads(response['body'])['warmed'] is True
+    for key, value in app.PRECOMPUTED['headers'].items():
+        assert response['headers'][key] == value
+    assert response['headers']['X-Correlation-Id']
+
+
+def test_batch_duplicate_request_ids_fail_without_collisions():
+    rows = [{"env": "dev", "monthlyCost": 10, "annualCost": 120}]
+    status, body, _ = call('POST', '/api/finalize-cost/batch', {'requests': [
+        {'request_id': 'a', 'results': rows},
+        {'request_id': 'a#1', 'results': rows},
+        {'request_id': 'a', 'results': rows},
+        {'request_id': 'b', 'results': [1]},
+        {'request_id': 'c', 'results': []}
+    ]})
+    assert status == 200
+    results = body['results']
+    assert list(results) == ['a', 'a#1', 'b', 'c']
+    assert results['a']['status_code'] == 400 and 'Duplicate request_id' in results['a']['error']
+    assert results['a#1']['success'] is True
+    assert results['b']['status_code'] == 400
+    assert results['c']['status_code'] == 400
+    assert (body['succeeded'], body['failed']) == (1, 3)
+    assert body['raw_total_monthly'] == 10
+
+
+@pytest.mark.parametrize('catalog', [
+    [{"name": "tiny", "cpu": 0, "memory": 1024}],
+    [{"name": "tiny", "cpu": "big", "memory": 1024}],
+    [{"name": "tiny", "cpu": 1000, "memory": -5}],
+    [{"name": "tiny", "cpu": 1000, "memory": 1024, "monthly": "cheap"}],
+    {"name": "tiny"}
+])
+def test_node_plan_rejects_invalid_catalog(catalog):
+    status, body, _ = call('POST', '/api/node-plan', {
+        'results': [{"env": "dev", "pods": 2, "cpu_req": 500}],
+        'instance_catalog': catalog
+    })
+    assert status == 400
+    assert body['error'].startswith('Invalid instance_catalog')
+
+
+def test_node_plan_with_small_buffered_nodes():
+    status, body, _ = call('POST', '/api/node-plan', {
+        'results': [{"env": "dev", "pods": 2, "cpu_req": 500}],
+        'instance_catalog': [{"name": "tiny", "cpu": 1, "memory": 1}],
+        'buffer': 1.3
+    })
+    assert status == 200
+    assert body['node_plans']['dev']['recommended']['unplaceable_pods'] == 2
+
+
+def test_finalize_plan_nodes_overrides_node_count_only_when_every_pod_fits():
+    estimate = call('POST', '/api/finalize-cost', {'results': [{"env": "dev"}]})[1]['finalized_costs']['dev']
+
+    status, body, _ = call('POST', '/api/finalize-cost', {
+        'results': [{"env": "dev", "pods": 2, "cpu_req": 500}], 'plan_nodes': True
+    })
+    assert status == 200
+    planned = body['finalized_costs']['dev']
+    assert planned['node_count'] == planned['node_plan']['recommended']['node_count'] == 1 != estimate['node_count']
+    assert 'warning' not in planned['node_plan']
+
+    # 100 cores per pod fits no instance type: the plan is returned, the count is not replaced
+    status, body, _ = call('POST', '/api/finalize-cost', {
+        'results': [{"env": "dev", "pods": 3, "cpu_req": 100000}], 'plan_nodes': True
+    })
+    assert status == 200
+    unplaced = body['finalized_costs']['dev']
+    assert unplaced['node_plan']['recommended']['unplaceable_pods'] == 3
+    assert unplaced['node_count'] == estimate['node_count']
+    assert unplaced['node_plan']['warning'].startswith('3 pods fit on no instance type')
+
+
+def test_sessions_off_by_default_keep_stateless_responses():
+    assert not app.state_store.enabled
+    status, body, headers = call('POST', '/api/add', {"env": "dev", "namespace": "a"})
+    assert status == 200
+    assert body['message'] == 'Entry added successfully (frontend should manage state)'
+    assert body['entry']['cpu_core_ns'] == 6
+    assert 'X-Session-Id' not in headers
+
+    status, body, _ = call('GET', '/api/summary')
+    assert status == 200
+    assert 'frontend' in body['message']
+
+
+def test_finalize_rejects_bool_cost_after_first_row():
+    status, body, _ = call('POST', '/api/finalize-cost', {'results': [
+        {"env": "dev", "monthlyCost": 1, "annualCost": 12},
+        {"env": "dev", "monthlyCost": True, "annualCost": 12}
+    ]})
+    assert status == 400
+    assert 'monthlyCost' in body['error']
+
+
+@pytest.mark.parametrize('results', [
+    [1],
+    [{"env": "dev", "pods": 2, "cpu_req": 500}, "row"],
+    {"dev": [1]},
+    {"dev": 5}
+])
+def test_node_plan_rejects_invalid_result_entries(results):
+    status, body, _ = call('POST', '/api/node-plan', {'results': results})
+    assert status == 400
+    assert body['error'].startswith('Invalid result entry')
+
+
+def test_config_version_reports_no_fallback():
+    status, body, headers = call('GET', '/api/config-version')
+    assert status == 200
+    assert body['config_version'] == headers['X-Config-Version'] == app.config_store.version
+    assert body['fallback'] is False
+    assert body['fallback_configs'] == [] and body['config_errors'] == []
+
+
+def get_config(accept_encoding=None, if_none_match=None):
+    event = make_event('GET', '/api/config')
+    if accept_encoding:
+        event['headers']['Accept-Encoding'] = accept_encoding
+    if if_none_match:
+        event['headers']['If-None-Match'] = if_none_match
+    return app.lambda_handler(event, None)
+
+
+def test_config_etag_differs_per_content_encoding():
+    identity = get_config()
+    gzipped = get_config('gzip, deflate')
+    assert identity['statusCode'] == gzipped['statusCode'] == 200
+    assert gzipped['headers']['Content-Encoding'] == 'gzip'
+    assert identity['headers']['Vary'] == gzipped['headers']['Vary'] == 'Accept-Encoding'
+    assert identity['headers']['ETag'] == app.PRECOMPUTED['config_etag']
+    assert gzipped['headers']['ETag'] == app.PRECOMPUTED['config_etag'][:-1] + '-gzip"'
+
+
+@pytest.mark.parametrize('accept_encoding', [None, 'gzip'])
+def test_config_conditional_get(accept_encoding):
+    etag = get_config(accept_encoding)['headers']['ETag']
+    for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+        response = get_config(accept_encoding, if_none_match)
+        assert response['statusCode'] == 304
+        assert response['body'] == ''
+        assert response['headers']['ETag'] == etag
+
+    # A tag of the other encoding's body doesn't validate this one
+    other = get_config(None if accept_encoding else 'gzip')['headers']['ETag']
+    response = get_config(accept_encoding, other)
+    assert response['statusCode'] == 200
+    assert response['headers']['ETag'] == etag
+    assert response['body']
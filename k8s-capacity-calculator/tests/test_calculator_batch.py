@@ -0,0 +1,99 @@
+"""calculate_final_cost_batch (NumPy columns) against the streaming calculate_final_cost"""
+import pytest
+
+from test_app import call
+from test_calculator_parity import ROW_SETS, assert_same, finalize
+from utils import calculator
+from utils.calculator import calculate_final_cost_batch
+from utils.config_loader import ConfigLoader
+from utils.records import InvalidRecordError
+
+
+@pytest.fixture(scope='module')
+def config_loader():
+    return ConfigLoader(use_bundle=False)
+
+
+@pytest.fixture
+def numpy():
+    return pytest.importorskip('numpy')
+
+
+def finalize_batch(results, config_loader):
+    return {env: env_data.to_dict() for env, env_data in calculate_final_cost_batch(results, config_loader).items()}
+
+
+@pytest.mark.parametrize('name', sorted(ROW_SETS))
+def test_batch_matches_streaming(numpy, name, config_loader):
+    rows = ROW_SETS[name]
+    assert_same(finalize_batch(rows, config_loader), finalize(rows, config_loader))
+
+
+def test_batch_env_grouped_and_generator_input(numpy, config_loader):
+    grouped = {
+        "prod": [{"monthlyCost": 2205.12, "annualCost": 26461.44, "tribe": "bank_transfer"}] * 3,
+        "dev": [{"monthlyCost": 413, "annualCost": 4956}, {"monthlyCost": 583.84, "annualCost": 7006.08}],
+        "empty": []
+    }
+    assert_same(finalize_batch(grouped, config_loader), finalize(grouped, config_loader))
+    rows = ROW_SETS['multi env interleaved']
+    assert_same(finalize_batch(iter(rows), config_loader), finalize(rows, config_loader))
+
+
+def test_batch_many_rows_mixed_int_and_float(numpy, config_loader):
+    envs = ("prod", "dev", "staging", "qa", "ints")
+    rows = []
+    for i in range(20000):
+        env = envs[i % len(envs)]
+        # "ints" only ever sees ints; the other envs mix ints and floats
+        monthly = i % 500 if env == "ints" or i % 3 == 0 else 413.46 + i % 7 / 10
+        rows.append({"env": env, "monthlyCost": monthly, "annualCost": monthly * 12})
+    batch = finalize_batch(rows, config_loader)
+    assert_same(batch, finalize(rows, config_loader))
+    assert type(batch["ints"]["raw_monthly"]) is int
+
+
+def test_batch_coerces_string_empty_and_none_costs(numpy, config_loader):
+    rows = [
+        {"env": "dev", "monthlyCost": "413.46", "annualCost": " 4961.52 "},
+        {"env": "dev", "monthlyCost": "", "annualCost": None},
+        {"env": "prod", "monthlyCost": None, "annualCost": ""},
+        {"env": "prod", "monthlyCost": 10, "annualCost": "120"}
+    ]
+    assert_same(finalize_batch(rows, config_loader), finalize(rows, config_loader))
+
+
+@pytest.mark.parametrize('results', [
+    [{"env": "dev", "monthlyCost": 1}, {"env": "dev", "monthlyCost": True}],
+    [{"env": "dev", "monthlyCost": 1}, {"env": "dev", "annualCost": "abc"}],
+    [{"env": "dev"}, 1],
+    {"dev": [{"monthlyCost": 1}, None]},
+    {"dev": 5}
+])
+def test_batch_rejects_invalid_rows(numpy, results, config_loader):
+    with pytest.raises(InvalidRecordError):
+        calculate_final_cost_batch(results, config_loader)
+
+
+def test_batch_falls_back_without_numpy(monkeypatch, config_loader):
+    monkeypatch.setattr(calculator, 'np', None)
+    rows = ROW_SETS['multi env interleaved']
+    assert_same(finalize_batch(rows, config_loader), finalize(rows, config_loader))
+
+
+def test_finalize_endpoint_uses_batch_path_for_large_lists(numpy, monkeypatch):
+    batch_calls = []
+
+    def counting_batch(results):
+        batch_calls.append(len(results))
+        return calculate_final_cost_batch(results)
+
+    monkeypatch.setattr('app.calculate_final_cost_batch', counting_batch)
+    rows = [
+        {"env": "dev" if i % 2 else "prod", "monthlyCost": 10, "annualCost": 120}
+        for i in range(calculator.BATCH_MIN_ROWS)
+    ]
+    status, body, _ = call('POST', '/api/finalize-cost', {'results': rows})
+    assert status == 200
+    assert batch_calls == [len(rows)]
+    assert body['raw_total_monthly'] == 10 * len(rows)
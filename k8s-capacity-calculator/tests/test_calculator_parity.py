@@ -0,0 +1,155 @@
+"""calculate_final_cost against the original list-grouping implementation it replaced"""
+import math
+
+import pytest
+
+from utils.calculator import calculate_final_cost
+from utils.config_loader import ConfigLoader
+from utils.records import InvalidRecordError
+
+
+@pytest.fixture(scope='module')
+def config_loader():
+    return ConfigLoader(use_bundle=False)
+
+
+def baseline_calculate_final_cost(results, config_loader):
+    """The original calculate_final_cost, minus its debug prints"""
+    if isinstance(results, list):
+        env_groups = {}
+        for entry in results:
+            env_groups.setdefault(entry.get("env", "default"), []).append(entry)
+        results = env_groups
+
+    finalized_results = {}
+    for env, env_entries in results.items():
+        namespace_count = len(env_entries)
+        total_monthly_cost = 0
+        total_annual_cost = 0
+        for entry in env_entries:
+            total_monthly_cost += entry.get("monthlyCost", 0)
+            total_annual_cost += entry.get("annualCost", 0)
+
+        cpu_per_namespace = 128 if env == "prod" else 6
+        total_cpu_cores = namespace_count * cpu_per_namespace
+        total_cpu_buffered_cores = math.ceil(total_cpu_cores * 1.3)
+        if env == "prod":
+            node_count = math.ceil(total_cpu_buffered_cores / 2.29)
+        else:
+            node_count = math.ceil(total_cpu_buffered_cores / 2)
+
+        first = env_entries[0] if env_entries else {}
+        tribe_name = first.get("tribe", "")
+        finalized_results[env] = {
+            "cluster_name": first.get("cluster", "Unknown Cluster"),
+            "provisioner": first.get("provisioner", "Tier1"),
+            "pdb": first.get("pdb", "minUnavailable = 1"),
+            "eks_version": first.get("eks_version", "v1.32"),
+            "namespace_count": namespace_count,
+            "total_cpu": f"{total_cpu_cores}",
+            "total_cpu_buffered": f"{total_cpu_buffered_cores}",
+            "node_count": node_count,
+            "monthly_cost": f"${total_monthly_cost:,.2f}",
+            "annual_cost": f"${total_annual_cost:,.2f}",
+            "raw_monthly": total_monthly_cost,
+            "raw_annual": total_annual_cost,
+            "tribe_approver": config_loader.find_approver(tribe_name) if tribe_name else "Unknown"
+        }
+    return finalized_results
+
+
+def finalize(results, config_loader):
+    return {env: env_data.to_dict() for env, env_data in calculate_final_cost(results, config_loader).items()}
+
+
+def assert_same(actual, expected):
+    # repr() also tells 100 from 100.0 and catches reordered envs or keys
+    assert repr(actual) == repr(expected)
+
+
+ROW_SETS = {
+    'single env': [
+        {"env": "dev", "monthlyCost": 413.46, "annualCost": 4961.52, "tribe": "bank_cashin", "cluster": "c1"}
+    ],
+    'int costs': [
+        {"env": "prod", "monthlyCost": 100, "annualCost": 1200},
+        {"env": "prod", "monthlyCost": 250, "annualCost": 3000, "provisioner": "Tier3"}
+    ],
+    'multi env interleaved': [
+        {"env": "prod", "monthlyCost": 2205.12, "annualCost": 26461.44, "provisioner": "Tier4",
+         "pdb": "maxUnavailable = 1", "eks_version": "v1.31", "tribe": "Bank_Cashin "},
+        {"env": "dev", "monthlyCost": 413.46, "annualCost": 4961.52, "tribe": "no-such-tribe"},
+        {"env": "prod", "monthlyCost": 583.84, "annualCost": 7006.08},
+        {"monthlyCost": 1, "annualCost": 12},
+        {"env": "dev", "monthlyCost": 0.1, "annualCost": 0.2},
+        {"env": "staging", "monthlyCost": 1102.56, "annualCost": 13230.72}
+    ],
+    'missing costs': [
+        {"env": "dev"},
+        {"env": "dev", "monthlyCost": 5}
+    ]
+}
+
+
+@pytest.mark.parametrize('name', sorted(ROW_SETS))
+def test_list_input_matches_baseline(name, config_loader):
+    rows = ROW_SETS[name]
+    assert_same(finalize(rows, config_loader), baseline_calculate_final_cost(rows, config_loader))
+
+
+def test_env_grouped_input_matches_baseline(config_loader):
+    grouped = {
+        "prod": [{"monthlyCost": 2205.12, "annualCost": 26461.44, "tribe": "bank_transfer"}] * 3,
+        "dev": [{"monthlyCost": 413.46, "annualCost": 4961.52}, {"monthlyCost": 583.84, "annualCost": 7006.08}],
+        "empty": []
+    }
+    assert_same(finalize(grouped, config_loader), baseline_calculate_final_cost(grouped, config_loader))
+
+
+def test_generator_input_matches_list(config_loader):
+    rows = ROW_SETS['multi env interleaved']
+    assert_same(finalize(iter(rows), config_loader), baseline_calculate_final_cost(rows, config_loader))
+
+
+def test_many_rows_match_baseline(config_loader):
+    envs = ("prod", "dev", "staging", "qa")
+    rows = [
+        {"env": envs[i % len(envs)], "monthlyCost": 413.46 + i % 7, "annualCost": (413.46 + i % 7) * 12}
+        for i in range(5000)
+    ]
+    assert_same(finalize(rows, config_loader), baseline_calculate_final_cost(rows, config_loader))
+
+
+def test_string_empty_and_none_costs_are_coerced(config_loader):
+    # The original implementation raised TypeError on these; they now count as
+    # the number they spell out, with null and "" as 0
+    rows = [
+        {"env": "dev", "monthlyCost": "413.46", "annualCost": " 4961.52 "},
+        {"env": "dev", "monthlyCost": "", "annualCost": None},
+        {"env": "prod", "monthlyCost": None, "annualCost": ""},
+        {"env": "prod", "monthlyCost": 10, "annualCost": "120"}
+    ]
+    coerced = [
+        {"env": "dev", "monthlyCost": 413.46, "annualCost": 4961.52},
+        {"env": "dev", "monthlyCost": 0, "annualCost": 0},
+        {"env": "prod", "monthlyCost": 0, "annualCost": 0},
+        {"env": "prod", "monthlyCost": 10, "annualCost": 120.0}
+    ]
+    assert_same(finalize(rows, config_loader), baseline_calculate_final_cost(coerced, config_loader))
+
+
+@pytest.mark.parametrize('rows', [
+    [{"env": "dev", "monthlyCost": True, "annualCost": 12}],
+    [{"env": "dev", "monthlyCost": 1, "annualCost": 12}, {"env": "dev", "monthlyCost": True, "annualCost": 12}],
+    [{"env": "dev", "monthlyCost": 1, "annualCost": 12}, {"env": "dev", "monthlyCost": 1, "annualCost": False}],
+    [{"env": "dev", "monthlyCost": 1, "annualCost": 12}, {"env": "dev", "monthlyCost": "abc", "annualCost": 12}]
+])
+def test_bool_and_non_numeric_costs_are_rejected(rows, config_loader):
+    with pytest.raises(InvalidRecordError):
+        calculate_final_cost(rows, config_loader)
+
+
+@pytest.mark.parametrize('grouped', [{"dev": [1]}, {"dev": [{"monthlyCost": 1}, None]}, {"dev": 5}])
+def test_env_grouped_input_rejects_non_object_rows(grouped, config_loader):
+    with pytest.raises(InvalidRecordError):
+        calculate_final_cost(grouped, config_loader)
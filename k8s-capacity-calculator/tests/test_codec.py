@@ -0,0 +1,194 @@
+"""Request body decoding and the incremental JSON array parsers in utils/codec.py"""
+import base64
+import gzip
+import io
+import json
+
+import pytest
+
+import app
+from test_app import call, make_event
+from utils import codec, router
+from utils.codec import CodecError, StreamedArray, decode_body, gunzip, iter_json_array, loads, loads_streaming
+from utils.router import RequestError, parse_json_body
+
+ELEMENTS = [
+    1, -2.5e-3, 1234567890123, "text, with [brackets] and \"quotes\"", "", "é☃",
+    None, True, False, [], {}, [1, [2, [3]]],
+    {"env": "prod", "monthlyCost": 413.46, "tags": {"a": [1, 2]}}
+]
+
+
+def read_array(text, chunk_chars):
+    return list(iter_json_array(io.StringIO(text), chunk_chars=chunk_chars))
+
+
+@pytest.mark.parametrize('chunk_chars', [1, 2, 3, 7, 64, 1024 * 1024])
+def test_elements_split_across_chunks(chunk_chars):
+    text = json.dumps(ELEMENTS)
+    assert read_array(text, chunk_chars) == ELEMENTS
+
+
+@pytest.mark.parametrize('chunk_chars', [1, 3, 5, 8])
+def test_numbers_cut_at_chunk_boundary(chunk_chars):
+    # A number that ends exactly at a chunk boundary must not be split into two
+    numbers = [12345678, 0.000125, -98765.4321, 6e10, 42]
+    assert read_array(json.dumps(numbers), chunk_chars) == numbers
+
+
+@pytest.mark.parametrize('text', [
+    ' [ 1 , 2 ,\n\t{"a" : [ 1 , 2 ] } , "x"\r\n] \n',
+    '[1,2,{"a":[1,2]},"x"]'
+])
+def test_whitespace_and_commas_between_elements(text):
+    expected = [1, 2, {"a": [1, 2]}, "x"]
+    for chunk_chars in (1, 4, 1024):
+        assert read_array(text, chunk_chars) == expected
+    assert list(loads_streaming('{"results": %s}' % text.strip(), 'results')['results']) == expected
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[\n]\n'])
+def test_empty_array(text):
+    assert read_array(text, 1) == []
+    body = loads_streaming('{"results": %s, "after": 1}' % text.strip(), 'results')
+    assert not body['results']
+    assert list(body['results']) == []
+    assert body['after'] == 1
+
+
+@pytest.mark.parametrize('text', ['{"results": []}', '"text"', '12', '', '  '])
+def test_non_array_top_level(text):
+    with pytest.raises(CodecError, match='must be a JSON array'):
+        read_array(text, 4)
+
+
+@pytest.mark.parametrize('text', ['[1, 2] x', '[1, 2]]', '[1, 2] [3]', '[] {}'])
+def test_trailing_garbage_after_array(text):
+    with pytest.raises(CodecError, match='extra data'):
+        read_array(text, 2)
+
+
+@pytest.mark.parametrize('text', ['[', '[1, 2', '[1, 2,', '[1, {"a": 1', '[1, "unterminated', '[1,]', '[1 2]', '[1,,2]'])
+def test_truncated_or_malformed_array(text):
+    for chunk_chars in (1, 3, 1024):
+        with pytest.raises(CodecError):
+            read_array(text, chunk_chars)
+
+
+def test_oversized_element_is_refused():
+    text = json.dumps(["x" * 100])
+    with pytest.raises(CodecError, match='exceeds 50 chars'):
+        list(iter_json_array(io.StringIO(text), chunk_chars=10, max_element_chars=50))
+
+
+@pytest.mark.parametrize('text, error', [
+    ('[{"results": []}]', 'must be a JSON object'),
+    ('{"results": [1, 2] "x": 1}', 'expected ,'),
+    ('{"results": [1, 2]} extra', 'extra data'),
+    ('{"results": [1, 2 3]}', 'expected , or ]'),
+    ('{"results": [1, 2', 'Invalid JSON body')
+])
+def test_loads_streaming_errors(text, error):
+    with pytest.raises(CodecError, match=error):
+        body = loads_streaming(text, 'results')
+        list(body['results'])
+
+
+def test_loads_streaming_matches_loads():
+    text = json.dumps({"before": {"a": 1}, "results": ELEMENTS, "after": [1, 2], "plan_nodes": True})
+    body = loads_streaming(text.encode('utf-8'), 'results')
+    assert isinstance(body['results'], StreamedArray)
+    assert body['before'] == {"a": 1}
+    # Members after the streamed array appear once it has been read to the end
+    assert 'after' not in body
+    assert list(body['results']) == ELEMENTS
+    assert {**body, 'results': ELEMENTS} == loads(text)
+    # Iterating again re-decodes the same elements
+    assert list(body['results']) == ELEMENTS
+
+
+def gzip_bytes(data):
+    return gzip.compress(data.encode('utf-8') if isinstance(data, str) else data)
+
+
+def test_decode_body_base64_and_gzip():
+    text = '{"results": [1, 2]}'
+    assert decode_body(text) == text
+    assert decode_body(base64.b64encode(text.encode()).decode(), is_base64=True) == text.encode()
+    assert decode_body(base64.b64encode(gzip_bytes(text)).decode(), True, 'gzip') == text.encode()
+    assert decode_body(gzip_bytes(text), False, ' X-Gzip ') == text.encode()
+    assert decode_body('', True, 'gzip') is None
+
+
+@pytest.mark.parametrize('body, is_base64, encoding, status', [
+    ('not base64!', True, None, 400),
+    (base64.b64encode(b'not gzip').decode(), True, 'gzip', 400),
+    (base64.b64encode(gzip_bytes('{"a": 1}')[:-12]).decode(), True, 'gzip', 400),
+    ('{}', False, 'br', 415)
+])
+def test_decode_body_errors(body, is_base64, encoding, status):
+    with pytest.raises(CodecError) as excinfo:
+        decode_body(body, is_base64, encoding)
+    assert excinfo.value.status_code == status
+
+
+def test_gunzip_stops_at_limit():
+    bomb = gzip_bytes(b'0' * (1024 * 1024))
+    with pytest.raises(CodecError) as excinfo:
+        gunzip(bomb, limit=1000)
+    assert excinfo.value.status_code == 413
+
+
+def test_gzip_bomb_answers_413(monkeypatch):
+    monkeypatch.setattr(codec, 'MAX_BODY_BYTES', 64 * 1024)
+    monkeypatch.setattr(codec, 'MAX_DECODED_BODY_BYTES', 256 * 1024)
+    # Compresses to a few KB, well under MAX_BODY_BYTES, but inflates past both limits
+    bomb = base64.b64encode(gzip_bytes(b'[' + b'0,' * (4 * 1024 * 1024) + b'0]')).decode()
+    assert len(bomb) < codec.MAX_BODY_BYTES
+
+    event = make_event('POST', '/api/finalize-cost')
+    event.update(body=bomb, isBase64Encoded=True, headers={'Content-Encoding': 'gzip'})
+    with pytest.raises(RequestError) as excinfo:
+        parse_json_body(event, 'results')
+    assert excinfo.value.status_code == 413
+
+    response = app.lambda_handler(event, None)
+    assert response['statusCode'] == 413
+
+
+def test_oversized_raw_body_answers_413(monkeypatch):
+    monkeypatch.setattr(codec, 'MAX_BODY_BYTES', 1024)
+    status, body, _ = call('POST', '/api/finalize-cost', {'results': [{"env": "dev", "pad": "x" * 2048}]})
+    assert status == 413
+    assert 'exceeds 1024 bytes' in body['error']
+
+
+def just_over_threshold_body():
+    rows = []
+    size = 0
+    i = 0
+    while size < router.STREAM_THRESHOLD_BYTES:
+        row = {"env": ("prod", "dev", "staging")[i % 3], "monthlyCost": 413.46 + i % 11, "annualCost": 4961.52 + i,
+               "tribe": "bank_cashin", "namespace": f"ns-{i}"}
+        rows.append(row)
+        size += len(json.dumps(row)) + 2
+        i += 1
+    return {"plan_nodes": False, "results": rows, "label": "after results"}
+
+
+def test_body_over_stream_threshold_matches_loads():
+    payload = just_over_threshold_body()
+    text = json.dumps(payload)
+    assert len(text) >= router.STREAM_THRESHOLD_BYTES
+
+    body = parse_json_body({'body': text}, stream_key='results')
+    assert isinstance(body['results'], StreamedArray)
+    assert list(body['results']) == payload['results']
+    assert body['label'] == 'after results'
+
+    # /api/finalize-cost answers the streamed body exactly like an already-parsed one
+    status, streamed, _ = call('POST', '/api/finalize-cost', payload)
+    assert status == 200
+    parsed = app.lambda_handler({**make_event('POST', '/api/finalize-cost'), 'body': payload}, None)
+    assert streamed == json.loads(parsed['body'])
+    assert sum(env['namespace_count'] for env in streamed['finalized_costs'].values()) == len(payload['results'])
@@ -0,0 +1,49 @@
+"""build_config_bundle.py and the bundles it writes"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT_DIR
+from utils.config_bundle import BUNDLE_FORMAT, BUNDLE_MAGIC, HEADER, ConfigBundleError, read_bundle
+
+BUILD_SCRIPT = os.path.join(ROOT_DIR, 'scripts', 'build_config_bundle.py')
+
+
+def run_build(output, bundle_env):
+    # Like a fresh package-lambda.sh run: no CONFIG_DIR, and the bundle the
+    # backend would load at cold start is the one being rebuilt
+    env = {key: value for key, value in os.environ.items() if key != 'CONFIG_DIR'}
+    env['CONFIG_BUNDLE'] = bundle_env
+    return subprocess.run(
+        [sys.executable, BUILD_SCRIPT, '--output', str(output)],
+        capture_output=True, text=True, env=env
+    )
+
+
+def old_schema_bundle():
+    return HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT, 0, bytes(32)) + b'old payload'
+
+
+@pytest.mark.parametrize('stale', [b'garbage', b'', old_schema_bundle()], ids=['corrupt', 'empty', 'old-schema'])
+def test_rebuild_replaces_unloadable_bundle(tmp_path, stale):
+    output = tmp_path / 'config_bundle.bin'
+    output.write_bytes(stale)
+    with pytest.raises(ConfigBundleError):
+        read_bundle(str(output))
+
+    completed = run_build(output, str(output))
+    assert completed.returncode == 0, completed.stderr
+    state = read_bundle(str(output))
+    assert state['configs']['calculatorDefaults']['pricing']
+
+
+def test_invalid_configs_fail_the_build(tmp_path):
+    completed = subprocess.run(
+        [sys.executable, BUILD_SCRIPT, '--config-dir', str(tmp_path), '--output', str(tmp_path / 'b.bin')],
+        capture_output=True, text=True
+    )
+    assert completed.returncode == 1
+    assert 'Invalid configs' in completed.stderr and 'costMap.json' in completed.stderr
+    assert not (tmp_path / 'b.bin').exists()
@@ -0,0 +1,141 @@
+"""ConfigStore revalidation against the config files on disk"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR, CONFIG_DIR
+from utils.config_bundle import ConfigError
+from utils.config_loader import FALLBACK_TIER_PRICING, ConfigLoader
+from utils.config_store import ConfigStore
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    for filename in os.listdir(CONFIG_DIR):
+        shutil.copy(os.path.join(CONFIG_DIR, filename), tmp_path)
+    # Differ from the checked-in configs, which a broken file could otherwise fall back to
+    set_tier_price(tmp_path, 'Tier8', 8.0)
+    monkeypatch.setenv('CONFIG_DIR', str(tmp_path))
+    return tmp_path
+
+
+def set_tier_price(config_dir, tier, monthly):
+    cost_map_path = config_dir / 'costMap.json'
+    cost_map = json.loads(cost_map_path.read_text())
+    cost_map[tier] = monthly
+    cost_map_path.write_text(json.dumps(cost_map))
+
+
+def bump_mtime(path):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def truncate(path):
+    data = path.read_bytes()
+    path.write_bytes(data[:len(data) // 2])
+
+
+def empty_pricing(path):
+    calculator_defaults = json.loads(path.read_text())
+    calculator_defaults['pricing'] = {}
+    path.write_text(json.dumps(calculator_defaults))
+
+
+@pytest.mark.parametrize('filename, break_file', [
+    ('costMap.json', truncate),
+    ('costMap.json', os.remove),
+    ('calculatorDefaults.json', empty_pricing)
+], ids=['truncated', 'deleted', 'invalid-schema'])
+def test_broken_file_keeps_current_snapshot(config_dir, filename, break_file):
+    store = ConfigStore(ConfigLoader(), ttl_seconds=0)
+    snapshot = store.current()
+    swapped = []
+    store.on_swap(swapped.append)
+
+    break_file(config_dir / filename)
+    assert store.revalidate() is False
+    assert store.current() is snapshot
+    assert store.loader.get_cost_map()['Tier8'] == 8.0
+    assert swapped == []
+
+    # Fixed files are picked up on the next revalidation
+    shutil.copy(os.path.join(CONFIG_DIR, filename), config_dir)
+    set_tier_price(config_dir, 'Tier9', 1.0)
+    assert store.revalidate() is True
+    assert store.loader.get_cost_map()['Tier9'] == 1.0
+    assert swapped == [store.current()]
+
+
+def test_touched_unchanged_file_keeps_loader(config_dir):
+    store = ConfigStore(ConfigLoader(), ttl_seconds=0)
+    snapshot = store.current()
+
+    bump_mtime(config_dir / 'costMap.json')
+    assert store.revalidate() is False
+    current = store.current()
+    assert current.loader is snapshot.loader
+    assert current.version == snapshot.version
+    assert current.loaded_at == snapshot.loaded_at
+    assert current.source_stamps != snapshot.source_stamps
+    # The old snapshot is never modified
+    assert snapshot.source_stamps['costMap.json'] != current.source_stamps['costMap.json']
+    assert store.revalidate() is False
+
+
+@pytest.mark.parametrize('break_file, error', [
+    (lambda config_dir: os.remove(config_dir / 'costMap.json'), 'costMap.json: not found'),
+    (lambda config_dir: truncate(config_dir / 'costMap.json'), 'costMap.json: cannot load'),
+    (lambda config_dir: empty_pricing(config_dir / 'calculatorDefaults.json'), '"pricing" must be a non-empty object')
+], ids=['missing', 'unparseable', 'invalid-schema'])
+def test_broken_configs_fail_the_load(config_dir, monkeypatch, break_file, error):
+    # Nothing to probe from here, so a broken file can't be found elsewhere
+    monkeypatch.chdir(config_dir)
+    break_file(config_dir)
+    with pytest.raises(ConfigError, match=error):
+        ConfigLoader()
+
+
+def test_fallbacks_need_opt_in(config_dir, monkeypatch):
+    monkeypatch.chdir(config_dir)
+    os.remove(config_dir / 'costMap.json')
+    monkeypatch.setenv('CONFIG_ALLOW_FALLBACK', '1')
+    loader = ConfigLoader()
+    assert loader.fallback_configs == ['costMap.json']
+    assert loader.get_cost_map() == dict(FALLBACK_TIER_PRICING)
+    assert loader.config_errors
+
+    # A reload is still refused while a file is missing
+    store = ConfigStore(loader, ttl_seconds=0)
+    assert store.revalidate(force=True) is False
+    assert store.loader is loader
+
+
+def test_cold_start_fails_on_broken_configs(config_dir):
+    truncate(config_dir / 'costMap.json')
+    env = {**os.environ, 'CONFIG_DIR': str(config_dir)}
+    env.pop('CONFIG_ALLOW_FALLBACK', None)
+    completed = subprocess.run(
+        [sys.executable, '-c', f'import sys; sys.path.insert(0, {BACKEND_DIR!r}); import app'],
+        capture_output=True, text=True, cwd=config_dir, env=env
+    )
+    assert completed.returncode != 0
+    assert 'ConfigError' in completed.stderr
+    assert 'costMap.json: cannot load' in completed.stderr
+
+
+def test_startup_timings_count_the_config_load_once():
+    code = (f'import json, sys; sys.path.insert(0, {BACKEND_DIR!r}); import app; '
+            'print(json.dumps(app.STARTUP_TIMINGS))')
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                               env={**os.environ, 'CONFIG_DIR': CONFIG_DIR, 'CONFIG_BUNDLE': 'none'})
+    assert completed.returncode == 0, completed.stderr
+    timings = json.loads(completed.stdout.splitlines()[-1])
+    phases = ['import_utils_ms', 'load_configs_ms', 'build_org_index_ms', 'precompute_responses_ms']
+    assert all(phase in timings for phase in phases)
+    # Phases are disjoint, so together they never exceed the whole init
+    assert sum(timings[phase] for phase in phases) <= timings['init_total_ms']
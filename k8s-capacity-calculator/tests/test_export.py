@@ -0,0 +1,164 @@
+"""CSV/NDJSON exports in utils/export.py, /api/finalize-cost?format=... and scripts/export_costs.py"""
+import base64
+import csv
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app
+from conftest import ROOT_DIR
+from test_app import make_event
+from utils.config_loader import ConfigLoader
+from utils.export import EXPORT_COLUMNS, iter_export_chunks, iter_export_records, iter_input_rows
+
+EXPORT_SCRIPT = os.path.join(ROOT_DIR, 'scripts', 'export_costs.py')
+
+ROWS = [
+    {"env": "prod", "namespace": "payments, core", "tribe": "bank_cashin", "cluster": "eks-1",
+     "provisioner": "Tier3", "pods": 4, "monthlyCost": 1102.56, "annualCost": 13230.72},
+    {"env": "dev", "namespace": 'say "hi"', "tribe": "buyload", "monthlyCost": 413.46, "annualCost": 4961.52},
+    {"env": "dev", "namespace": "line one\nline two\r\nthree", "tribe": "Side Project",
+     "monthlyCost": "583.84", "annualCost": 7006.08},
+    {"env": "prod", "namespace": "plain", "monthlyCost": 10, "annualCost": 120}
+]
+
+
+@pytest.fixture(scope='module')
+def config_loader():
+    return ConfigLoader(use_bundle=False)
+
+
+def export(rows, config_loader, export_format, **kwargs):
+    return ''.join(iter_export_chunks(rows, config_loader, export_format, **kwargs))
+
+
+def test_records_per_namespace_env_and_total(config_loader):
+    records = list(iter_export_records(ROWS, config_loader))
+    assert [record['record'] for record in records] == ['namespace'] * 4 + ['env', 'env', 'total']
+    assert records[0]['approver'] == 'Abi Baltazar' and records[0]['category'] == 'funds'
+    assert records[2]['monthly_cost'] == 583.84
+    prod, dev, total = records[4:]
+    assert (prod['env'], prod['namespace_count'], prod['monthly_cost']) == ('prod', 2, 1112.56)
+    assert (dev['env'], dev['namespace_count']) == ('dev', 2)
+    assert total['namespace_count'] == 4
+    assert total['monthly_cost'] == prod['monthly_cost'] + dev['monthly_cost']
+    assert total['node_count'] == prod['node_count'] + dev['node_count']
+
+    without_namespaces = list(iter_export_records(ROWS, config_loader, include_namespaces=False))
+    assert without_namespaces == records[4:]
+
+
+def test_csv_header_order_and_quoting(config_loader):
+    text = export(ROWS, config_loader, 'csv')
+    assert text.split('\n', 1)[0] == ','.join(EXPORT_COLUMNS)
+    assert '"payments, core"' in text
+    assert '"say ""hi"""' in text
+    assert '"line one\nline two\r\nthree"' in text
+
+    header, *rows = list(csv.reader(io.StringIO(text, newline='')))
+    assert header == list(EXPORT_COLUMNS)
+    assert len(rows) == 7
+    assert [row[EXPORT_COLUMNS.index('namespace')] for row in rows[:4]] == [row['namespace'] for row in ROWS]
+    # Columns that don't apply to a record are left empty
+    assert rows[-1][:4] == ['total', '', '', '']
+
+
+def test_ndjson_one_object_per_line(config_loader):
+    text = export(ROWS, config_loader, 'ndjson')
+    assert text.endswith('\n')
+    lines = text[:-1].split('\n')
+    assert len(lines) == 7
+    records = [json.loads(line) for line in lines]
+    assert all(list(record) == list(EXPORT_COLUMNS) for record in records)
+    assert records[2]['namespace'] == "line one\nline two\r\nthree"
+    assert records[-1]['record'] == 'total' and records[-1]['namespace'] is None
+    assert records == [
+        {column: record.get(column) for column in EXPORT_COLUMNS}
+        for record in json.loads(json.dumps(list(iter_export_records(ROWS, config_loader))))
+    ]
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+@pytest.mark.parametrize('chunk_chars', [1, 40, 300])
+def test_chunked_output_matches_one_shot(config_loader, export_format, chunk_chars):
+    one_shot = export(ROWS, config_loader, export_format, chunk_chars=10 ** 9)
+    chunks = list(iter_export_chunks(ROWS, config_loader, export_format, chunk_chars=chunk_chars))
+    assert ''.join(chunks) == one_shot
+    assert len(chunks) > 1
+    # Chunks end on record boundaries
+    assert all(chunk.endswith('\n') for chunk in chunks if chunk)
+
+
+def test_unknown_export_format(config_loader):
+    with pytest.raises(ValueError, match='Unsupported export format'):
+        export(ROWS, config_loader, 'xml')
+
+
+def test_input_formats_read_the_same_rows(config_loader):
+    ndjson = ''.join(json.dumps(row) + '\n\n' for row in ROWS)
+    csv_text = export(ROWS, config_loader, 'csv')
+    assert list(iter_input_rows(io.StringIO(json.dumps(ROWS)), 'json')) == ROWS
+    assert list(iter_input_rows(io.StringIO(ndjson), 'ndjson')) == ROWS
+    # The namespace records of an export read back as rows with string costs
+    namespaces = [row for row in iter_input_rows(io.StringIO(csv_text, newline=''), 'csv') if row['record'] == 'namespace']
+    assert [row['namespace'] for row in namespaces] == [row['namespace'] for row in ROWS]
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_finalize_cost_export(config_loader, export_format):
+    event = make_event('POST', '/api/finalize-cost', {'results': ROWS}, {'format': export_format})
+    response = app.lambda_handler(event, None)
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Disposition'] == f'attachment; filename="finalized-costs.{export_format}"'
+    assert response['body'] == export(ROWS, config_loader, export_format)
+
+    event['headers']['Accept-Encoding'] = 'gzip'
+    compressed = app.lambda_handler(event, None)
+    assert compressed['headers']['Content-Encoding'] == 'gzip'
+    assert compressed['isBase64Encoded'] is True
+    assert gzip.decompress(base64.b64decode(compressed['body'])).decode('utf-8') == response['body']
+
+
+def test_finalize_cost_export_without_namespaces(config_loader):
+    event = make_event('POST', '/api/finalize-cost', {'results': ROWS}, {'format': 'csv', 'namespaces': 'false'})
+    response = app.lambda_handler(event, None)
+    assert response['body'] == export(ROWS, config_loader, 'csv', include_namespaces=False)
+
+
+def run_script(*args, stdin=None):
+    return subprocess.run([sys.executable, EXPORT_SCRIPT, *args], input=stdin, capture_output=True, text=True)
+
+
+@pytest.mark.parametrize('filename, content', [
+    ('results.json', json.dumps(ROWS)),
+    ('results.ndjson', ''.join(json.dumps(row) + '\n' for row in ROWS))
+])
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_export_script_matches_api(tmp_path, config_loader, filename, content, export_format):
+    source = tmp_path / filename
+    source.write_text(content, encoding='utf-8')
+    output = tmp_path / f'out.{export_format}'
+    completed = run_script(str(source), '--format', export_format, '--output', str(output))
+    assert completed.returncode == 0, completed.stderr
+    assert output.read_bytes().decode('utf-8') == export(ROWS, config_loader, export_format)
+
+
+def test_export_script_stdin_json(config_loader):
+    completed = run_script('-', '--format', 'json', stdin=json.dumps(ROWS))
+    assert completed.returncode == 0, completed.stderr
+    finalized = json.loads(completed.stdout)
+    assert set(finalized) == {'prod', 'dev'}
+    assert finalized['prod']['namespace_count'] == 2
+
+
+def test_export_script_reports_bad_rows(tmp_path):
+    source = tmp_path / 'results.ndjson'
+    source.write_text('{"env": "dev"}\nnot json\n')
+    completed = run_script(str(source))
+    assert completed.returncode == 1
+    assert 'Invalid JSON on line 2' in completed.stderr
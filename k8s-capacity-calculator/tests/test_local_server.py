@@ -0,0 +1,50 @@
+import argparse
+import http.client
+import threading
+
+import pytest
+
+import app
+import local_server
+
+
+@pytest.mark.parametrize('workers, configured, expected', [
+    (1, None, 'memory'),
+    (1, 'sqlite', 'sqlite'),
+    (4, None, 'sqlite'),
+    (4, 'dynamodb', 'dynamodb'),
+    (4, 'none', 'none')
+])
+def test_state_store_backend_per_worker_count(monkeypatch, workers, configured, expected):
+    # Set before deleting: delenv of an unset variable records nothing to undo,
+    # and configure_state_store writes the variable itself
+    monkeypatch.setenv('STATE_STORE_BACKEND', configured or '')
+    if configured is None:
+        monkeypatch.delenv('STATE_STORE_BACKEND')
+    assert local_server.configure_state_store(workers) is None
+    assert local_server.os.environ['STATE_STORE_BACKEND'] == expected
+
+
+@pytest.mark.parametrize('configured', ['memory', 'dynamodb-local'])
+def test_per_process_state_store_refused_with_workers(monkeypatch, configured):
+    monkeypatch.setenv('STATE_STORE_BACKEND', configured)
+    assert 'keeps sessions per process' in local_server.configure_state_store(2)
+
+
+def test_pooled_server_serves_api_requests():
+    args = argparse.Namespace(host='127.0.0.1', port=0, static_dir='', payload_version=2,
+                              quiet=True, keepalive_timeout=1, threads=2)
+    server = local_server.make_server(app, args)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+        for _ in range(3):  # keep-alive: one connection, several requests
+            connection.request('GET', '/api/test')
+            response = connection.getresponse()
+            assert response.status == 200
+            assert b'Backend is working' in response.read()
+        connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,86 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BACKEND_DIR
+from utils import logger
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_unknown_log_level_falls_back_to_info():
+    previous = logger._root.level
+    collect = Collect()
+    logger._root.addHandler(collect)
+    try:
+        logger.set_level('VERBOSE')
+        assert logger._root.level == logging.INFO
+        assert [record.getMessage() for record in collect.records] == ["Unknown log level, using INFO"]
+
+        logger.set_level('DEBUG')
+        assert logger._root.level == logging.DEBUG
+    finally:
+        logger._root.removeHandler(collect)
+        logger._root.setLevel(previous)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('0.25', 0.25), ('1', 1.0), ('1.5', 1.0), ('-0.2', 0.0), (' 0.5 ', 0.5), ('inf', 1.0)
+])
+def test_sample_rate_is_clamped(monkeypatch, value, expected):
+    monkeypatch.setenv('LOG_DEBUG_SAMPLE_RATE', value)
+    assert logger.env_setting('LOG_DEBUG_SAMPLE_RATE', 0.1, logger.parse_sample_rate) == expected
+
+
+@pytest.mark.parametrize('name, value, parse, default', [
+    ('LOG_DEBUG_SAMPLE_RATE', 'ten percent', logger.parse_sample_rate, 0.1),
+    ('LOG_DEBUG_SAMPLE_RATE', 'nan', logger.parse_sample_rate, 0.1),
+    ('LOG_MAX_FIELD_CHARS', '2k', logger.parse_field_chars, 2048),
+    ('LOG_MAX_FIELD_CHARS', '1.5', logger.parse_field_chars, 2048),
+    ('LOG_MAX_FIELD_CHARS', '0', logger.parse_field_chars, 2048),
+    ('LOG_MAX_FIELD_CHARS', '-100', logger.parse_field_chars, 2048)
+])
+def test_malformed_settings_fall_back_with_a_warning(monkeypatch, name, value, parse, default):
+    monkeypatch.setenv(name, value)
+    previous = logger._root.level
+    collect = Collect()
+    logger._root.addHandler(collect)
+    try:
+        logger._root.setLevel(logging.WARNING)
+        assert logger.env_setting(name, default, parse) == default
+        assert [record.getMessage() for record in collect.records] == ["Invalid logging setting, using the default"]
+    finally:
+        logger._root.removeHandler(collect)
+        logger._root.setLevel(previous)
+
+
+def test_unset_or_blank_settings_use_the_default(monkeypatch):
+    monkeypatch.delenv('LOG_MAX_FIELD_CHARS', raising=False)
+    assert logger.env_setting('LOG_MAX_FIELD_CHARS', 2048, logger.parse_field_chars) == 2048
+    monkeypatch.setenv('LOG_MAX_FIELD_CHARS', '  ')
+    assert logger.env_setting('LOG_MAX_FIELD_CHARS', 2048, logger.parse_field_chars) == 2048
+    monkeypatch.setenv('LOG_MAX_FIELD_CHARS', '64')
+    assert logger.env_setting('LOG_MAX_FIELD_CHARS', 2048, logger.parse_field_chars) == 64
+
+
+def test_import_survives_malformed_settings():
+    env = {**os.environ, 'LOG_DEBUG_SAMPLE_RATE': 'often', 'LOG_MAX_FIELD_CHARS': 'lots', 'LOG_LEVEL': 'WARNING'}
+    completed = subprocess.run(
+        [sys.executable, '-c',
+         f'import sys; sys.path.insert(0, {BACKEND_DIR!r}); from utils import logger; '
+         'print(logger.DEBUG_SAMPLE_RATE, logger.MAX_FIELD_CHARS)'],
+        capture_output=True, text=True, env=env
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.splitlines()[-1] == '0.1 2048'
+    assert completed.stdout.count('Invalid logging setting') == 2
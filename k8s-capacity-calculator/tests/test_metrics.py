@@ -0,0 +1,157 @@
+"""EMF records and /api/metrics, with lambda_handler writing to a MemorySink"""
+import json
+import time
+
+import pytest
+
+import app
+from test_app import call, make_event
+from utils import metrics as metrics_module
+from utils.metrics import BYTES, COUNT, MILLISECONDS, MemorySink, metrics
+from utils.result_cache import ResultCache
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = MemorySink()
+    monkeypatch.setattr(metrics, 'sink', sink)
+    monkeypatch.setattr(metrics, 'histories', {})
+    monkeypatch.setattr(app, '_cold_start_reported', True)
+    return sink
+
+
+def handle(event):
+    response = app.lambda_handler(event, None)
+    return response, json.loads(response['body']) if response['body'] else None
+
+
+def metric_units(record):
+    (directive,) = record['_aws']['CloudWatchMetrics']
+    return {metric['Name']: metric['Unit'] for metric in directive['Metrics']}
+
+
+def test_request_emits_one_emf_record(sink):
+    started = int(time.time() * 1000)
+    event = make_event('POST', '/api/add', {"env": "dev", "namespace": "a"})
+    response, _ = handle(event)
+    assert response['statusCode'] == 200
+
+    (record,) = sink.records
+    (directive,) = record['_aws']['CloudWatchMetrics']
+    assert directive['Namespace'] == metrics.namespace
+    assert directive['Dimensions'] == [['Route']]
+    assert started <= record['_aws']['Timestamp'] <= int(time.time() * 1000)
+
+    assert record['Route'] == 'POST /api/add'
+    assert record['StatusCode'] == 200
+    assert record['ColdStart'] is False
+    assert record['correlation_id'] == response['headers']['X-Correlation-Id']
+
+    units = metric_units(record)
+    assert units == {
+        'RequestBytes': BYTES, 'ConfigCheckTime': MILLISECONDS, 'HandlerTime': MILLISECONDS,
+        'ParseBodyTime': MILLISECONDS, 'SerializeTime': MILLISECONDS, 'ResponseBytes': BYTES,
+        'RequestTime': MILLISECONDS
+    }
+    # Every declared metric has its value as a top-level member
+    assert record['RequestBytes'] == len(event['body'])
+    assert record['ResponseBytes'] == len(response['body'])
+    assert 0 <= record['HandlerTime'] <= record['RequestTime']
+
+
+def test_cold_start_is_reported_once(sink, monkeypatch):
+    monkeypatch.setattr(app, '_cold_start_reported', False)
+    handle(make_event('GET', '/api/test'))
+    handle(make_event('GET', '/api/test'))
+
+    cold, warm = sink.records
+    assert cold['ColdStart'] is True
+    assert metric_units(cold)['InitTime'] == MILLISECONDS
+    assert cold['InitTime'] == round(app.STARTUP_TIMINGS['init_total_ms'], 3)
+    assert warm['ColdStart'] is False
+    assert 'InitTime' not in warm and 'InitTime' not in metric_units(warm)
+
+
+def test_unmatched_routes_share_one_dimension_value(sink):
+    handle(make_event('GET', '/api/nope'))
+    handle(make_event('DELETE', '/api/other'))
+    assert [(record['Route'], record['StatusCode']) for record in sink.records] == [
+        ('unmatched', 404), ('unmatched', 404)
+    ]
+    assert all('HandlerTime' not in record for record in sink.records)
+
+
+def test_finalize_records_phase_timers_and_rows(sink, monkeypatch):
+    monkeypatch.setattr(app, 'result_cache', ResultCache(None))
+    rows = [{"env": env, "monthlyCost": 10, "annualCost": 120, "tribe": "bank_cashin"} for env in ("dev", "prod", "dev")]
+    response, _ = handle(make_event('POST', '/api/finalize-cost', {'results': rows}))
+    assert response['statusCode'] == 200
+
+    (record,) = sink.records
+    units = metric_units(record)
+    for timer in ('AggregateTime', 'FinalizeTime', 'ApproverLookupTime', 'SerializeTime'):
+        assert units[timer] == MILLISECONDS
+        assert record[timer] >= 0
+    assert units['Rows'] == COUNT
+    assert record['Rows'] == 3
+
+
+def test_repeated_values_add_up_within_a_request(sink, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(metrics_module.time, 'perf_counter', lambda: now[0])
+
+    metrics.start({'Route': 'test'}, Source='unit')
+    for elapsed in (0.002, 0.0035):
+        with metrics.timer('LookupTime'):
+            now[0] += elapsed
+    metrics.put('Rows', 2)
+    metrics.put('Rows', 3)
+    record = metrics.flush()
+
+    assert record is sink.records[-1]
+    assert record['LookupTime'] == 5.5
+    assert record['Rows'] == 5
+    assert record['Source'] == 'unit'
+    assert metrics.flush() is None
+
+
+def test_values_outside_a_request_only_feed_the_histories(sink):
+    metrics.put('ConfigLoadTime', 12.5, MILLISECONDS)
+    assert not sink.records
+    assert metrics.snapshot()['ConfigLoadTime']['count'] == 1
+
+
+def test_failing_sink_never_fails_the_request(sink, monkeypatch):
+    def broken_emit(record):
+        raise OSError('stdout closed')
+
+    monkeypatch.setattr(sink, 'emit', broken_emit)
+    response, _ = handle(make_event('GET', '/api/test'))
+    assert response['statusCode'] == 200
+
+
+def test_metrics_endpoint_summarizes_recent_requests(sink):
+    for _ in range(3):
+        handle(make_event('GET', '/api/test'))
+    status, body, _ = call('GET', '/api/metrics')
+    assert status == 200
+    assert body['enabled'] is True
+    assert body['namespace'] == metrics.namespace
+
+    request_time = body['metrics']['RequestTime']
+    assert request_time['unit'] == MILLISECONDS
+    assert request_time['count'] == request_time['total_count'] == 3
+    assert request_time['min'] <= request_time['p50'] <= request_time['p95'] <= request_time['max']
+    assert sum(request_time['buckets'].values()) == 3
+    # Only latencies get histogram buckets
+    assert body['metrics']['ResponseBytes']['unit'] == BYTES
+    assert 'buckets' not in body['metrics']['ResponseBytes']
+
+
+def test_metrics_off_without_a_sink(monkeypatch):
+    monkeypatch.setattr(metrics, 'histories', {})
+    assert metrics.sink is None
+    call('GET', '/api/test')
+    status, body, _ = call('GET', '/api/metrics')
+    assert body['enabled'] is False
+    assert body['metrics'] == {}
@@ -0,0 +1,142 @@
+"""Server-side namespace costing against the formulas in frontend/assets/js/calculatorCore.js"""
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import CONFIG_DIR, ROOT_DIR
+from utils.calculator import calculate_final_cost, calculate_namespace_cost, calculate_raw_costs, round_2dp
+from utils.config_loader import ConfigLoader
+
+CALCULATOR_CORE_JS = os.path.join(ROOT_DIR, 'frontend', 'assets', 'js', 'calculatorCore.js')
+
+# Prints {"pricing": STANDARD_PRICING, "results": [calculateNamespaceCost(row), ...]} for rows on stdin
+NODE_RUNNER = """
+import { readFileSync } from 'fs';
+for (const method of ['log', 'warn', 'error']) console[method] = () => {};
+const { STANDARD_PRICING, calculateNamespaceCost } = await import('./calculatorCore.mjs');
+const rows = JSON.parse(readFileSync(0, 'utf8'));
+process.stdout.write(JSON.stringify({ pricing: STANDARD_PRICING, results: rows.map(calculateNamespaceCost) }));
+"""
+
+ROWS = [
+    {"namespace": "a", "env": "dev", "pods": 4, "cpu_req": 500},
+    {"namespace": "b", "env": "prod", "pods": 3, "cpu_req": 2000},
+    {"namespace": "c", "env": "dev", "pods": 1, "cpu_req": 1},
+    {"namespace": "d", "env": "dev", "pods": 10, "cpu_req": 4923},
+    {"namespace": "e", "env": "prod", "pods": 200, "cpu_req": 1000},
+    {"namespace": "f", "env": "dev", "pods": "7", "cpu_req": " 250 "},
+    {"namespace": "g", "env": "dev", "pods": "", "cpu_req": 100},
+    {"namespace": "h", "env": "dev", "pods": None, "cpu_req": 100},
+    {"namespace": "i", "env": "dev", "pods": "abc", "cpu_req": 100},
+    {"namespace": "j", "env": "dev", "pods": 2},
+    {"namespace": "k", "env": "dev", "pods": -2, "cpu_req": 100},
+    {"namespace": "l", "env": "dev", "pods": 0, "cpu_req": 0},
+    {"namespace": "m", "env": "dev", "pods": 2, "cpu_req": 3000, "override_size": "L"},
+    {"namespace": "n", "env": "dev", "pods": 2, "cpu_req": 3000, "override_size": "XXL"},
+    {"namespace": "o", "env": "dev", "pods": 2, "cpu_req": 3000, "override_size": ""},
+    {"namespace": "p", "env": "dev", "pods": True, "cpu_req": 8000},
+    {"namespace": "q", "env": "dev", "pods": 1.5, "cpu_req": 3333.3},
+    {"namespace": "r", "env": "dev", "pods": 1, "cpu_req": 6150}
+]
+
+
+def loader_with_pricing(tmp_path, pricing):
+    """ConfigLoader over the checked-in configs with calculatorDefaults.pricing replaced"""
+    for filename in os.listdir(CONFIG_DIR):
+        shutil.copy(os.path.join(CONFIG_DIR, filename), tmp_path)
+    with open(os.path.join(CONFIG_DIR, 'calculatorDefaults.json')) as f:
+        calculator_defaults = json.load(f)
+    calculator_defaults['pricing'] = pricing
+    (tmp_path / 'calculatorDefaults.json').write_text(json.dumps(calculator_defaults))
+
+    previous = os.environ['CONFIG_DIR']
+    os.environ['CONFIG_DIR'] = str(tmp_path)
+    try:
+        return ConfigLoader(use_bundle=False)
+    finally:
+        os.environ['CONFIG_DIR'] = previous
+
+
+def run_calculator_core(tmp_path, rows):
+    shutil.copy(CALCULATOR_CORE_JS, tmp_path / 'calculatorCore.mjs')
+    (tmp_path / 'runner.mjs').write_text(NODE_RUNNER)
+    completed = subprocess.run(
+        ['node', str(tmp_path / 'runner.mjs')], input=json.dumps(rows),
+        capture_output=True, text=True, cwd=tmp_path, check=True
+    )
+    return json.loads(completed.stdout)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+def test_rows_match_calculate_namespace_cost_js(tmp_path):
+    js = run_calculator_core(tmp_path, ROWS)
+    config_dir = tmp_path / 'config'
+    config_dir.mkdir()
+    config_loader = loader_with_pricing(config_dir, js['pricing'])
+
+    for row, expected in zip(ROWS, js['results']):
+        assert calculate_namespace_cost(row, config_loader) == expected, row['namespace']
+
+
+STANDARD_PRICING = {
+    "S": {"cpu_max": 8, "monthly": 413.46},
+    "M": {"cpu_max": 16, "monthly": 583.84},
+    "L": {"cpu_max": 32, "monthly": 1102.56},
+    "XL": {"cpu_max": 64, "monthly": 2205.12}
+}
+
+
+@pytest.mark.parametrize('row, size, buffered_cpu, monthly', [
+    ({"pods": 4, "cpu_req": 500}, "S", 3, 413.46),            # 2 cores * 1.3 -> 3
+    ({"pods": 10, "cpu_req": 1000}, "M", 13, 583.84),         # 10 cores * 1.3 -> 13
+    ({"pods": 1, "cpu_req": 6150}, "S", 8, 413.46),           # 7.995 cores -> ceil(7.995) = 8, fits S exactly
+    ({"pods": 100, "cpu_req": 1000}, "XL", 130, 2205.12),     # larger than every tier: the largest
+    ({"pods": 2, "cpu_req": 3000, "override_size": "L"}, "L", 8, 1102.56),
+    ({"pods": 2, "cpu_req": 3000, "override_size": "XXL"}, "S", 8, 413.46),
+    ({"pods": 0, "cpu_req": 100}, "S", 0, 413.46)
+])
+def test_known_row_costs(tmp_path, row, size, buffered_cpu, monthly):
+    result = calculate_namespace_cost(row, loader_with_pricing(tmp_path, STANDARD_PRICING))
+    assert (result["recommendedSize"], result["bufferedCpu"], result["monthlyCost"]) == (size, buffered_cpu, monthly)
+    assert result["annualCost"] == round(monthly * 12, 2)
+    assert result["calculationError"] is None
+
+
+@pytest.mark.parametrize('row, error', [
+    ("not a row", 'Invalid namespace data'),
+    ({"pods": 2}, 'Missing required fields'),
+    ({"pods": "abc", "cpu_req": 100}, 'Invalid numeric values')
+])
+def test_invalid_rows_cost_nothing(row, error):
+    result = calculate_namespace_cost(row, ConfigLoader(use_bundle=False))
+    assert (result["monthlyCost"], result["annualCost"], result["recommendedSize"]) == (0, 0, "XL")
+    assert result["calculationError"] == error
+
+
+def test_raw_costs_aggregate_like_finalize(tmp_path):
+    config_loader = loader_with_pricing(tmp_path, STANDARD_PRICING)
+    rows, finalized_costs, totals = calculate_raw_costs(ROWS, config_loader)
+
+    assert [row["namespace"] for row in rows] == [row["namespace"] for row in ROWS]
+    assert totals["namespaces"] == len(ROWS)
+    assert totals["errors"] == sum(1 for row in rows if row["calculationError"])
+    assert totals["monthly"] == sum(row["monthlyCost"] for row in rows)
+    assert {env: env_data.to_dict() for env, env_data in finalized_costs.items()} == \
+        {env: env_data.to_dict() for env, env_data in calculate_final_cost(rows, config_loader).items()}
+
+    no_rows, streamed_costs, streamed_totals = calculate_raw_costs(iter(ROWS), config_loader, include_rows=False)
+    assert no_rows is None
+    assert streamed_totals == totals
+    assert {env: env_data.to_dict() for env, env_data in streamed_costs.items()} == \
+        {env: env_data.to_dict() for env, env_data in finalized_costs.items()}
+
+
+def test_tier_costs_are_rounded_once(tmp_path):
+    config_loader = loader_with_pricing(tmp_path, {**STANDARD_PRICING, "M": {"cpu_max": 16, "monthly": 0.125}})
+    assert config_loader.tier_costs["M"] == (round_2dp(0.125), round_2dp(0.125 * 12)) == (0.13, 1.5)
+
+    result = calculate_namespace_cost({"pods": 10, "cpu_req": 1000}, config_loader)
+    assert (result["recommendedSize"], result["monthlyCost"], result["annualCost"]) == ("M", 0.13, 1.5)
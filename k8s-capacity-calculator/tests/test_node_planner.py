@@ -0,0 +1,133 @@
+import pytest
+
+from utils.config_bundle import validate_configs
+from utils.config_loader import ConfigLoader
+from utils.node_planner import (
+    DEFAULT_INSTANCE_CATALOG, catalog_errors, pack_first_fit_decreasing, plan_for_instance, plan_nodes,
+    plan_nodes_by_env
+)
+
+
+def test_default_catalog_is_valid():
+    assert catalog_errors(list(DEFAULT_INSTANCE_CATALOG)) == []
+
+
+@pytest.mark.parametrize('instance, error', [
+    ({"name": "zero", "cpu": 0, "memory": 1024}, 'cpu must be a positive number'),
+    ({"name": "negative", "cpu": 1000, "memory": -1}, 'memory must be a positive number'),
+    ({"name": "text", "cpu": "4000", "memory": 1024}, 'cpu must be a positive number'),
+    ({"name": "bool", "cpu": True, "memory": 1024}, 'cpu must be a positive number'),
+    ({"name": "nan", "cpu": float('nan'), "memory": 1024}, 'cpu must be a positive number'),
+    ({"name": "free", "cpu": 1000, "memory": 1024, "monthly": 0}, 'monthly must be a positive number'),
+    ({"name": "", "cpu": 1000, "memory": 1024}, 'name must be a non-empty string'),
+    ({"cpu": 1000, "memory": 1024}, 'name must be a non-empty string')
+])
+def test_invalid_instances_are_reported(instance, error):
+    assert catalog_errors([instance]) == [f'instance_catalog[0].{error}']
+
+
+def test_config_catalog_is_validated():
+    configs = {
+        'calculatorDefaults': {
+            'pricing': {'Tier1': {'cpu_max': 8, 'monthly': 413.46}},
+            'instance_catalog': [{"name": "tiny", "cpu": 0, "memory": 1024}]
+        },
+        'costMap': {}, 'defaults': {}, 'orgMapping': []
+    }
+    assert validate_configs(configs) == [
+        'calculatorDefaults.json: instance_catalog[0].cpu must be a positive number'
+    ]
+
+
+def test_nodes_too_small_for_any_pod():
+    assert pack_first_fit_decreasing({(500, 256): 3}, 0, 1024) == ([], 3)
+
+
+def test_pods_of_different_shapes_share_nodes():
+    # Largest first: each 3-core pod opens a node, the 1-core pods fill the gaps before opening another
+    groups, unplaceable = pack_first_fit_decreasing({(1000, 1000): 4, (3000, 1000): 2}, 4000, 8000)
+    assert unplaceable == 0
+    assert groups == [[0, 6000, 2], [2000, 6000, 1]]
+
+
+def test_memory_bound_pods():
+    groups, unplaceable = pack_first_fit_decreasing({(100, 3000): 5}, 4000, 8000)
+    assert (groups, unplaceable) == ([[3800, 2000, 2], [3900, 5000, 1]], 0)
+
+
+def test_packing_matches_one_pod_at_a_time():
+    shapes = {(1500, 2048): 7, (700, 6000): 5, (250, 512): 23, (3000, 1024): 3}
+    node_cpu, node_memory = 3920, 14500
+    nodes = []
+    for (cpu, memory), pods in sorted(
+        shapes.items(), key=lambda item: max(item[0][0] / node_cpu, item[0][1] / node_memory), reverse=True
+    ):
+        for _ in range(pods):
+            node = next((node for node in nodes if node[0] >= cpu and node[1] >= memory), None)
+            if node is None:
+                node = [node_cpu, node_memory]
+                nodes.append(node)
+            node[0] -= cpu
+            node[1] -= memory
+
+    groups, unplaceable = pack_first_fit_decreasing(shapes, node_cpu, node_memory)
+    assert unplaceable == 0
+    assert [node for free_cpu, free_memory, count in groups for node in [[free_cpu, free_memory]] * count] == nodes
+
+
+SMALL = {"name": "small", "cpu": 2000, "memory": 8000, "monthly": 50}
+BIG = {"name": "big", "cpu": 8000, "memory": 32000, "monthly": 300}
+
+
+def test_cheapest_instance_type_is_recommended():
+    plan = plan_nodes({(1000, 1000): 8}, [BIG, SMALL])
+    assert plan["node_counts"] == {"big": 1, "small": 4}
+    assert plan["recommended"]["instance_type"] == "small"
+    assert plan["recommended"]["monthly_cost"] == 200
+    assert (plan["pod_count"], plan["pod_shapes"]) == (8, 1)
+
+
+def test_instance_types_that_leave_pods_out_are_not_recommended():
+    # Nothing fits on "small", which would otherwise be the cheapest at 0 nodes
+    plan = plan_nodes({(3000, 1000): 2}, [SMALL, BIG])
+    assert plan["recommended"]["instance_type"] == "big"
+    assert plan["recommended"]["unplaceable_pods"] == 0
+    assert plan["alternatives"][0]["unplaceable_pods"] == 2
+
+
+def test_fewest_nodes_without_prices():
+    catalog = [{**SMALL, "monthly": None}, {**BIG, "monthly": None}]
+    plan = plan_nodes({(1000, 1000): 8}, catalog)
+    assert plan["recommended"]["instance_type"] == "big"
+    assert plan["recommended"]["monthly_cost"] is None
+
+
+def test_buffer_reserves_headroom_on_every_node():
+    shapes = {(1000, 100): 12}
+    instance = {"name": "m", "cpu": 4000, "memory": 16000, "monthly": 100}
+    unbuffered = plan_for_instance(shapes, instance)
+    buffered = plan_for_instance(shapes, instance, buffer=1.3)
+    # 4000 / 1.3 leaves room for 3 one-core pods per node instead of 4
+    assert (unbuffered["node_count"], buffered["node_count"]) == (3, 4)
+    assert unbuffered["cpu_utilization"] == 1.0
+    assert buffered["cpu_utilization"] == 0.75
+    assert buffered["wasted_cpu_millicores"] == 4 * 4000 - 12000
+    assert buffered["monthly_cost"] == 400
+
+
+def test_plan_nodes_by_env_uses_standard_pod_size():
+    config_loader = ConfigLoader(use_bundle=False)
+    defaults = config_loader.get_calculator_defaults().get('defaults', {})
+    rows = [
+        {"env": "dev", "pods": 2},
+        {"env": "dev", "pods": 3, "cpu_req": 250, "mem_req": 512},
+        {"env": "prod", "pods": 0, "cpu_req": 500},
+        {"env": "prod", "pods": "many"}
+    ]
+    plans = plan_nodes_by_env(rows, config_loader, [BIG])
+    standard_shape = (defaults.get('standard_pod_cpu', 1000), defaults.get('standard_pod_memory', 4096))
+    assert plans["dev"]["pod_count"] == 5
+    assert plans["dev"]["pod_shapes"] == 2
+    assert plans["dev"]["recommended"] == plan_nodes({standard_shape: 2, (250, 512): 3}, [BIG])["recommended"]
+    # Rows without usable pods still give their env an (empty) plan
+    assert plans["prod"]["pod_count"] == 0
@@ -0,0 +1,169 @@
+"""Response cache backends and X-Cache on /api/finalize-cost"""
+import sqlite3
+
+import pytest
+
+import app
+from test_app import make_event
+from utils import result_cache as result_cache_module
+from utils.result_cache import CacheBackend, MemoryLRUBackend, ResultCache, SQLiteBackend
+
+
+def test_incomplete_backend_fails_when_created():
+    class GetOnlyBackend(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnlyBackend()
+
+
+def test_memory_backend_round_trip():
+    cache = ResultCache(MemoryLRUBackend(max_bytes=1024))
+    cache.set('key', '{"success": true}')
+    assert cache.get('key') == '{"success": true}'
+    assert cache.get('missing') is None
+
+
+def test_memory_backend_evicts_least_recently_used_by_bytes():
+    backend = MemoryLRUBackend(max_bytes=10)
+    backend.set('a', 'aaaa')
+    backend.set('b', 'bbbb')
+    assert backend.get('a') == 'aaaa'  # b is now the least recently used
+    backend.set('c', 'cccc')
+    assert (backend.get('a'), backend.get('b'), backend.get('c')) == ('aaaa', None, 'cccc')
+    assert (len(backend), backend.size_bytes()) == (2, 8)
+
+    # Sizes are UTF-8 bytes, not characters: 'éé' is 4 bytes
+    backend.set('a', 'éé')
+    assert backend.size_bytes() == 8
+    backend.set('d', 'ééé')
+    assert backend.get('c') is None
+    assert (len(backend), backend.size_bytes()) == (2, 10)
+
+    # A body larger than the whole budget is never stored and evicts nothing
+    backend.set('huge', 'x' * 11)
+    assert backend.get('huge') is None
+    assert len(backend) == 2
+
+
+def test_hit_and_miss_counters():
+    cache = ResultCache(MemoryLRUBackend(max_bytes=1024))
+    cache.get('a')
+    cache.set('a', 'body')
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    assert cache.stats() == {
+        'enabled': True, 'backend': 'MemoryLRUBackend', 'entries': 1, 'size_bytes': 4, 'max_bytes': 1024,
+        'hits': 2, 'misses': 2, 'hit_ratio': 0.5
+    }
+    assert ResultCache(None).stats() == {'enabled': False}
+
+
+def test_failing_backend_counts_as_a_miss():
+    class BrokenBackend(MemoryLRUBackend):
+        def get(self, key):
+            raise sqlite3.OperationalError('database is locked')
+
+        def set(self, key, value):
+            raise sqlite3.OperationalError('database is locked')
+
+    cache = ResultCache(BrokenBackend())
+    cache.set('a', 'body')
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_sqlite_backend_persists_across_instances(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    SQLiteBackend(path).set('key', '{"success": true, "name": "é"}')
+    reopened = SQLiteBackend(path)
+    assert reopened.get('key') == '{"success": true, "name": "é"}'
+    assert (len(reopened), reopened.size_bytes()) == (1, len('{"success": true, "name": "é"}'.encode('utf-8')))
+
+
+def stored_size(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT COALESCE(SUM(size), 0) FROM result_cache').fetchone()[0]
+
+
+def test_sqlite_backend_expires_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache_module.time, 'time', lambda: now[0])
+    path = str(tmp_path / 'cache.sqlite3')
+    backend = SQLiteBackend(path, max_bytes=10)
+
+    for key in ('a', 'b', 'c'):
+        now[0] += 1
+        backend.set(key, key * 3)
+    now[0] += 1
+    assert backend.get('a') == 'aaa'  # b is now the least recently used
+    now[0] += 1
+    backend.set('d', 'ddd')
+    assert backend.get('b') is None
+    assert [backend.get(key) for key in ('a', 'c', 'd')] == ['aaa', 'ccc', 'ddd']
+    assert backend.size_bytes() == stored_size(path) == 9
+
+    # Replacing an entry frees its old size; one over the budget evicts as many as needed
+    now[0] += 1
+    backend.set('a', 'a')
+    assert backend.size_bytes() == stored_size(path) == 7
+    now[0] += 1
+    backend.set('e', 'e' * 9)
+    assert [backend.get(key) for key in ('a', 'c', 'd', 'e')] == ['a', None, None, 'e' * 9]
+    assert backend.size_bytes() == stored_size(path) == 10
+
+    backend.set('huge', 'x' * 11)
+    assert backend.get('huge') is None
+    backend.clear()
+    assert (len(backend), backend.size_bytes()) == (0, 0)
+
+
+def test_sqlite_running_total_is_shared_by_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    first = SQLiteBackend(path, max_bytes=100)
+    second = SQLiteBackend(path, max_bytes=100)
+    first.set('a', 'a' * 30)
+    second.set('b', 'b' * 30)
+    second.set('a', 'a' * 10)
+    assert first.size_bytes() == second.size_bytes() == stored_size(path) == 40
+    first.set('c', 'c' * 70)
+    assert second.get('b') is None
+    assert second.size_bytes() == stored_size(path) == 80
+
+
+def test_sqlite_total_starts_from_existing_entries(tmp_path):
+    # A cache file from before the running total existed
+    path = str(tmp_path / 'cache.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            'CREATE TABLE result_cache ('
+            ' key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+        )
+        connection.execute("INSERT INTO result_cache VALUES ('old', x'616263', 3, 1)")
+    backend = SQLiteBackend(path)
+    assert backend.size_bytes() == 3
+    backend.set('new', 'de')
+    assert backend.size_bytes() == stored_size(path) == 5
+
+
+def test_repeated_finalize_cost_is_served_from_cache(monkeypatch):
+    cache = ResultCache(MemoryLRUBackend())
+    monkeypatch.setattr(app, 'result_cache', cache)
+    rows = [{"env": "dev", "monthlyCost": 10, "annualCost": 120}, {"env": "prod", "monthlyCost": 20, "annualCost": 240}]
+
+    first = app.lambda_handler(make_event('POST', '/api/finalize-cost', {'results': rows}), None)
+    # Same rows with keys in another order are the same request
+    reordered = [dict(reversed(list(row.items()))) for row in rows]
+    second = app.lambda_handler(make_event('POST', '/api/finalize-cost', {'results': reordered}), None)
+    assert (first['statusCode'], second['statusCode']) == (200, 200)
+    assert first['headers']['X-Cache'] == 'MISS'
+    assert second['headers']['X-Cache'] == 'HIT'
+    assert second['body'] == first['body']
+
+    # plan_nodes and other rows are different answers
+    planned = app.lambda_handler(make_event('POST', '/api/finalize-cost', {'results': rows, 'plan_nodes': True}), None)
+    other = app.lambda_handler(make_event('POST', '/api/finalize-cost', {'results': rows[:1]}), None)
+    assert planned['headers']['X-Cache'] == other['headers']['X-Cache'] == 'MISS'
+    assert (cache.hits, cache.misses) == (1, 3)
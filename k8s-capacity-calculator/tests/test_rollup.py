@@ -0,0 +1,155 @@
+"""Org-hierarchy cost rollup in utils/rollup.py and /api/rollup"""
+import pytest
+
+from test_app import call
+from utils.config_loader import UNKNOWN_APPROVER, ConfigLoader
+from utils.records import InvalidRecordError
+from utils.rollup import (
+    NO_TRIBE, ROLLUP_LEVELS, ROW_COLUMNS, UNMAPPED_CATEGORY, TribeResolver, aggregate_rollup, build_rollup,
+    build_tree, parse_levels
+)
+
+CASHIN = ("Abi Baltazar", "funds", "bank_cashin")
+BUYLOAD = ("Anna Mactal", "b2c", "buyload")
+MERCHANT = ("Anna Mactal", "b2b", "merchant_core")
+
+ROWS = [
+    {"env": "prod", "tribe": "bank_cashin", "monthlyCost": 100, "annualCost": 1200},
+    {"env": "prod", "tribe": " BANK_CashIn ", "monthlyCost": 50.5, "annualCost": 606},
+    {"env": "prod", "tribe": "buyload", "monthlyCost": 300, "annualCost": 3600},
+    {"env": "dev", "tribe": "merchant_core", "monthlyCost": "20", "annualCost": "240"},
+    {"env": "dev", "tribe": "Side Project", "monthlyCost": 5, "annualCost": 60},
+    {"env": "dev", "tribe": "side  project", "monthlyCost": 7, "annualCost": 84},
+    {"env": "dev", "monthlyCost": 1, "annualCost": 12}
+]
+
+
+@pytest.fixture(scope='module')
+def config_loader():
+    return ConfigLoader(use_bundle=False)
+
+
+def test_resolver_matches_tribes_case_and_whitespace_insensitively(config_loader):
+    resolve = TribeResolver(config_loader).resolve
+    assert resolve("bank_cashin") == CASHIN
+    assert resolve(" Bank_CashIn\t") == CASHIN
+    assert resolve("BUYLOAD") == BUYLOAD
+
+
+def test_resolver_groups_unmapped_tribes_under_first_spelling(config_loader):
+    resolve = TribeResolver(config_loader).resolve
+    assert resolve(" Side   Project ") == (UNKNOWN_APPROVER, UNMAPPED_CATEGORY, "Side Project")
+    assert resolve("side project") == (UNKNOWN_APPROVER, UNMAPPED_CATEGORY, "Side Project")
+    for tribe in ("", "   ", None, 42, ["bank_cashin"]):
+        assert resolve(tribe) == (UNKNOWN_APPROVER, UNMAPPED_CATEGORY, NO_TRIBE)
+
+
+def test_resolver_looks_each_raw_value_up_once(config_loader, monkeypatch):
+    lookups = []
+
+    def counting_find_hierarchy(tribe):
+        lookups.append(tribe)
+        return ConfigLoader.find_hierarchy(config_loader, tribe)
+
+    monkeypatch.setattr(config_loader, 'find_hierarchy', counting_find_hierarchy)
+    resolve = TribeResolver(config_loader).resolve
+    for tribe in ["bank_cashin", "bank_cashin", "unknown", "unknown", "Bank_Cashin"]:
+        resolve(tribe)
+    assert lookups == ["bank_cashin", "unknown", "Bank_Cashin"]
+
+
+def test_aggregate_rollup_attributes_every_row_to_its_own_tribe(config_loader):
+    unmapped = (UNKNOWN_APPROVER, UNMAPPED_CATEGORY)
+    assert aggregate_rollup(ROWS, config_loader) == {
+        ("prod",) + CASHIN: [2, 150.5, 1806],
+        ("prod",) + BUYLOAD: [1, 300, 3600],
+        ("dev",) + MERCHANT: [1, 20.0, 240.0],
+        ("dev",) + unmapped + ("Side Project",): [2, 12, 144],
+        ("dev",) + unmapped + (NO_TRIBE,): [1, 1, 12]
+    }
+
+
+def test_aggregate_rollup_env_grouped_input(config_loader):
+    grouped = {"prod": [{"tribe": "bank_cashin", "monthlyCost": 1, "annualCost": 12}] * 3, "empty": []}
+    assert aggregate_rollup(grouped, config_loader) == {("prod",) + CASHIN: [3, 3, 36]}
+
+
+@pytest.mark.parametrize('results', [
+    [{"env": "dev", "monthlyCost": 1}, "row"],
+    [{"env": "dev", "monthlyCost": False}],
+    [{"env": "dev", "annualCost": "lots"}],
+    {"dev": [None]}
+])
+def test_aggregate_rollup_rejects_invalid_rows(config_loader, results):
+    with pytest.raises(InvalidRecordError):
+        aggregate_rollup(results, config_loader)
+
+
+def test_tree_totals_add_up_at_every_level(config_loader):
+    tree = build_tree(aggregate_rollup(ROWS, config_loader), ROLLUP_LEVELS)
+    assert (tree["namespace_count"], tree["raw_monthly"], tree["raw_annual"]) == (7, 483.5, 5802)
+
+    def check(node, depth):
+        if depth == len(ROLLUP_LEVELS):
+            return
+        children = list(node[("environments", "approvers", "categories", "tribes")[depth]].values())
+        for field in ("namespace_count", "raw_monthly", "raw_annual"):
+            assert sum(child[field] for child in children) == node[field]
+        for child in children:
+            check(child, depth + 1)
+
+    check(tree, 0)
+    prod = tree["environments"]["prod"]
+    assert prod["monthly_cost"] == "$450.50"
+    # Children are ordered by monthly cost, largest first
+    assert list(prod["approvers"]) == ["Anna Mactal", "Abi Baltazar"]
+    assert list(tree["environments"]) == ["prod", "dev"]
+    assert prod["approvers"]["Abi Baltazar"]["categories"]["funds"]["tribes"]["bank_cashin"]["namespace_count"] == 2
+
+
+def test_tree_ties_are_ordered_by_name():
+    leaves = {("dev", "b", "c", "t"): [1, 10, 120], ("dev", "a", "c", "t"): [1, 10, 120]}
+    assert list(build_tree(leaves, ("approver",))["approvers"]) == ["a", "b"]
+
+
+def test_tree_in_requested_level_order(config_loader):
+    leaves = aggregate_rollup(ROWS, config_loader)
+    tree = build_tree(leaves, ("approver", "env"))
+    anna = tree["approvers"]["Anna Mactal"]
+    assert set(anna) >= {"environments", "raw_monthly"}
+    assert anna["environments"]["prod"]["raw_monthly"] == 300
+    assert anna["environments"]["dev"]["raw_monthly"] == 20.0
+    assert "tribes" not in anna["environments"]["prod"]
+
+    tribes = build_tree(leaves, ("tribe",))["tribes"]
+    assert tribes["bank_cashin"]["namespace_count"] == 2
+    assert tribes["Side Project"]["raw_annual"] == 144
+
+
+def test_build_rollup_rows(config_loader):
+    rollup = build_rollup(aggregate_rollup(ROWS, config_loader), ("env",), include_rows=True)
+    assert rollup["levels"] == ["env"]
+    assert rollup["totals"]["namespace_count"] == 7
+    assert set(rollup["rollup"]) == {"prod", "dev"}
+    assert rollup["columns"] == list(ROW_COLUMNS)
+    assert rollup["rows"][0] == ["dev", "Anna Mactal", "b2b", "merchant_core", 1, 20.0, 240.0]
+    assert len(rollup["rows"]) == 5
+
+
+@pytest.mark.parametrize('levels', [[], "env", ["env", "env"], ["env", "team"], [1]])
+def test_invalid_levels(levels):
+    with pytest.raises(ValueError):
+        parse_levels(levels)
+
+
+def test_rollup_endpoint():
+    status, body, _ = call('POST', '/api/rollup', {'results': ROWS, 'levels': ["tribe"], 'include_rows': True})
+    assert status == 200
+    assert body['success'] is True
+    assert body['totals']['raw_monthly'] == 483.5
+    assert body['rollup']['buyload']['monthly_cost'] == "$300.00"
+    assert len(body['rows']) == 5
+
+    status, body, _ = call('POST', '/api/rollup', {'results': ROWS, 'levels': ["team"]})
+    assert status == 400
+    assert body['error'].startswith('Unknown rollup levels: team')
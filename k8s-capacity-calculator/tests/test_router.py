@@ -0,0 +1,139 @@
+"""Routing of REST API (v1) and HTTP API (v2) proxy events through lambda_handler"""
+import base64
+import gzip
+import json
+
+import pytest
+
+import app
+from test_app import make_event
+from utils.router import CORS_HEADERS, Router, get_header, get_request_method, get_request_path
+
+ROWS = [{"env": "dev", "monthlyCost": 10, "annualCost": 120}, {"env": "prod", "monthlyCost": 20, "annualCost": 240}]
+
+
+def make_v2_event(method, raw_path, body=None, query=None, headers=None, stage='$default'):
+    event = {
+        'version': '2.0',
+        'rawPath': raw_path,
+        'rawQueryString': '&'.join(f'{key}={value}' for key, value in (query or {}).items()),
+        'headers': {'content-type': 'application/json', **(headers or {})},
+        'requestContext': {'http': {'method': method, 'path': raw_path}, 'stage': stage},
+        'isBase64Encoded': False
+    }
+    if query:
+        event['queryStringParameters'] = query
+    if body is not None:
+        event['body'] = body if isinstance(body, str) else json.dumps(body)
+    return event
+
+
+def handle(event):
+    response = app.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body']) if response['body'] else None, response['headers']
+
+
+@pytest.mark.parametrize('event, method, path', [
+    ({'httpMethod': 'post', 'path': '/api/add'}, 'POST', '/api/add'),
+    ({'requestContext': {'http': {'method': 'put'}}, 'rawPath': '/api/x'}, 'PUT', '/api/x'),
+    ({'rawPath': '/dev/api/test', 'requestContext': {'stage': 'dev'}}, 'GET', '/api/test'),
+    ({'rawPath': '/api/test', 'requestContext': {'stage': '$default'}}, 'GET', '/api/test'),
+    ({'rawPath': '/development/api/test', 'requestContext': {'stage': 'dev'}}, 'GET', '/development/api/test'),
+    ({}, 'GET', '')
+])
+def test_method_and_path_from_v1_and_v2_events(event, method, path):
+    assert (get_request_method(event), get_request_path(event)) == (method, path)
+
+
+def test_headers_are_case_insensitive():
+    assert get_header({'headers': {'Content-Encoding': 'gzip'}}, 'content-encoding') == 'gzip'
+    assert get_header({'headers': {'if-none-match': '"a"'}}, 'If-None-Match') == '"a"'
+    assert get_header({'headers': None}, 'Accept') is None
+
+
+def test_duplicate_routes_are_refused():
+    router = Router()
+    router.route('get', '/a')(lambda event, headers: None)
+    router.route('POST', '/a')(lambda event, headers: None)
+    with pytest.raises(ValueError, match='Route already registered: GET /a'):
+        router.route('GET', '/a')(lambda event, headers: None)
+    assert router.allowed_methods('/a') == ['GET', 'POST']
+    assert router.allowed_methods('/b') == []
+
+
+def test_v2_event_is_routed_like_v1():
+    body = {'results': ROWS}
+    v1 = handle(make_event('POST', '/api/finalize-cost', body))
+    v2 = handle(make_v2_event('POST', '/api/finalize-cost', body))
+    staged = handle(make_v2_event('POST', '/prod/api/finalize-cost', body, stage='prod'))
+    assert v1[0] == v2[0] == staged[0] == 200
+    assert v1[1] == v2[1] == staged[1]
+
+
+def test_v2_query_parameters_and_lowercase_headers():
+    event = make_v2_event('GET', '/api/search-tribes', query={'q': 'bank_cash', 'limit': '1'})
+    status, body, headers = handle(event)
+    assert status == 200
+    assert [result['tribe'] for result in body['results']] == ['bank_cashin']
+
+    event['headers']['if-none-match'] = headers['ETag']
+    assert handle(event)[0] == 304
+
+
+@pytest.mark.parametrize('make', [make_event, make_v2_event])
+def test_unknown_path_is_404(make):
+    status, body, headers = handle(make('GET', '/api/nothing-here'))
+    assert status == 404
+    assert body == {'error': 'Endpoint not found', 'path': '/api/nothing-here'}
+    assert headers['Access-Control-Allow-Origin'] == '*'
+
+
+@pytest.mark.parametrize('make', [make_event, make_v2_event])
+def test_wrong_method_is_405_with_allow(make):
+    status, body, headers = handle(make('GET', '/api/finalize-cost'))
+    assert status == 405
+    assert body['error'] == 'Method GET not allowed for /api/finalize-cost'
+    assert headers['Allow'] == 'POST, OPTIONS'
+    assert headers['X-Correlation-Id']
+
+    status, _, headers = handle(make('DELETE', '/api/test'))
+    assert (status, headers['Allow']) == (405, 'GET, OPTIONS')
+
+
+@pytest.mark.parametrize('make', [make_event, make_v2_event])
+@pytest.mark.parametrize('path', ['/api/finalize-cost', '/api/nothing-here'])
+def test_options_preflight(make, path):
+    response = app.lambda_handler(make('OPTIONS', path), None)
+    assert response['statusCode'] == 200
+    assert response['body'] == ''
+    for key, value in CORS_HEADERS.items():
+        assert response['headers'][key] == value
+
+
+@pytest.mark.parametrize('make', [make_event, make_v2_event])
+def test_base64_bodies(make):
+    expected = handle(make_event('POST', '/api/finalize-cost', {'results': ROWS}))[1]
+    raw = json.dumps({'results': ROWS}).encode('utf-8')
+
+    event = make('POST', '/api/finalize-cost')
+    event.update(body=base64.b64encode(raw).decode('ascii'), isBase64Encoded=True)
+    assert handle(event)[:2] == (200, expected)
+
+    event = make('POST', '/api/finalize-cost')
+    event['headers']['Content-Encoding'] = 'gzip'
+    event.update(body=base64.b64encode(gzip.compress(raw)).decode('ascii'), isBase64Encoded=True)
+    assert handle(event)[:2] == (200, expected)
+
+
+@pytest.mark.parametrize('body, is_base64, status, error', [
+    ('not base64!', True, 400, 'Invalid base64 body'),
+    (base64.b64encode(b'{"results": [').decode(), True, 400, 'Invalid JSON body'),
+    (base64.b64encode(b'[1, 2]').decode(), True, 400, 'Request body must be a JSON object'),
+    ('{"results": ', False, 400, 'Invalid JSON body')
+])
+def test_bad_bodies_are_400(body, is_base64, status, error):
+    event = make_v2_event('POST', '/api/finalize-cost', body)
+    event['isBase64Encoded'] = is_base64
+    response_status, response_body, _ = handle(event)
+    assert response_status == status
+    assert response_body['error'].startswith(error)
@@ -0,0 +1,179 @@
+"""What-if scenario expansion and sweeps in utils/scenarios.py and /api/scenarios"""
+import math
+
+import pytest
+
+import app
+from test_app import call
+from utils import scenarios
+from utils.calculator import DEFAULT_SIZING, calculate_final_cost
+from utils.config_loader import ConfigLoader
+from utils.scenarios import SCENARIO_PARAMETERS, TOTAL_COLUMNS, expand_scenarios, run_scenarios
+
+ROWS = [
+    {"env": "prod", "provisioner": "Tier3", "monthlyCost": 1102.56, "annualCost": 13230.72},
+    {"env": "prod", "provisioner": "Tier4", "monthlyCost": 2205.12, "annualCost": 26461.44},
+    {"env": "dev", "provisioner": "Tier1", "monthlyCost": 413.46, "annualCost": 4961.52},
+    {"env": "dev", "monthlyCost": 413.46, "annualCost": 4961.52},
+    {"env": "staging", "provisioner": "Tier2", "monthlyCost": "583.84", "annualCost": 7006.08},
+    {"env": "prod", "provisioner": "Tier3", "monthlyCost": 1102.56, "annualCost": 13230.72}
+]
+
+
+def test_grid_is_swept_as_a_cartesian_product():
+    names, points = expand_scenarios({"buffer": [1.1, 1.5], "price_multiplier": [1, 0.9, 1.2]})
+    assert names == ["buffer", "price_multiplier"]
+    assert points == [(1.1, 1), (1.1, 0.9), (1.1, 1.2), (1.5, 1), (1.5, 0.9), (1.5, 1.2)]
+
+
+def test_explicit_scenarios_follow_the_grid_and_leave_unset_parameters_out():
+    names, points = expand_scenarios(
+        {"buffer": [1.2]},
+        [{"prod_cores_per_node": 4}, {"buffer": 2, "price_multiplier.Tier1": 0.5}]
+    )
+    assert names == ["buffer", "prod_cores_per_node", "price_multiplier.Tier1"]
+    assert points == [(1.2, None, None), (None, 4, None), (2, None, 0.5)]
+
+
+def test_nothing_to_expand():
+    assert expand_scenarios() == ([], [])
+    assert expand_scenarios({}, []) == ([], [])
+
+
+@pytest.mark.parametrize('grid, scenario_list, error', [
+    ({"nodes": [1]}, None, 'Unknown scenario parameters: nodes'),
+    (None, [{"price_multiplier.": 2}], 'Unknown scenario parameters: price_multiplier.'),
+    ({"buffer": []}, None, 'grid.buffer must be a non-empty list'),
+    ({"buffer": 1.3}, None, 'grid.buffer must be a non-empty list'),
+    ({"buffer": [1.3, 0]}, None, 'buffer values must be positive numbers'),
+    ({"buffer": [-1]}, None, 'buffer values must be positive numbers'),
+    ({"buffer": [True]}, None, 'buffer values must be positive numbers'),
+    ({"buffer": ["1.3"]}, None, 'buffer values must be positive numbers'),
+    ({"buffer": [math.inf]}, None, 'buffer values must be positive numbers'),
+    (None, [{"price_multiplier": None}], 'price_multiplier values must be positive numbers'),
+    (None, ["buffer"], 'each scenario must be an object'),
+    ([1.3], None, 'grid must be an object'),
+    (None, {"buffer": 1.3}, 'grid must be an object')
+])
+def test_invalid_scenarios_are_rejected(grid, scenario_list, error):
+    with pytest.raises(ValueError, match=error):
+        expand_scenarios(grid, scenario_list)
+
+
+def test_scenario_limit_counts_grid_and_explicit_points():
+    grid = {"buffer": [1.1, 1.2, 1.3], "price_multiplier": [1, 2]}
+    names, points = expand_scenarios(grid, [{"buffer": 2}], max_scenarios=7)
+    assert len(points) == 7
+    with pytest.raises(OverflowError, match=r'Too many scenarios: 8 \(max 7\)'):
+        expand_scenarios(grid, [{"buffer": 2}, {"buffer": 3}], max_scenarios=7)
+    # The limit is checked before the product is built
+    with pytest.raises(OverflowError):
+        expand_scenarios({name: [1, 2, 3, 4, 5, 6, 7, 8, 9, 10] for name in SCENARIO_PARAMETERS}, max_scenarios=10000)
+
+
+def test_baseline_matches_finalize():
+    sweep = run_scenarios(ROWS, [], [])
+    finalized = calculate_final_cost(ROWS, ConfigLoader(use_bundle=False)).values()
+    assert sweep["columns"] == list(TOTAL_COLUMNS)
+    assert sweep["baseline"] == [
+        round(sum(env.raw_monthly for env in finalized), 2),
+        round(sum(env.raw_annual for env in finalized), 2),
+        sum(env.total_cpu for env in finalized),
+        sum(env.total_cpu_buffered for env in finalized),
+        sum(env.node_count for env in finalized)
+    ]
+    assert sweep["totals"] == []
+
+
+def test_overrides_reprice_and_resize():
+    names, points = expand_scenarios(None, [
+        {},
+        {"price_multiplier": 2},
+        {"price_multiplier": 2, "price_multiplier.Tier3": 1},
+        {"nonprod_cpu_per_namespace": 12}
+    ])
+    sweep = run_scenarios(ROWS, names, points)
+    baseline, doubled, tier3_unchanged, bigger_nonprod = sweep["totals"]
+
+    assert baseline == sweep["baseline"]
+    assert doubled[:2] == [round(2 * baseline[0], 2), round(2 * baseline[1], 2)]
+    assert doubled[2:] == baseline[2:]
+    tier3_monthly = 2 * 1102.56
+    assert tier3_unchanged[0] == round(2 * (baseline[0] - tier3_monthly) + tier3_monthly, 2)
+    # 3 non-prod namespaces at 12 instead of 6 cores
+    assert bigger_nonprod[2] == baseline[2] + 3 * 6
+    assert bigger_nonprod[:2] == baseline[:2]
+
+
+def test_vectorized_sweep_matches_scalar(monkeypatch):
+    pytest.importorskip('numpy')
+    grid = {
+        "buffer": [1.0, 1.3, 1.75],
+        "prod_cores_per_node": [2.29, 4],
+        "price_multiplier": [0.8, 1],
+        "price_multiplier.Tier3": [1.5]
+    }
+    explicit = [
+        {"nonprod_cores_per_node": 3, "price_multiplier.Tier1": 0.25},
+        {"prod_cpu_per_namespace": 64},
+        {}
+    ]
+    names, points = expand_scenarios(grid, explicit)
+    vectorized = run_scenarios(ROWS, names, points, include_envs=True)
+    monkeypatch.setattr(scenarios, 'np', None)
+    scalar = run_scenarios(ROWS, names, points, include_envs=True)
+
+    assert vectorized == scalar
+    assert len(vectorized["totals"]) == len(points) == 3 * 2 * 2 + 3
+    assert vectorized["environments"] == ["prod", "dev", "staging"]
+
+
+def test_vectorized_sweep_over_env_grouped_results(monkeypatch):
+    pytest.importorskip('numpy')
+    grouped = {"prod": ROWS[:2], "dev": ROWS[2:4], "empty": []}
+    names, points = expand_scenarios({"buffer": [1.1, 2.5], "nonprod_cpu_per_namespace": [3, 6]})
+    vectorized = run_scenarios(grouped, names, points, include_envs=True)
+    monkeypatch.setattr(scenarios, 'np', None)
+    assert vectorized == run_scenarios(grouped, names, points, include_envs=True)
+    assert [row[-1] for row in vectorized["env_node_counts"]] == [0] * len(points)
+
+
+def test_scenarios_endpoint():
+    status, body, _ = call('POST', '/api/scenarios', {
+        'results': ROWS,
+        'grid': {"buffer": [1.3, 2]},
+        'scenarios': [{"price_multiplier": 1.1}],
+        'include_envs': True
+    })
+    assert status == 200
+    assert body['success'] is True
+    assert body['scenario_count'] == 3
+    assert body['parameters'] == ["buffer", "price_multiplier"]
+    assert body['points'] == [[1.3, None], [2, None], [None, 1.1]]
+    assert body['totals'][0] == body['baseline']
+    assert body['totals'][1][3] > body['baseline'][3]
+    assert body['environments'] == ["prod", "dev", "staging"]
+    assert len(body['env_node_counts']) == 3
+
+
+def test_too_many_scenarios_answer_400(monkeypatch):
+    monkeypatch.setattr(app, 'MAX_SCENARIOS', 4)
+    status, body, _ = call('POST', '/api/scenarios', {
+        'results': ROWS, 'grid': {"buffer": [1.1, 1.2, 1.3], "price_multiplier": [1, 2]}
+    })
+    assert status == 400
+    assert body['error'] == 'Too many scenarios: 6 (max 4)'
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({'grid': {"buffer": [1.3]}}, app.NO_RESULTS_ERROR),
+    ({'results': ROWS}, 'Provide a grid of parameter values or a list of scenarios'),
+    ({'results': ROWS, 'grid': {"cores": [1]}}, 'Unknown scenario parameters: cores'),
+    ({'results': ROWS, 'scenarios': [{"buffer": 0}]}, 'buffer values must be positive numbers'),
+    ({'results': [ROWS[0], 7], 'grid': {"buffer": [1.3]}}, 'Invalid result entry'),
+    ({'results': [{"env": "dev", "monthlyCost": True}], 'grid': {"buffer": [1.3]}}, 'Invalid result entry')
+])
+def test_scenarios_endpoint_rejects_bad_requests(payload, error):
+    status, body, _ = call('POST', '/api/scenarios', payload)
+    assert status == 400
+    assert body['error'].startswith(error)
@@ -0,0 +1,125 @@
+"""Session state store backends and their running aggregates"""
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from utils import state_store as state_store_module
+from utils.state_store import (
+    DynamoDBStateBackend, LocalDynamoTable, MemoryStateBackend, StateBackend, StateConflictError, StateStore,
+    create_state_store
+)
+
+
+def make_entry(env='dev', monthly=10):
+    return {'env': env, 'cpu_core_ns': 6, 'monthlyCost': monthly, 'annualCost': monthly * 12}
+
+
+def test_state_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StateBackend()
+
+    class PartialBackend(StateBackend):
+        def get_entry(self, session_id, entry_id):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialBackend()
+
+
+@pytest.mark.parametrize('backend_name', [None, '', 'none', 'bogus'])
+def test_sessions_are_off_unless_a_backend_is_configured(monkeypatch, backend_name):
+    if backend_name is None:
+        monkeypatch.delenv('STATE_STORE_BACKEND', raising=False)
+    else:
+        monkeypatch.setenv('STATE_STORE_BACKEND', backend_name)
+    assert not create_state_store().enabled
+
+
+def test_unconfigured_dynamodb_turns_sessions_off(monkeypatch):
+    monkeypatch.setenv('STATE_STORE_BACKEND', 'dynamodb')
+    monkeypatch.delenv('STATE_TABLE_NAME', raising=False)
+    assert not create_state_store().enabled
+
+
+def test_memory_sessions_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(state_store_module.time, 'monotonic', lambda: now[0])
+    store = StateStore(MemoryStateBackend(ttl_seconds=60, max_sessions=10))
+
+    store.upsert('old', 'a', make_entry())
+    now[0] += 30
+    store.upsert('fresh', 'a', make_entry())
+    now[0] += 45
+    assert store.aggregates('fresh')
+    assert store.aggregates('old') == {}
+    assert len(store.backend) == 1
+
+
+def test_memory_sessions_evict_least_recently_used():
+    store = StateStore(MemoryStateBackend(max_sessions=2))
+    store.upsert('s1', 'a', make_entry())
+    store.upsert('s2', 'a', make_entry())
+    store.aggregates('s1')  # s2 is now the least recently used
+    store.upsert('s3', 'a', make_entry())
+
+    assert len(store.backend) == 2
+    assert store.aggregates('s2') == {}
+    assert store.aggregates('s1')['dev']['namespace_count'] == 1
+
+
+class SlowDynamoTable(LocalDynamoTable):
+    """Answers reads after a network-like delay, so concurrent writers interleave"""
+
+    def get_item(self, Key, ConsistentRead=False):
+        response = super().get_item(Key, ConsistentRead)
+        time.sleep(0.001)
+        return response
+
+
+def test_dynamodb_concurrent_adds_keep_every_update():
+    # Two "containers" share one table; without the session lock their
+    # read-modify-write aggregate updates overwrite each other
+    table = SlowDynamoTable()
+    stores = [StateStore(DynamoDBStateBackend(table)) for _ in range(2)]
+    adds_per_thread = 25
+
+    def add_entries(store, prefix):
+        for i in range(adds_per_thread):
+            store.upsert('shared', f'{prefix}-{i}', make_entry(monthly=1))
+
+    threads = [
+        threading.Thread(target=add_entries, args=(stores[n % 2], f't{n}')) for n in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    aggregate = stores[0].aggregates('shared')['dev']
+    assert aggregate['namespace_count'] == 4 * adds_per_thread
+    assert aggregate['monthly'] == Decimal(4 * adds_per_thread)
+    assert ('shared', 'lock') not in table.items
+
+
+def test_dynamodb_busy_session_raises_conflict():
+    table = LocalDynamoTable()
+    holder = DynamoDBStateBackend(table)
+    waiter = StateStore(DynamoDBStateBackend(table, wait_seconds=0.05))
+
+    with holder.transaction('shared'):
+        with pytest.raises(StateConflictError):
+            waiter.upsert('shared', 'a', make_entry())
+    waiter.upsert('shared', 'a', make_entry())
+    assert waiter.aggregates('shared')['dev']['namespace_count'] == 1
+
+
+def test_dynamodb_expired_lease_is_taken_over():
+    table = LocalDynamoTable()
+    crashed = DynamoDBStateBackend(table, lease_ms=0)
+    crashed._acquire('shared', 'crashed-owner')
+
+    store = StateStore(DynamoDBStateBackend(table, wait_seconds=0.05))
+    store.upsert('shared', 'a', make_entry())
+    assert store.aggregates('shared')['dev']['namespace_count'] == 1
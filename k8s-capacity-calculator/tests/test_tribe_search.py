@@ -0,0 +1,144 @@
+"""TribeSearchIndex prefix search and /api/search-tribes"""
+import pytest
+
+import app
+from test_app import call, make_event
+from utils.tribe_search import PREFIX_END, TribeSearchIndex, normalize_tribe
+
+ORG_MAPPING = [
+    {"approver": "Abi Baltazar", "tribes": {"funds": ["bank_cashin", "Bank_Transfer", "funds_runway"]}},
+    {"approver": "Anna Mactal", "tribes": {
+        "b2c": ["bills_pay", " BANK_CASHIN ", "cards"],
+        "funds": ["zeta"]
+    }},
+    {"approver": "Abi Baltazar", "tribes": {"funds": ["bank_cashin"], "ops": ["  "]}}
+]
+
+
+@pytest.fixture
+def index():
+    return TribeSearchIndex(ORG_MAPPING, max_results=5)
+
+
+def names(results):
+    return [(result['type'], result.get('tribe') or result.get('category') or result['approver']) for result in results]
+
+
+@pytest.mark.parametrize('value, key', [
+    ("Bank_CashIn", "bank_cashin"),
+    ("  bank \t cashin\n", "bank cashin"),
+    ("", ""),
+    (None, ""),
+    (42, "")
+])
+def test_normalize_tribe(value, key):
+    assert normalize_tribe(value) == key
+
+
+@pytest.mark.parametrize('query', ["bank_cash", "BANK_CASH", "  Bank_Cash\t", "bank_cashin"])
+def test_queries_are_case_and_whitespace_insensitive(index, query):
+    results, total = index.search(query)
+    assert names(results) == [("tribe", "bank_cashin")]
+    assert total == 1
+
+
+@pytest.mark.parametrize('query', ["", "   ", None])
+def test_empty_query_matches_nothing(index, query):
+    assert index.search(query) == ([], 0)
+
+
+def test_prefix_past_the_last_key(index):
+    assert index.keys[-1] == "zeta"
+    assert index.search("zeta") == ([index.results[index.codes[-1] >> 1]], 1)
+    # Sorts after every key: both bisections land at len(keys)
+    for query in ("zetaa", "zz", "é", PREFIX_END):
+        assert index.search(query) == ([], 0)
+
+
+def test_word_prefixes_find_later_words(index):
+    assert names(index.search("cash")[0]) == [("tribe", "bank_cashin")]
+    assert names(index.search("transfer")[0]) == [("tribe", "Bank_Transfer")]
+    assert names(index.search("baltazar")[0]) == [("approver", "Abi Baltazar")]
+
+
+def test_ranking_exact_then_name_prefix_then_word_prefix(index):
+    # "funds" is the category's whole name, a prefix of funds_runway and a word of nothing
+    results, total = index.search("funds")
+    assert names(results) == [("category", "funds"), ("category", "funds"), ("tribe", "funds_runway")]
+    assert total == 3
+    # Equal quality: tribes before categories before approvers, then shorter names
+    results, _ = index.search("b")
+    assert names(results) == [
+        ("tribe", "bills_pay"), ("tribe", "bank_cashin"), ("tribe", "Bank_Transfer"), ("category", "b2c"),
+        ("approver", "Abi Baltazar")
+    ]
+
+
+def test_duplicate_tribe_names_keep_the_first_mapping(index):
+    matches = [result for result in index.results if result['type'] == 'tribe']
+    assert [result['tribe'] for result in matches] == ["bank_cashin", "Bank_Transfer", "funds_runway", "bills_pay",
+                                                      "cards", "zeta"]
+    (cashin,), _ = index.search("bank_cashin")
+    assert (cashin['approver'], cashin['category']) == ("Abi Baltazar", "funds")
+    # Repeated approvers and categories are indexed once; duplicates don't count as tribes
+    assert [result['tribe_count'] for result in index.results if result['type'] == 'approver'] == [3, 3]
+    assert [(result['approver'], result['category'], result['tribe_count'])
+            for result in index.results if result['type'] == 'category'] == [
+        ("Abi Baltazar", "funds", 3), ("Anna Mactal", "b2c", 2), ("Anna Mactal", "funds", 1), ("Abi Baltazar", "ops", 0)
+    ]
+
+
+@pytest.mark.parametrize('query', ["b", "ba", "ban"])
+def test_limit_caps_results_but_not_the_total(index, query):
+    everything, total = index.search(query, limit=5)
+    for limit in (1, 2, 3):
+        results, limited_total = index.search(query, limit=limit)
+        assert results == everything[:limit]
+        assert limited_total == total
+    # Never more than max_results, whatever the caller asks for
+    assert len(index.search("b", limit=100)[0]) == 5
+
+
+def test_short_queries_reuse_their_ranking(index):
+    first = index.search("b", limit=2)
+    assert ("b", None) in index._shortlists
+    assert index.search("b", limit=2) == first
+    assert index.search("b", limit=2, types=frozenset({"approver"})) == (
+        [{"type": "approver", "approver": "Abi Baltazar", "tribe_count": 3}], 1
+    )
+
+
+def test_types_filter(index):
+    results, total = index.search("funds", types=frozenset({"tribe"}))
+    assert names(results) == [("tribe", "funds_runway")]
+    assert total == 1
+
+
+def test_state_round_trip(index):
+    restored = TribeSearchIndex.from_state(index.get_state())
+    assert len(restored) == len(index)
+    for query in ("b", "funds", "cash", "zeta", "zz"):
+        assert restored.search(query) == index.search(query)
+
+
+def test_search_endpoint():
+    status, body, headers = call('GET', '/api/search-tribes', query={'q': ' Bank_Cash', 'limit': '3'})
+    assert status == 200
+    assert body['results'][0]['tribe'] == 'bank_cashin'
+    assert body['total_matches'] >= 1
+    assert headers['ETag']
+
+    event = make_event('GET', '/api/search-tribes', query={'q': 'bank_cash', 'limit': '3'})
+    event['headers']['If-None-Match'] = headers['ETag']
+    assert app.lambda_handler(event, None)['statusCode'] == 304
+
+
+@pytest.mark.parametrize('query, error', [
+    ({'q': 'b', 'limit': 'ten'}, 'limit must be an integer'),
+    ({'q': 'b', 'limit': '0'}, 'limit must be between 1 and'),
+    ({'q': 'b', 'types': 'tribe,team'}, 'types must be a comma-separated list')
+])
+def test_search_endpoint_rejects_bad_parameters(query, error):
+    status, body, _ = call('GET', '/api/search-tribes', query=query)
+    assert status == 400
+    assert body['error'].startswith(error)